@@ -0,0 +1,272 @@
+import pandas as pd
+import numpy as np
+import scipy.stats as stats
+
+agg_keys = ['participant', 'block', 'wm', 'rot_type', 'dimension', 'angle']
+# finest grain of the report: every table is a roll-up of these cells
+cube_keys = agg_keys + ['vivid_response', 'strategy_response', 'corr']
+cube_metrics = ['rt']
+# display labels, the key order is the order on the axes and in the tables
+wm_labels = {False: 'Single', True: 'WM'}
+corr_labels = {1: 'Correct', 0: 'Incorrect'}
+
+def build_cube(df):
+    """
+    Sufficient statistics (count, sum, sum of squares) per cube_keys cell, one scan of the trial frame.
+    Key columns are carried by the cell itself, so they can be rolled up as metrics too.
+    """
+    df = df[cube_keys + cube_metrics].assign(**{f'{m}_sq': df[m] ** 2 for m in cube_metrics})
+    aggs = dict(n=('corr', 'size'))
+    for m in cube_metrics:
+        aggs.update({f'{m}_n': (m, 'count'), f'{m}_sum': (m, 'sum'), f'{m}_sq': (f'{m}_sq', 'sum')})
+    return df.groupby(cube_keys, observed=True, dropna=False).agg(**aggs).reset_index()
+
+def cell_stats(df_cube, by, metric):
+    # count, total and sum of squares of `metric` per `by` group, indexed by `by`
+    by = [by] if isinstance(by, str) else list(by)
+    df_cube = df_cube.dropna(subset=by)
+    if metric in cube_keys:
+        value = df_cube[metric].astype(float)
+        count = df_cube['n'].where(value.notna(), 0)
+        total = (value * df_cube['n']).fillna(0)
+        sq = (value ** 2 * df_cube['n']).fillna(0)
+    else:
+        count, total, sq = df_cube[f'{metric}_n'], df_cube[f'{metric}_sum'], df_cube[f'{metric}_sq']
+    sums = pd.DataFrame({'count': count, 'total': total, 'sq': sq})
+    sums[by] = df_cube[by]
+    return sums.groupby(by, observed=True).sum()
+
+def rollup(df_cube, by, metric, std=True):
+    """
+    Same result as df.groupby(by)[metric].agg(['mean', 'std']).reset_index() on the trials the cube was built from,
+    or .mean().reset_index() with std=False.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    return rollup_sums(cell_stats(df_cube, by, metric), metric, std)
+
+def rollup_sums(sums, metric, std=True):
+    # means (and standard deviations) of cell_stats sums, `by` is their index
+    by = list(sums.index.names)
+    mean = sums['total'] / sums['count']
+    if not std:
+        df_rollup = mean.rename(metric).reset_index()
+    else:
+        var = ((sums['sq'] - sums['total'] * mean) / (sums['count'] - 1)).clip(lower=0)
+        df_rollup = pd.DataFrame({'mean': mean, 'std': var.where(sums['count'] > 1) ** 0.5}).reset_index()
+    # categories without trials (e.g. blocks not run) stay off the plot axes
+    for col in by:
+        if isinstance(df_rollup[col].dtype, pd.CategoricalDtype):
+            df_rollup[col] = df_rollup[col].cat.remove_unused_categories()
+    return df_rollup
+
+def get_partials(df_cube, by, metric):
+    """
+    Per-participant cell_stats of `metric` by `by`, with their sum over every participant.
+    combine_partials() takes participants out of the sum, so exclusions are recomputed from these
+    instead of from the cube.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    keys = by if 'participant' in by else ['participant'] + by
+    partials = cell_stats(df_cube, keys, metric)
+    if 'participant' in by:
+        return partials, partials
+    # participants with rows in each group, a group is kept while it has any
+    partials['participants'] = 1
+    totals = partials.groupby(level=by, observed=True).sum()
+    # row of every partial in the totals, what is taken out is summed by position
+    partials['cell'] = totals.index.get_indexer(partials.index.droplevel('participant'))
+    return partials, totals
+
+def combine_partials(partials, totals, exclude=()):
+    """
+    cell_stats sums over every participant but the `exclude`d ones: the totals less the partials of the
+    excluded participants, so the work grows with the participants and not with the trials.
+    """
+    excluded = partials.index.get_level_values('participant').isin(list(exclude))
+    if partials is totals:
+        # per-participant groups, the excluded rows are simply dropped
+        return totals[~excluded] if excluded.any() else totals
+    columns = ['count', 'total', 'sq']
+    if not excluded.any():
+        return totals[columns]
+    cell = partials['cell'].to_numpy()[excluded]
+    sums = {}
+    for column in columns + ['participants']:
+        removed = np.bincount(cell, weights=partials[column].to_numpy()[excluded], minlength=len(totals))
+        sums[column] = (totals[column].to_numpy() - removed).astype(totals[column].dtype)
+    # groups only the excluded participants had rows in are gone
+    kept = sums.pop('participants') > 0
+    return pd.DataFrame(sums, index=totals.index)[kept]
+
+def relabel(df, column, labels):
+    # label mapping as a categorical on a (small) summary frame, rows follow the label order
+    df = df.assign(**{column: pd.Categorical(df[column], categories=list(labels)).rename_categories(labels)})
+    return df.sort_values(column, kind='stable')
+
+def aggregate_performance(df_cube):
+    # per participant x condition means, the "Aggregated performance" table
+    metrics = dict(accuracy='corr', strategy_response='strategy_response', vivid_response='vivid_response', rt='rt')
+    return pd.concat([rollup(df_cube, agg_keys, metric, std=False).set_index(agg_keys)[metric].rename(name) for name, metric in metrics.items()], axis=1).reset_index()
+
+def get_group_codes(values):
+    # group order matches what seaborn puts on the x axis: categories, sorted numbers, or first appearance
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.cat.remove_unused_categories()
+        return values.cat.codes.to_numpy(), values.cat.categories
+    codes, uniques = pd.factorize(values, sort=pd.api.types.is_numeric_dtype(values) or pd.api.types.infer_dtype(values) == 'boolean')
+    return codes, uniques
+
+def bootstrap_ci(df, metric, by, cluster=None, n_boot=1000, ci=95, seed=0, max_cells=2_000_000):
+    """
+    Mean of `metric` per `by` group with a percentile bootstrap CI, the error bars of sns.barplot.
+    All groups are resampled together, from multinomial counts when a group has few distinct values
+    and from one index matrix per chunk of resamples otherwise.
+    With `cluster` (e.g. 'participant') whole clusters are resampled within each group instead of trials.
+    """
+    columns = [by, metric] + ([cluster] if cluster is not None else [])
+    df = df[columns].dropna()
+    if len(df) == 0:
+        # nothing left to resample (e.g. every participant deleted): no groups, no bars
+        return pd.DataFrame({by: df[by].to_numpy(), metric: np.array([], dtype=float), 'low': np.array([], dtype=float),
+                             'high': np.array([], dtype=float)})
+    codes, groups = get_group_codes(df[by])
+    order = np.argsort(codes, kind='stable')
+    codes = codes[order]
+    values = df[metric].to_numpy(dtype=float)[order]
+    if cluster is not None:
+        # resampling units are (group, cluster) cells, carried as sum and count
+        cells = pd.DataFrame({'group': codes, 'cluster': df[cluster].to_numpy()[order], 'value': values})
+        cells = cells.groupby(['group', 'cluster'], sort=True, observed=True)['value'].agg(['sum', 'count']).reset_index()
+        unit_group = cells['group'].to_numpy()
+        unit_sum, unit_count = cells['sum'].to_numpy(dtype=float), cells['count'].to_numpy(dtype=float)
+    else:
+        unit_group, unit_sum, unit_count = codes, values, np.ones(len(values))
+
+    n_groups = len(groups)
+    rng = np.random.default_rng(seed)
+    # identical units (accuracy, vividness, ...) collapse to a few weighted ones, their resample counts are multinomial
+    distinct = pd.DataFrame({'group': unit_group, 'sum': unit_sum, 'n': unit_count}).value_counts(sort=False).reset_index()
+    distinct = distinct.sort_values('group', kind='stable')
+    slot = distinct.groupby('group').cumcount().to_numpy()
+    if n_groups * (slot.max() + 1) * 4 < len(unit_group):
+        group = distinct['group'].to_numpy()
+        weights, slot_sum, slot_n = (np.zeros((n_groups, slot.max() + 1)) for _ in range(3))
+        weights[group, slot] = distinct['count'].to_numpy()
+        slot_sum[group, slot], slot_n[group, slot] = distinct['sum'].to_numpy(), distinct['n'].to_numpy()
+        sizes = weights.sum(axis=1)
+        draws = rng.multinomial(sizes.astype(np.int64), weights / sizes[:, None], size=(n_boot, n_groups))
+        boot_means = (draws * slot_sum).sum(axis=2) / (draws * slot_n).sum(axis=2)
+    else:
+        sizes = np.bincount(unit_group, minlength=n_groups)
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+        n_units = len(unit_group)
+        chunk = max(1, max_cells // n_units)
+        boot_means = []
+        for done in range(0, n_boot, chunk):
+            n = min(chunk, n_boot - done)
+            # every column of the index matrix draws from the units of its own group
+            idx = starts[unit_group] + (rng.random((n, n_units)) * sizes[unit_group]).astype(np.int64)
+            sums = np.add.reduceat(unit_sum[idx], starts, axis=1)
+            counts = np.add.reduceat(unit_count[idx], starts, axis=1)
+            boot_means.append(sums / counts)
+        boot_means = np.concatenate(boot_means, axis=0)
+    alpha = (100 - ci) / 2
+    low, high = np.percentile(boot_means, [alpha, 100 - alpha], axis=0)
+    mean = np.bincount(codes, weights=values, minlength=n_groups) / np.bincount(codes, minlength=n_groups)
+    return pd.DataFrame({by: groups, metric: mean, 'low': low, 'high': high})
+
+def participant_matrix(df_cube, metric, conditions):
+    """
+    Participant x condition means of `metric`, indexed by participant: column ('all', '') over every trial,
+    then one (condition, level) column per level of each column in `conditions`.
+    Conditions a participant has no trials in are NaN.
+    """
+    columns = {('all', ''): rollup(df_cube, 'participant', metric, std=False).set_index('participant')[metric]}
+    for condition in conditions:
+        wide = rollup(df_cube, ['participant', condition], metric, std=False).pivot(index='participant', columns=condition, values=metric)
+        columns.update({(condition, level): wide[level] for level in wide.columns})
+    return pd.concat(columns, axis=1)
+
+def correlate(X, y, method='spearman', n_perm=0, seed=0):
+    """
+    Correlation of every column of `X` with `y`, as stats.spearmanr / stats.pearsonr run column by column on the rows
+    where the column has a value (a missing `y` among them gives NaN, as in scipy).
+    All columns are ranked and correlated together. With `n_perm` the p-value is the two-sided permutation p-value,
+    `y` shuffled n_perm times over each set of rows and every shuffle correlated in one product.
+    Returns r, p and n per column of `X`.
+    """
+    x = X.to_numpy(dtype=float)
+    y = np.broadcast_to(y.to_numpy(dtype=float)[:, None], x.shape)
+    valid = ~np.isnan(x)
+    y_missing = (valid & np.isnan(y)).any(axis=0)
+    y = np.where(valid, y, np.nan)
+    if method == 'spearman':
+        x, y = stats.rankdata(x, axis=0, nan_policy='omit'), stats.rankdata(y, axis=0, nan_policy='omit')
+    n = valid.sum(axis=0)
+    # centred and scaled to unit length over the rows of each column, r is then a plain dot product
+    xc, yc = (np.where(valid, v - np.nanmean(v, axis=0), 0) for v in (x, y))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        xc, yc = xc / np.sqrt((xc ** 2).sum(axis=0)), yc / np.sqrt((yc ** 2).sum(axis=0))
+        r = np.clip((xc * yc).sum(axis=0), -1, 1)
+        r[y_missing] = np.nan
+        dof = n - 2
+        t = r * np.sqrt(dof / ((1 + r) * (1 - r)))
+    p = 2 * stats.t.sf(np.abs(t), dof)
+
+    if n_perm:
+        rng = np.random.default_rng(seed)
+        p = np.full(len(r), np.nan)
+        # columns sharing the same rows share the shuffles
+        patterns, pattern = np.unique(valid, axis=1, return_inverse=True)
+        for i, rows in enumerate(patterns.T):
+            cols = np.flatnonzero((pattern.ravel() == i) & ~np.isnan(r))
+            if len(cols) == 0:
+                continue
+            y_rows = np.nan_to_num(yc[rows][:, cols[0]])
+            shuffles = rng.permuted(np.tile(np.arange(rows.sum()), (n_perm, 1)), axis=1)
+            r_perm = y_rows[shuffles] @ xc[rows][:, cols]
+            p[cols] = (1 + (np.abs(r_perm) >= np.abs(r[cols]) - 1e-12).sum(axis=0)) / (n_perm + 1)
+    return pd.DataFrame({'r': r, 'p': p, 'n': n}, index=X.columns)
+
+def running_mean(df, metrics, by='participant', order='idx', window=None, reset=None, max_points=None):
+    """
+    Running mean of every column in `metrics` along `order` within each `by` group, as
+    groupby(by)[metric].transform(lambda x: x.expanding().mean()) on the frame sorted by [by, order].
+    An int `window` gives the moving average of the last `window` trials instead (rolling(window, min_periods=1)),
+    `reset` (e.g. 'mini_block') restarts the average whenever that column changes.
+    With `max_points` each `by` group keeps that many evenly spaced rows (and its last one), enough to draw the line.
+    Returns a frame of by, order (and reset) plus the metrics, sorted by [by, order].
+    """
+    by_codes, _ = pd.factorize(df[by], sort=True)
+    perm = np.lexsort((df[order].to_numpy(), by_codes))
+    by_codes = by_codes[perm]
+    # segments the average runs over: a `by` group, or a stretch of one `reset` value inside it
+    seg_codes = by_codes if reset is None else df.groupby([by, reset], sort=False, observed=True, dropna=False).ngroup().to_numpy()[perm]
+    seg_new = np.concatenate([[True], (seg_codes[1:] != seg_codes[:-1]) | (by_codes[1:] != by_codes[:-1])])
+    seg_start = np.flatnonzero(seg_new)[np.cumsum(seg_new) - 1]
+    pos = np.arange(len(perm))
+    lower = seg_start if window is None else np.maximum(seg_start, pos + 1 - window)
+
+    columns = [by, order] + ([reset] if reset is not None else [])
+    df_running = pd.DataFrame({col: df[col].to_numpy()[perm] for col in columns})
+    for metric in metrics:
+        values = df[metric].to_numpy(dtype=float)[perm]
+        valid = ~np.isnan(values)
+        # prefix sums over the sorted frame, a window is the difference of two of them
+        sums = np.concatenate([[0], np.cumsum(np.where(valid, values, 0))])
+        counts = np.concatenate([[0], np.cumsum(valid)])
+        n = counts[pos + 1] - counts[lower]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            df_running[metric] = np.where(n > 0, (sums[pos + 1] - sums[lower]) / n, np.nan)
+
+    if max_points is not None:
+        group_new = np.concatenate([[True], by_codes[1:] != by_codes[:-1]])
+        group_start = np.flatnonzero(group_new)
+        group_id = np.cumsum(group_new) - 1
+        size = np.diff(np.append(group_start, len(perm)))[group_id]
+        rank = pos - group_start[group_id]
+        # first row of each of max_points equal buckets, plus the last row so the line ends where the session ends
+        bucket = rank * max_points // size
+        keep = (rank == 0) | (bucket != np.concatenate([[-1], bucket[:-1]])) | (rank == size - 1)
+        df_running = df_running[keep].reset_index(drop=True)
+    return df_running
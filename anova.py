@@ -0,0 +1,203 @@
+from itertools import combinations
+
+import pandas as pd
+import numpy as np
+import scipy.stats as stats
+from statsmodels.iolib.table import SimpleTable
+from statsmodels.sandbox.stats.multicomp import get_tukeyQcrit2, get_tukey_pvalue
+
+from analysis import wm_labels
+
+# the between-trial factors offered in the ANOVA section
+anova_factor_names = ['wm', 'dimension', 'angle', 'block']
+
+def get_terms(factors):
+    # main effects first, then every interaction, the order of the C(a):C(b) formula in the report
+    return [tuple(c) for i in range(1, len(factors) + 1) for c in combinations(factors, i)]
+
+def get_term_name(term):
+    return ':'.join(f'C({factor})' for factor in term)
+
+def get_term_columns(levels, term):
+    # treatment-coded columns of one term on the cell rows: dummies of each factor (first level dropped), multiplied out
+    columns = np.ones((len(levels), 1))
+    for factor in term:
+        codes, uniques = pd.factorize(levels[factor], sort=True)
+        dummies = np.eye(len(uniques))[codes][:, 1:]
+        columns = (columns[:, :, None] * dummies[:, None, :]).reshape(len(levels), -1)
+    return columns
+
+def collapse_cells(cells, factors):
+    # sum the cell statistics over the factors that are not selected, empty cells dropped
+    cells = cells.groupby(list(factors), observed=True)[['count', 'total', 'sq']].sum()
+    return cells[cells['count'] > 0]
+
+def get_level_labels(levels):
+    # factor levels as the report prints them: Single/WM and angles like '60.0deg'
+    labels = pd.DataFrame(index=levels.index)
+    for factor in levels.columns:
+        if factor == 'wm':
+            labels[factor] = levels[factor].map(wm_labels).astype(str)
+        elif factor == 'angle':
+            labels[factor] = levels[factor].astype(str) + 'deg'
+        else:
+            labels[factor] = levels[factor].astype(str)
+    return labels
+
+def get_group_labels(levels, factors):
+    # one '_'-joined label per cell, built column-wise on the cells instead of row by row on the trials
+    labels = get_level_labels(levels[list(factors)])
+    group_labels = labels[factors[0]]
+    for factor in factors[1:]:
+        group_labels = group_labels + '_' + labels[factor]
+    return group_labels
+
+def cell_means(cells, factors, metric):
+    """Mean of the response per combination of `factors`, levels labelled and sorted as the report shows them."""
+    cells = collapse_cells(cells, factors)
+    # categorical like the factors of the trial frame, so plots keep the sorted level order
+    means = get_level_labels(cells.index.to_frame(index=False)).astype('category')
+    means[metric] = (cells['total'] / cells['count']).to_numpy()
+    return means.sort_values(list(factors)).reset_index(drop=True)
+
+def get_tail_pvalues(k, df, q, decimals=4, chunk=8):
+    """
+    Tukey p-values of the studentized ranges `q`, as far as they show at `decimals` places.
+    Each one is a numerical integral, so they are taken in increasing q and the rest is left at 0
+    once they round to 0.
+    """
+    pvalues = np.zeros(len(q))
+    order = np.argsort(q)
+    for start in range(0, len(q), chunk):
+        idx = order[start:start + chunk]
+        pvalues[idx] = np.atleast_1d(get_tukey_pvalue(k, df, q[idx]))
+        if np.round(pvalues[idx[-1]], decimals) == 0:
+            break
+    return pvalues
+
+def tukey_hsd(cells, factors, alpha=0.05):
+    """
+    Tukey HSD between the crossed levels of `factors`, as MultiComparison(y, group_label).tukeyhsd() on the trials.
+    The n and mean of each group and the pooled within-group variance all come from the cell statistics.
+    Returns the summary table statsmodels prints.
+    """
+    cells = collapse_cells(cells, factors)
+    group_labels = get_group_labels(cells.index.to_frame(index=False), factors).to_numpy()
+    # MultiComparison orders the groups by np.unique of the labels
+    order = np.argsort(group_labels, kind='stable')
+    group_labels = group_labels[order]
+    nobs = cells['count'].to_numpy(dtype=float)[order]
+    total = cells['total'].to_numpy(dtype=float)[order]
+    sq = cells['sq'].to_numpy(dtype=float)[order]
+    means = total / nobs
+    k, df = len(nobs), nobs.sum() - len(nobs)
+    var = (sq - total * means).sum() / df
+
+    # every pair of groups, the upper triangle in the order of statsmodels' tukeyhsd
+    group1, group2 = np.triu_indices(k, 1)
+    meandiffs = means[group2] - means[group1]
+    std_pairs = np.sqrt(var / 2 * (1 / nobs[group1] + 1 / nobs[group2]))
+    q = np.abs(meandiffs) / std_pairs
+    q_crit = get_tukeyQcrit2(k, df, alpha=alpha)
+    crit_int = std_pairs * q_crit
+    pvalues = get_tail_pvalues(k, df, q)
+
+    rows = np.array(list(zip(group_labels[group1], group_labels[group2], np.round(meandiffs, 4), np.round(pvalues, 4),
+                             np.round(meandiffs - crit_int, 4), np.round(meandiffs + crit_int, 4), q > q_crit)),
+                    dtype=[('group1', object), ('group2', object), ('meandiff', float), ('p-adj', float),
+                           ('lower', float), ('upper', float), ('reject', np.bool_)])
+    table = SimpleTable(rows, headers=rows.dtype.names)
+    table.title = f'Multiple Comparison of Means - Tukey HSD, FWER={alpha:4.2f}'
+    return table
+
+def anova_type2(cells, factors):
+    """
+    Type II ANOVA table of the full factorial model over `factors`, as sm.stats.anova_lm(ols(...).fit(), typ=2).
+    `cells` holds count, total and sq of the response per factor-level combination (analysis.cell_stats).
+    Every term is constant within a cell, so each nested fit is a weighted least squares over the cells
+    and the trials are never touched.
+    """
+    cells = collapse_cells(cells, factors)
+    levels = cells.index.to_frame(index=False)
+    weight = cells['count'].to_numpy(dtype=float)
+    mean = cells['total'].to_numpy() / weight
+    within = (cells['sq'].to_numpy() - cells['total'].to_numpy() * mean).sum()
+    n_obs = weight.sum()
+
+    terms = get_terms(factors)
+    # the design of each term is built once and reused by every nested model
+    term_columns = {term: get_term_columns(levels, term) for term in terms}
+    sqrt_w = np.sqrt(weight)
+    fits = {}
+    def fit(model_terms):
+        key = frozenset(model_terms)
+        if key not in fits:
+            X = np.hstack([np.ones((len(levels), 1))] + [term_columns[term] for term in model_terms])
+            coef, _, rank, _ = np.linalg.lstsq(X * sqrt_w[:, None], mean * sqrt_w, rcond=None)
+            fits[key] = (within + (weight * (mean - X @ coef) ** 2).sum(), rank)
+        return fits[key]
+
+    ssr, rank = fit(terms)
+    df_resid = n_obs - rank
+    rows = {}
+    for term in terms:
+        # compared against every term that does not contain it
+        base = [other for other in terms if not set(term) <= set(other)]
+        ssr_base, rank_base = fit(base)
+        ssr_term, rank_term = fit(base + [term])
+        rows[get_term_name(term)] = (ssr_base - ssr_term, float(rank_term - rank_base))
+    table = pd.DataFrame.from_dict(rows, orient='index', columns=['sum_sq', 'df'])
+    table['F'] = (table['sum_sq'] / table['df']) / (ssr / df_resid)
+    table['PR(>F)'] = stats.f.sf(table['F'], table['df'], df_resid)
+    table.loc['Residual'] = [ssr, df_resid, np.nan, np.nan]
+    return table
+
+def get_effect(means, axes):
+    # the part of the cell means that belongs to the interaction of `axes`: centred along them, averaged over the rest
+    for axis in range(means.ndim):
+        if axis in axes:
+            means = means - means.mean(axis=axis, keepdims=True)
+        else:
+            means = means.mean(axis=axis, keepdims=True)
+    return means
+
+def anova_rm(cells, factors, subject='participant'):
+    """
+    Repeated-measures ANOVA of the within-participant `factors`, the table of AnovaRM on the participant mean
+    of every condition. `cells` holds count, total and sq of the response per participant and factor levels
+    (analysis.cell_stats), so the trials are only seen through the cube.
+    The design is balanced, so every term is tested against its interaction with the participants, both sums
+    of squares taken from the participants x levels array of means instead of AnovaRM's dummy regression,
+    which grows with the square of the participant count.
+    Participants with an empty condition are left out and returned next to the table.
+    """
+    factors = list(factors)
+    cells = collapse_cells(cells, [subject] + factors)
+    levels = cells.index.to_frame(index=False)
+    levels[subject] = levels[subject].astype(str)
+    codes = [pd.factorize(levels[column], sort=True) for column in [subject] + factors]
+
+    shape = tuple(len(uniques) for _, uniques in codes)
+    n_conditions = np.prod(shape[1:])
+    if len(levels[factors].drop_duplicates()) < n_conditions:
+        raise ValueError(f"{', '.join(factors)} are not fully crossed, every participant needs every combination of levels")
+    complete = np.bincount(codes[0][0], minlength=shape[0]) == n_conditions
+    excluded = list(codes[0][1][~complete])
+    if complete.sum() < 2:
+        raise ValueError("fewer than 2 participants have trials in every condition")
+
+    means = np.full(shape, np.nan)
+    means[tuple(code for code, _ in codes)] = (cells['total'] / cells['count']).to_numpy()
+    means = means[complete]
+    n_cells = means.size
+    rows = {}
+    for term in get_terms(factors):
+        axes = [factors.index(factor) + 1 for factor in term]
+        num_df = np.prod([means.shape[axis] - 1 for axis in axes])
+        den_df = num_df * (means.shape[0] - 1)
+        ss_term = (get_effect(means, axes) ** 2).sum() * n_cells / np.prod([means.shape[axis] for axis in axes])
+        ss_error = (get_effect(means, [0] + axes) ** 2).sum() * n_cells / np.prod([means.shape[axis] for axis in [0] + axes])
+        rows[':'.join(term)] = ((ss_term / num_df) / (ss_error / den_df), float(num_df), float(den_df))
+    table = pd.DataFrame.from_dict(rows, orient='index', columns=['F Value', 'Num DF', 'Den DF'])
+    table['Pr > F'] = stats.f.sf(table['F Value'], table['Num DF'], table['Den DF'])
+    return table, excluded
@@ -1,1178 +1,942 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import seaborn as sns
-import matplotlib.pyplot as plt
-from scipy.stats import ttest_ind
 from stoc import stoc
+from parsing import parse_ps_files, describe_malformed, parse_vviq_files, dedupe_vviq, vviq_policies, get_zip_csv_members, get_zip_member_hashes, get_session_key
+from analysis import build_cube, rollup_sums, get_partials, combine_partials, relabel, wm_labels, corr_labels, aggregate_performance, bootstrap_ci, running_mean
+from analysis import participant_matrix, correlate
+from trial_store import load_parsed, save_parsed
+from figures import make_spec, spec_fingerprint, render_pngs, color_p
+from profiling import Profiler, append_log
+from table_view import get_levels, get_rows, get_page
+from anova import anova_factor_names, anova_type2, anova_rm, tukey_hsd, cell_means
 import zipfile
 import os
-import shutil
-import statsmodels.api as sm 
-from statsmodels.formula.api import ols
-from statsmodels.stats.anova import anova_lm
-from statsmodels.stats.multicomp import pairwise_tukeyhsd
-from statsmodels.stats.multicomp import MultiComparison
-from itertools import combinations
-import scipy.stats as stats
+import threading
+from collections import OrderedDict
 
 import warnings
 warnings.filterwarnings("ignore")
 
-color_p= ["#1984c5", "#22a7f0", "#63bff0", "#a7d5ed", "#e2e2e2", "#e1a692", "#de6e56", "#e14b31", "#c23728"]
-
-# Function definitions
-shared_columns = ['idx','dimension', 'rot_type', 'angle', 'mirror', 'wm', 
-                  'pair_id', 'obj_id', 'orientation1', 'orientation2', 'image_path_1', 'image_path_2',
-                  'marker_id', 'correctAns', 'vivid_response', 'key_resp_vivid_slider_control.keys', 'key_resp_vivid_slider_control.rt', 'participant', 'condition_file']
-
-def get_ans_key(row):
-    keys_possible_cols = ['key_resp.keys', 'key_resp_3.keys', 'key_resp_6.keys']
-    rt_possible_cols = ['key_resp.rt', 'key_resp_3.rt', 'key_resp_6.rt']
-    for key, rt in zip(keys_possible_cols, rt_possible_cols):
-        if not pd.isna(row[key]) and row[key] != '':
-            return row[key], row[rt]
-    return np.nan, np.nan
-
-def get_strategy_response(row):
-    if (not pd.isna(row['key_resp_strat_control.keys'])) and (row['key_resp_strat_control.keys'] != 'None') and (row['key_resp_strat_control.keys'] != ''):
-        try:    
-            strat_resp_list = eval(row['key_resp_strat_control.keys'])
-            if len(strat_resp_list) > 0:
-                last_key = strat_resp_list[-1]
-                if last_key == 'rshift':
-                    return 4
-                elif last_key == 'slash':
-                    return 3
-                elif last_key == 'period':
-                    return 2
-                elif last_key == 'comma':
-                    return 1
-        except:
-            print(row['key_resp_strat_control.keys'])
-    return np.nan
-
-def get_vivid_response(row):
-    if (not pd.isna(row['key_resp_vivid_slider_control.keys'])) and (row['key_resp_vivid_slider_control.keys'] != 'None') and (row['key_resp_vivid_slider_control.keys'] != ''):
-        try:    
-            vivid_resp_list = eval(row['key_resp_vivid_slider_control.keys'])
-            if len(vivid_resp_list) > 0:
-                last_key = vivid_resp_list[-1]
-                if last_key == 'rshift':
-                    return 4
-                elif last_key == 'slash':
-                    return 3
-                elif last_key == 'period':
-                    return 2
-                elif last_key == 'comma':
-                    return 1
-        except:
-            print(row['key_resp_vivid_slider_control.keys'])
-    return np.nan
-
-def get_block(row):
-    if row['dimension'] == '2D':
-        if row['wm'] == False:
-            return '2D_single'
-        elif row['wm'] == True:
-            return '2D_wm'
-        
-    elif row['dimension'] == '3D':
-        if row['rot_type'] == 'p':
-            if row['wm'] == False:
-                return '3Dp_single'
-            elif row['wm'] == True:
-                return '3Dp_wm'
-        elif row['rot_type'] == 'd':
-            if row['wm'] == False:
-                return '3Dd_single'
-            elif row['wm'] == True:
-                return '3Dd_wm'
-
-def get_corr(row):
-    if row['ans_key'] is np.nan:
-        return np.nan
-    else:
-        if row['correctAns'] == row['ans_key']:
-            return 1
-        else:
-            return 0
-
-
-def parse_excel(df):
-    df_blocks = df[~df['dimension'].isna()]
-    df_strat = df[~df['key_resp_strat_control.keys'].isna()]
-    df_strat = df_strat[['condition_file', 'key_resp_strat_control.keys', 'key_resp_strat_control.rt']]
-    df_blocks.reset_index(drop=True, inplace=True)
-    df_blocks['idx'] = df_blocks.index
-    df_parsed = pd.DataFrame(columns=shared_columns)
-    df_parsed['ans_key'] = np.nan
-    df_parsed['rt'] = np.nan
-    # iterate over the rows of the dataframe to get the ans keys, corr, rt by get_ans_key function
-    for idx, row in df_blocks.iterrows():
-        key, rt = get_ans_key(row)
-        df_parsed.loc[idx, 'ans_key'] = key
-        df_parsed.loc[idx, 'rt'] = rt
-        for col in shared_columns:
-            df_parsed.loc[idx, col] = row[col]
-            
-        # replace all 'None' values with np.nan
-    df_parsed.replace('None', np.nan, inplace=True)
-    df_parsed['vivid_response'] = df_parsed.apply(get_vivid_response, axis=1)
-
-    # fill na values in 'rot_type', 'pair_id', 'orientation1', 'orientation2', 'image_path_2' with not applicable
-    for col in ['rot_type', 'pair_id', 'orientation1', 'orientation2', 'image_path_2']:
-        df_parsed[col].fillna('na', inplace=True)
-        
-    df_parsed['block'] = df_parsed.apply(get_block, axis=1)
-    df_parsed['corr'] = df_parsed.apply(get_corr, axis=1)
+
+def parse_members(uploaded_file, member_hashes, max_workers):
+    """
+    Files parsed in an earlier session come from the parsed-trial store, only the others are parsed.
+    Returns ({name: parsed df}, {name: exception}, [(file, malformed cells message)]).
+    """
+    stored = {name: load_parsed(digest) for name, digest in member_hashes}
+    parsed = {name: entry[0] for name, entry in stored.items() if entry is not None}
+    malformed = {name: entry[1] for name, entry in stored.items() if entry is not None and entry[1]}
+    missing = [name for name, entry in stored.items() if entry is None]
+    errors = {}
+    if missing:
+        # the csv members are streamed straight out of the uploaded zip, no extraction to disk
+        with zipfile.ZipFile(uploaded_file, "r") as z:
+            new_parsed, errors, new_malformed = parse_ps_files(z, missing, max_workers=max_workers)
+        uploaded_file.seek(0)
+        digests = dict(member_hashes)
+        malformed.update(new_malformed)
+        for name, df_parsed in new_parsed.items():
+            parsed[name] = df_parsed
+            try:
+                save_parsed(df_parsed, new_malformed.get(name, {}), digests[name])
+            except OSError:
+                # the store only saves time, a read-only disk must not stop the analysis
+                pass
+    # members in upload order, as parsing returns them
+    parsed = {name: parsed[name] for name, _ in member_hashes if name in parsed}
+    notes = [(os.path.basename(name), message) for name, _ in member_hashes if name in malformed for message in describe_malformed(malformed[name])]
+    return parsed, errors, notes
+
+@st.cache_data(show_spinner="Parsing participant files...")
+def load_participant_data(member_hashes, _uploaded_file, _max_workers):
+    # cached on the content hashes of the zip members, widget changes reuse the parsed data
+    parsed, errors, malformed = parse_members(_uploaded_file, member_hashes, _max_workers)
+    errors = [(os.path.basename(name), str(e)) for name, e in errors.items()]
+    if not parsed:
+        return None, None, None, [], errors, malformed
     
-    df_parsed = df_parsed.merge(df_strat, on='condition_file', how='left')
-    df_parsed['strategy_response'] = df_parsed.apply(get_strategy_response, axis=1)
+    df_all_parsed = pd.concat(parsed.values(), axis=0)
+    success_parsed_participant = [str(df_parsed['participant'].unique()[0]) for df_parsed in parsed.values()]
     
-    df_parsed['mini_block'] = df_parsed['condition_file'].apply(lambda x: x.split('/')[1].split('.')[0]) 
-    df_parsed.drop(columns=['condition_file'], inplace=True)
-    return df_parsed
+    df_all_parsed.reset_index(drop=True, inplace=True)
+    df_all_parsed['participant'] = df_all_parsed['participant'].astype(str)
+    # one scan of the trials, every table of the report is rolled up from the cube
+    df_cube = build_cube(df_all_parsed)
+    return df_all_parsed, df_cube, aggregate_performance(df_cube), sorted(success_parsed_participant), errors, malformed
 
-def parse_vviq(df):
-    vviq_score = df['vviq_response'].sum()
-    participant = df['participant'].unique()[0]
-    tmp_df = pd.DataFrame({'participant': [str(participant)], 'vviq_score': [vviq_score]})
-    return tmp_df
+@st.cache_data(show_spinner="Parsing VVIQ files...")
+def load_vviq_data(member_hashes, _uploaded_file):
+    # one score per session file, straight from the zip members
+    with zipfile.ZipFile(_uploaded_file, "r") as z:
+        df_sessions, errors = parse_vviq_files(z, get_zip_csv_members(z))
+    return df_sessions, [os.path.basename(name) for name in errors]
 
+def get_upload_hashes(uploaded_file, names=None, max_entries=8):
+    # inflating and hashing every member is a full read of the zip, so it is done once per upload (its file_id)
+    # and later reruns only look the hashes up
+    file_id = getattr(uploaded_file, 'file_id', None)
+    key = (file_id, None if names is None else tuple(names))
+    store = st.session_state.setdefault('_upload_hashes', OrderedDict())
+    if file_id is not None and key in store:
+        store.move_to_end(key)
+        return store[key]
+    with zipfile.ZipFile(uploaded_file, "r") as z:
+        member_hashes = get_zip_member_hashes(z, names)
+    uploaded_file.seek(0)
+    if file_id is not None:
+        store[key] = member_hashes
+        while len(store) > max_entries:
+            store.popitem(last=False)
+    return member_hashes
 
-# make a new folder 'temp' to store the unzipped files and empty it if it already exists
-import os
-if os.path.exists('temp'):
-    shutil.rmtree('temp')
-os.makedirs('temp')
+def update_cohort(cohort, uploaded_file, max_workers):
+    """
+    Incremental ingestion: parse only the files of the upload whose (participant, session) is not in the cohort yet
+    and re-aggregate only the participants they belong to. Returns the parsing errors and malformed cells of this call.
+    """
+    with zipfile.ZipFile(uploaded_file, "r") as z:
+        names = get_zip_csv_members(z)
+    uploaded_file.seek(0)
+    new_names = [name for name in names if get_session_key(name) not in cohort['sessions'] and get_session_key(name) not in cohort['failed']]
+    if not new_names:
+        return [], []
+    
+    member_hashes = get_upload_hashes(uploaded_file, new_names)
+    parsed, errors, malformed = parse_members(uploaded_file, member_hashes, max_workers)
+    # content hashes of the cohort's sessions, the key of what is cached on the cohort
+    cohort['hashes'] += tuple((name, digest) for name, digest in member_hashes if name in parsed)
+    for name, df_parsed in parsed.items():
+        df_parsed = df_parsed.copy()
+        df_parsed['participant'] = df_parsed['participant'].astype(str)
+        cohort['sessions'][get_session_key(name)] = df_parsed
+    # failed files are not retried on every rerun, only after "Reset cohort"
+    cohort['failed'].update(get_session_key(name) for name in errors)
+    errors = [(os.path.basename(name), str(e)) for name, e in errors.items()]
+    if not parsed:
+        return errors, malformed
+    
+    # one concat for the new files, then partial re-aggregation of the participants they touch
+    df_new = pd.concat([cohort['sessions'][get_session_key(name)] for name in parsed], axis=0)
+    cohort['df'] = pd.concat([cohort['df'], df_new], axis=0, ignore_index=True) if cohort['df'] is not None else df_new.reset_index(drop=True)
+    for participant in df_new['participant'].unique():
+        df_participant = pd.concat([df for df in cohort['sessions'].values() if df['participant'].iloc[0] == participant], axis=0)
+        cohort['cube'][participant] = build_cube(df_participant)
+        cohort['agg'][participant] = aggregate_performance(cohort['cube'][participant])
+    return errors, malformed
+
+# figures are keyed by the plotted data and arguments, unchanged figures skip drawing on reruns
+@st.cache_resource
+def get_figure_store():
+    # fingerprint -> PNG bytes, least recently shown first, shared by all sessions
+    return OrderedDict(), threading.Lock()
+
+@st.cache_resource(show_spinner=False, max_entries=500)
+def load_partials(cohort_key, correct_only, by, metric, _df_cube):
+    # per-participant partial sums of one cohort, every exclusion of it is rolled up from these
+    return get_partials(_df_cube[_df_cube['corr'] == 1] if correct_only else _df_cube, list(by), metric)
+
+def cohort_stats(by, metric, rt=False):
+    # cell_stats of the cube without the deleted participants (and incorrect trials for RT, if ticked)
+    by = (by,) if isinstance(by, str) else tuple(by)
+    partials, totals = load_partials(cohort_key, rt and delete_incorrect, by, metric, df_cube_all)
+    return combine_partials(partials, totals, delete_participants)
+
+def cohort_rollup(by, metric, std=True, rt=False, where=None):
+    # `where` ({column: level}) rolls up the cells of one level only, as a roll-up of the filtered cube did
+    by = [by] if isinstance(by, str) else list(by)
+    where = where or {}
+    sums = cohort_stats(list(where) + by, metric, rt)
+    for column, level in where.items():
+        sums = sums[sums.index.get_level_values(column) == level].droplevel(column)
+    return rollup_sums(sums, metric, std)
+
+@st.cache_data(show_spinner=False)
+def load_bar_ci(cohort_key, excluded, correct_only, metric, by, cluster, _df):
+    return bootstrap_ci(_df, metric, by, cluster=cluster)
+
+def get_bar_ci(metric, by, cluster=None, rt=False):
+    # error bars of the "agg over participants" barplots, seeded so reruns draw the same bars;
+    # keyed by the cohort and the exclusions, the trials are not hashed on every rerun
+    df = df_all_parsed_rt if rt else df_all_parsed
+    return load_bar_ci(cohort_key, tuple(sorted(delete_participants)), rt and delete_incorrect, metric, by, cluster, df)
+
+@st.cache_data(show_spinner=False)
+def run_anova(cells, factors):
+    # keyed by the cell statistics (so by the exclusions and filters) and the selected factors
+    return anova_type2(cells, factors)
+
+@st.cache_data(show_spinner=False)
+def run_anova_rm(cells, factors):
+    return anova_rm(cells, factors)
+
+def show_anova_rm(cells, factors):
+    # participant x condition cell statistics, one mean per participant and cell
+    try:
+        anova_table, excluded = run_anova_rm(cells, factors)
+    except ValueError as e:
+        st.write(f"Repeated-measures ANOVA not available: {e}")
+        return
+    st.write(anova_table)
+    if excluded:
+        st.write(f"Left out (no trials in some condition): {excluded}")
+
+@st.cache_data(show_spinner=False)
+def run_tukey(cells, factors):
+    # the printed table, shown preformatted as st.write showed the statsmodels results
+    return f"```\n{tukey_hsd(cells, factors)}\n```"
+
+def get_vviq_matrix(df_cube, metric, df_vviq):
+    # participant x condition means left-merged with the scores, as pd.merge(..., on='participant', how='left') per panel did
+    matrix = participant_matrix(df_cube, metric, ['wm', 'block'])
+    rows = pd.merge(matrix.index.to_frame(index=False), df_vviq[['participant', 'vviq_score']], on='participant', how='left')
+    matrix = matrix.loc[rows['participant']]
+    matrix['vviq_score'] = rows['vviq_score'].to_numpy()
+    return matrix
+
+def get_vviq_panel(matrix, column, metric):
+    # scatter data of one condition: the participants with trials in it
+    return pd.DataFrame({'vviq_score': matrix['vviq_score'].to_numpy(), metric: matrix[column].to_numpy()}).dropna(subset=[metric])
+
+def get_vviq_facets(matrix, df_corr, condition, metric):
+    # long frame of every level of `condition` for the FacetGrid, plus the r/p annotation of each facet
+    levels = list(matrix[condition].columns)
+    df_facets = pd.concat([get_vviq_panel(matrix, (condition, level), metric).assign(**{condition: level}) for level in levels], ignore_index=True)
+    df_facets[condition] = pd.Categorical(df_facets[condition], categories=levels)
+    return df_facets, {str(level): get_corr_text(df_corr, (condition, level)) for level in levels}
+
+def get_corr_text(df_corr, column):
+    return f"r = {df_corr.loc[column, 'r']:.2f},\np = {df_corr.loc[column, 'p']:.2f}"
+
+def corr_footnote(n_perm):
+    return f"* r: Spearman correlation coefficient, p: {'permutation ' if n_perm else ''}p-value"
+
+@st.cache_data(show_spinner=False)
+def run_correlate(X, y, method, n_perm):
+    return correlate(X, y, method, n_perm=n_perm)
+
+def show_profile(profiler, **info):
+    # collapsed sidebar table of the stages of this run, also appended to the JSON profile log
+    profiler.stop()
+    with st.sidebar.expander("Profiling"):
+        if profiler.memory:
+            st.caption("Seconds and tracemalloc peak (MB above the memory in use when the stage started). "
+                       "Sections exclude their figures, they are drawn together in the last stage.")
+        else:
+            st.caption("Seconds only, another session is tracing memory. "
+                       "Sections exclude their figures, they are drawn together in the last stage.")
+        st.dataframe(profiler.to_frame(), hide_index=True)
+    try:
+        append_log(profiler.to_record('app', **info))
+    except OSError:
+        # the log only tracks reruns, a read-only disk must not stop the analysis
+        pass
+
+def show_table(df, key, filter_columns=('participant', 'block', 'angle'), page_sizes=(50, 100, 500, 1000)):
+    # one page of a large frame, filtered and sorted here: only the rows shown are sent to the browser
+    columns = [column for column in filter_columns if column in df.columns]
+    widgets = st.columns(len(columns) + 3)
+    filters = {column: widget.multiselect(column, get_levels(df[column]), key=f'{key}_{column}', placeholder="All")
+               for widget, column in zip(widgets, columns)}
+    sort_by = widgets[-3].selectbox("Sort by", [None] + list(df.columns), key=f'{key}_sort_by',
+                                    format_func=lambda column: "Row order" if column is None else column)
+    ascending = widgets[-2].selectbox("Order", [True, False], key=f'{key}_ascending',
+                                      format_func=lambda ascending: "Ascending" if ascending else "Descending")
+    page_size = widgets[-1].selectbox("Rows per page", page_sizes, index=1, key=f'{key}_page_size')
+    rows = get_rows(df, filters, sort_by, ascending)
+    n_pages = max(1, -(-len(rows) // page_size))
+    # a page past the end (after a narrower filter) shows the last one
+    page = min(st.number_input("Page", min_value=1, value=1, key=f'{key}_page'), n_pages)
+    st.dataframe(get_page(df, rows, page, page_size))
+    first = (page - 1) * page_size
+    st.caption(f"Rows {min(first + 1, len(rows))}-{min(first + page_size, len(rows))} of {len(rows)} (page {page} of {n_pages})")
+
+def kept(key, default, options=None):
+    """
+    Key of a widget drawn inside a TOC section, the widget itself takes no default/index/value.
+    A closed section does not draw its widgets and Streamlit drops their values, so the value is also kept
+    under '_kept_<key>' and seeds the widget again when the section opens (if still among `options`).
+    """
+    if key in st.session_state:
+        # the value as of this run, changes made since the last run included
+        st.session_state[f'_kept_{key}'] = st.session_state[key]
+    else:
+        value = st.session_state.get(f'_kept_{key}', default)
+        if options is not None:
+            value = [v for v in value if v in options] if isinstance(value, list) else value if value in options else default
+        st.session_state[key] = value
+    return key
+
+def kept_upload(label, key, **kwargs):
+    # st.file_uploader whose file outlives closing its section: an uploader that was not drawn last run
+    # (so is new) falls back to the kept file, one that was drawn and is empty has been cleared
+    drawn = key in st.session_state
+    uploaded = st.file_uploader(label, key=key, **kwargs)
+    if uploaded is not None or drawn:
+        st.session_state[f'_kept_{key}'] = uploaded
+    return st.session_state.get(f'_kept_{key}')
+
+def show_figure(plot, data, **kwargs):
+    # only the slot is placed now, the image arrives with flush_figures once every spec of the run is known
+    spec = make_spec(plot, data, **kwargs)
+    pending_figures.append((st.empty(), spec_fingerprint(spec), spec))
+
+def flush_figures(max_workers, max_entries=500):
+    store, lock = get_figure_store()
+    with lock:
+        missing = {fingerprint: spec for _, fingerprint, spec in pending_figures if fingerprint not in store}
+    pngs = []
+    if missing:
+        with st.spinner(f"Drawing {len(missing)} figures..."):
+            pngs = render_pngs(missing.values(), max_workers)
+    with lock:
+        store.update(zip(missing, pngs))
+        for slot, fingerprint, _ in pending_figures:
+            store.move_to_end(fingerprint)
+            slot.image(store[fingerprint], width="stretch")
+        while len(store) > max_entries:
+            store.popitem(last=False)
+    pending_figures.clear()
 
 # Streamlit app
 st.set_page_config(page_title="PS Behavioral Analysis", layout="wide", page_icon="🧠")
 st.title("Problem solving Multi Participant Analysis (May 30 version)")
 
+# both pools fork the Streamlit server process, benchmarks/server_pools.py checks them under `streamlit run`
+parse_workers = st.sidebar.number_input("Workers for parsing participant files", min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1)
+figure_workers = st.sidebar.number_input("Workers for drawing figures", min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1)
+# (slot, fingerprint, spec) of every figure of this run, drawn together at the end of the page
+pending_figures = []
+# tracemalloc slows the run down, so the stages are only measured on request
+profile_run = st.sidebar.checkbox("Profile stages (timings and peak memory)")
+
+incremental = st.sidebar.checkbox("Incremental mode (keep the parsed cohort, only parse new participant files)")
+if incremental:
+    reset_cohort = st.sidebar.button("Reset cohort")
+    if reset_cohort or 'cohort' not in st.session_state:
+        # (participant, session) -> parsed trials, participant -> statistics cube and aggregated performance
+        st.session_state['cohort'] = {'sessions': {}, 'failed': set(), 'df': None, 'cube': {}, 'agg': {}, 'hashes': ()}
+    cohort = st.session_state['cohort']
+
 uploaded_file = st.file_uploader("Upload the zipped file of the data of all participants (max 200MB)", type="zip")
 
 if uploaded_file:
     toc = stoc()
-    
-    with zipfile.ZipFile(uploaded_file, "r") as z:
-        z.extractall("temp")
-    
-    # get the list of unzipped files
-    unzipped_files = os.listdir("temp")
-    
-    # read all csv files and parse them
-    df_all_parsed = pd.DataFrame()
-    success_parsed_participant = []
-    for file in unzipped_files:
-        if file.endswith('.csv'):
-            try:
-                df = pd.read_csv(f"temp/{file}")
-                df_parsed = parse_excel(df)
-                df_all_parsed = pd.concat([df_all_parsed, df_parsed], axis=0)
-                success_parsed_participant.append(str(df_parsed['participant'].unique()[0]))
-            except Exception as e:
-                st.write(f"> Error parsing {file}: {e}")
-    
-    df_all_parsed.reset_index(drop=True, inplace=True)
-    df_all_parsed['participant'] = df_all_parsed['participant'].astype(str)
-    success_parsed_participant = sorted(success_parsed_participant)
-    st.write(f"Successfully parsed participants: {success_parsed_participant}. ", "Total number of participants: ", len(success_parsed_participant))
-    
-    # delete participants selectbox
-    # default is 6, 10, 12, 13 intersected with success_parsed_participant
-    default = list(set(['6', '10', '12', '13']).intersection(set(success_parsed_participant)))
-    delete_participants = st.multiselect("Delete participants (None by default)", success_parsed_participant, default=default)
-    if delete_participants:
-        df_all_parsed = df_all_parsed[~df_all_parsed['participant'].isin(delete_participants)]
-        st.write(f"Successfully deleted participant(s): {delete_participants}.")
-    
-    #  Analysis
-    
-    df_parsed = df_all_parsed.copy()
-    st.write("Parsed data:")
-    st.dataframe(df_parsed)
-    
-    # groupby participant, block, wm, rot_type, dimension, angle
-    df_agg_analysis = df_all_parsed.groupby(['participant', 'block', 'wm', 'rot_type', 'dimension', 'angle']).agg(
-        accuracy=('corr', 'mean'),
-        strategy_response=('strategy_response', 'mean'),
-        vivid_response=('vivid_response', 'mean'),
-        rt=('rt', 'mean')
-    ).reset_index().sort_values('participant')
-    st.write("Aggregated performance:")
-    st.dataframe(df_agg_analysis)
-    
-    # checkbox to whether or not delete incorrect responses on sidebar
-    
-    delete_incorrect = st.sidebar.checkbox("Delete incorrect responses for RT analysis")
-    if delete_incorrect:
-        df_all_parsed_rt = df_all_parsed[df_all_parsed['corr'] == 1]
-    else:
-        df_all_parsed_rt = df_all_parsed
+    profiler = Profiler(enabled=profile_run)
+    # tracemalloc is process-wide, it must not outlive this run (exceptions and st.stop() included)
+    try:
+        with profiler.stage("Parse participant files"):
+            if incremental:
+                errors, malformed = update_cohort(cohort, uploaded_file, parse_workers)
+                df_all_parsed = cohort['df']
+                df_cube_all = pd.concat(cohort['cube'].values(), axis=0, ignore_index=True) if cohort['cube'] else None
+                df_agg_all = pd.concat(cohort['agg'].values(), axis=0) if cohort['agg'] else None
+                success_parsed_participant = sorted(cohort['agg'])
+                cohort_key = cohort['hashes']
+            else:
+                cohort_key = get_upload_hashes(uploaded_file)
+                df_all_parsed, df_cube_all, df_agg_all, success_parsed_participant, errors, malformed = load_participant_data(cohort_key, uploaded_file, parse_workers)
+        for file, e in errors:
+            st.write(f"> Error parsing {file}: {e}")
+        for file, message in malformed:
+            st.write(f"> {file}: {message}")
+        if df_all_parsed is None:
+            st.write("No participant file could be parsed.")
+            st.stop()
+    
+        st.write(f"Successfully parsed participants: {success_parsed_participant}. ", "Total number of participants: ", len(success_parsed_participant))
+    
+        # delete participants selectbox
+        # default is 6, 10, 12, 13 intersected with success_parsed_participant
+        default = list(set(['6', '10', '12', '13']).intersection(set(success_parsed_participant)))
+        delete_participants = st.multiselect("Delete participants (None by default)", success_parsed_participant, default=default)
+        with profiler.stage("Exclusions and data tables"):
+            if delete_participants:
+                df_all_parsed = df_all_parsed[~df_all_parsed['participant'].isin(delete_participants)]
+                st.write(f"Successfully deleted participant(s): {delete_participants}.")
 
-    # Average Accuracy
-    toc.h2("1. Average Accuracy")
+            #  Analysis
 
-    # Broken down by block
-    toc.h3("1.1 By Block")
-    col1, col2, col3 = st.columns(3)
-    
-    df_block_accuracy = df_all_parsed.groupby('block')['corr'].agg(['mean', 'std']).reset_index().sort_values('block', ascending=True)
-    with col1:
-        st.dataframe(df_block_accuracy)
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        # sort the df by block
-        df_all_parsed_block_sorted = df_all_parsed.sort_values('block')
-        sns.barplot(x='block', y='corr', data=df_all_parsed_block_sorted, palette=color_p, ax=ax, capsize=0.1)
-        ax.set_xlabel('Block', fontsize=14)
-        ax.set_ylabel('Accuracy', fontsize=14)
-        plt.title('Average Accuracy by Block (agg over participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-    with col3:
-        # show all participants' accuracy by block
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_agg_analysis_plot = df_agg_analysis.sort_values('block')
-        sns.barplot(data=df_agg_analysis_plot, x='block', y='accuracy', hue='participant', palette= color_p, ax=ax, errorbar=None)
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('Block', fontsize=14)
-        ax.set_ylabel('Accuracy', fontsize=14)
-        plt.title('Accuracy by Block (breakdown by all participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    # Broken down by Single vs WM
-    toc.h3("1.2 By Single vs WM")
-    col1, col2, col3 = st.columns(3)
-    df_all_parsed_for_wm = df_all_parsed.copy()
-    df_all_parsed_for_wm['wm'] = df_all_parsed_for_wm['wm'].map({True: 'WM', False: 'Single'})
-    df_wm_accuracy = df_all_parsed_for_wm.groupby('wm')['corr'].agg(['mean', 'std']).reset_index().sort_values('wm', ascending=True)
-    with col1:
-        st.dataframe(df_wm_accuracy)
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_all_parsed_for_wm = df_all_parsed_for_wm.sort_values('wm')
-        sns.barplot(data=df_all_parsed_for_wm, x='wm', y='corr', palette=color_p, ax=ax, capsize=0.05, width=0.4)
-        ax.set_xlabel('Single vs WM', fontsize=14)
-        ax.set_ylabel('Accuracy', fontsize=14)
-        plt.title('Average Accuracy by Single vs WM (agg over participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-    with col3:
-        # show all participants' accuracy by Single vs WM
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_agg_analysis_plot = df_agg_analysis.sort_values('wm')
-        df_agg_analysis_plot.replace({'wm': {True: 'WM', False: 'Single'}}, inplace=True)
-        # sns.barplot(data=df_agg_analysis_plot, x='wm', y='accuracy', hue='participant', palette= color_p, ax=ax, errorbar=None, width=0.3)
-        sns.lineplot(data=df_agg_analysis_plot, x='wm', y='accuracy', hue='participant',alpha = 0.9, palette=color_p, ax=ax, err_style=None, marker='o', markersize=10, linewidth=3)
-        ax.margins(x=0.6, y=0.1)
-
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('Single vs WM', fontsize=14)
-        ax.set_ylabel('Accuracy', fontsize=14)
-        plt.title('Accuracy by Single vs WM (breakdown by all participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    # Broken down by 2D vs 3D
-    toc.h3("1.3 By 2D vs 3D")
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        df_2d3d_accuracy = df_all_parsed.groupby('dimension')['corr'].agg(['mean', 'std']).reset_index().sort_values('dimension', ascending=True)
-        st.dataframe(df_2d3d_accuracy)
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_all_parsed = df_all_parsed.sort_values('dimension')
-        sns.barplot(data=df_all_parsed, x='dimension', y='corr', palette=color_p, ax=ax, capsize=0.05, width=0.4)
-        ax.set_xlabel('2D vs 3D', fontsize=14)
-        ax.set_ylabel('Accuracy', fontsize=14)
-        plt.title('Average Accuracy by 2D vs 3D (agg over participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-    with col3:
-        # show all participants' accuracy by 2D vs 3D
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_agg_analysis_plot = df_agg_analysis.sort_values('dimension')
-        # sns.barplot(data=df_agg_analysis_plot, x='dimension', y='accuracy', hue='participant', palette= color_p, ax=ax, errorbar=None, width=0.3)
-        sns.lineplot(data=df_agg_analysis_plot, x='dimension', y='accuracy', hue='participant', alpha = 0.9, palette=color_p, ax=ax, err_style=None, marker='o', markersize=10, linewidth=3)
-        ax.margins(x=0.6, y=0.1)
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('2D vs 3D', fontsize=14)
-        ax.set_ylabel('Accuracy', fontsize=14)
-        plt.title('Accuracy by 2D vs 3D (breakdown by all participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    # By angular difference
-    toc.h3("1.4 By Angular Difference")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        df_all_parsed_for_angle = df_all_parsed.copy()
-        df_all_parsed_for_angle['angle'] = df_all_parsed_for_angle['angle'].astype(int)
-        df_angle_accuracy = df_all_parsed_for_angle.groupby('angle')['corr'].agg(['mean', 'std']).reset_index().sort_values('angle', ascending=True)
-        st.dataframe(df_angle_accuracy)
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        sns.barplot(data=df_all_parsed, x='angle', y='corr', palette=color_p, ax=ax, capsize=0.1)
-        ax.set_xlabel('Angle', fontsize=14)
-        ax.set_ylabel('Accuracy', fontsize=14)
-        plt.title('Average Accuracy by Angular Difference (agg over participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-    with col3:
-        # show all participants' accuracy by angular difference
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_agg_analysis_plot = df_agg_analysis.sort_values(['angle', 'participant'])
-        # sns.barplot(data=df_agg_analysis_plot, x='angle', y='accuracy', hue='participant', palette= color_p, ax=ax, errorbar=None)
-        sns.lineplot(data=df_agg_analysis_plot, x='angle', y='accuracy', hue='participant', alpha = 0.9, palette=color_p, ax=ax, err_style=None, marker='o', markersize=10, linewidth=3)
-        # x tick set to 0, 60, 120, 180
-        ax.set_xticks([0, 60, 120, 180])
-        # margin
-        ax.margins(x=0.2, y=0.1)
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('Angle', fontsize=14)
-        ax.set_ylabel('Accuracy', fontsize=14)
-        plt.title('Accuracy by Angular Difference (breakdown by all participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    st.write("Separate by wm and single")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        df_angle_accuracy = df_all_parsed.groupby(['angle', 'wm'])['corr'].agg(['mean', 'std']).reset_index().sort_values('angle', ascending=True)
-        df_angle_accuracy['wm'] = df_angle_accuracy['wm'].map({True: 'WM', False: 'Single'})
-        st.dataframe(df_angle_accuracy)
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_agg_analysis_plot = df_all_parsed.sort_values(['angle', 'participant'])
-        df_agg_analysis_plot_single = df_agg_analysis_plot[df_agg_analysis_plot['wm'] == False]
-        sns.lineplot(data=df_agg_analysis_plot_single, x='angle', y='corr', hue='participant', alpha = 0.9, palette=color_p, ax=ax, err_style=None, marker='o', markersize=10, linewidth=3)
-        ax.margins(x=0.2, y=0.1)
-        ax.set_xticks([0, 60, 120, 180])
-        plt.ylim(0.2, 1.2)
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('Angle', fontsize=14)
-        ax.set_ylabel('Accuracy', fontsize=14)
-        plt.title('Accuracy by Angular Difference (Single)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-    
-    with col3:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_agg_analysis_plot = df_all_parsed.sort_values(['angle', 'participant'])
-        df_agg_analysis_plot_wm = df_agg_analysis_plot[df_agg_analysis_plot['wm'] == True]
-        sns.lineplot(data=df_agg_analysis_plot_wm, x='angle', y='corr', hue='participant', alpha = 0.9, palette=color_p, ax=ax, err_style=None, marker='o', markersize=10, linewidth=3)
-        ax.margins(x=0.2, y=0.1)
-        ax.set_xticks([0, 60, 120, 180])
-        plt.ylim(0.2, 1.2)
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('Angle', fontsize=14)
-        ax.set_ylabel('Accuracy', fontsize=14)
-        plt.title('Accuracy by Angular Difference (WM)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)    
-        
-    # Avg response time
-    toc.h2("2. Average Reaction Time")
-    
-    
-    # Broken down by block
-    toc.h3("2.1 By Block")
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        df_block_rt = df_all_parsed_rt.groupby('block')['rt'].agg(['mean', 'std']).reset_index().sort_values('block', ascending=True)
-        st.dataframe(df_block_rt)
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_all_parsed_rt_for_block = df_all_parsed_rt.sort_values(['block', 'participant'])
-        sns.barplot(data=df_all_parsed_rt_for_block, x='block', y='rt', palette=color_p, ax=ax, capsize=0.1)
-        ax.set_xlabel('Block', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        plt.title('Average RT by Block (agg over participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-    with col3:
-        # show all participants' RT by block
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_agg_analysis_plot = df_all_parsed_rt.sort_values(['block', 'participant'])
-        sns.barplot(data=df_agg_analysis_plot, x='block', y='rt', hue='participant', palette= color_p, ax=ax, errorbar=None)
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('Block', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        plt.title('RT by Block (breakdown by all participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    # Broken down by Single vs WM
-    toc.h3("2.2 By Single vs WM")
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        df_wm_rt = df_all_parsed_rt.groupby('wm')['rt'].agg(['mean', 'std']).reset_index().sort_values('wm', ascending=True)
-        df_wm_rt.replace({'wm': {True: 'WM', False: 'Single'}}, inplace=True)
-        st.dataframe(df_wm_rt)
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_all_parsed_rt_plot = df_all_parsed_rt.copy()
-        df_all_parsed_rt_plot['wm'] = df_all_parsed_rt_plot['wm'].map({True: 'WM', False: 'Single'})
-        df_all_parsed_rt_plot = df_all_parsed_rt_plot.sort_values('wm')
-        sns.barplot(data=df_all_parsed_rt_plot, x='wm', y='rt', palette=color_p, ax=ax, capsize=0.05, width=0.4)
-        ax.set_xlabel('Single vs WM', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        plt.title('Average RT by Single vs WM (agg over participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-    with col3:
-        # show all participants' RT by Single vs WM
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_agg_analysis_plot = df_all_parsed_rt.sort_values(['wm', 'participant'])
-        df_agg_analysis_plot.replace({'wm': {True: 'WM', False: 'Single'}}, inplace=True)
-        # sns.barplot(data=df_agg_analysis_plot, x='wm', y='rt', hue='participant', palette= color_p, ax=ax, errorbar=None, width=0.3)
-        sns.lineplot(data=df_agg_analysis_plot, x='wm', y='rt', hue='participant', alpha = 0.9, palette=color_p, ax=ax, err_style=None, marker='o', markersize=10, linewidth=3)
-        ax.margins(x=0.6, y=0.1)
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('Single vs WM', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        plt.title('RT by Single vs WM (breakdown by all participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    # Broken down by 2D vs 3D
-    toc.h3("2.3 By 2D vs 3D")
-    col1, col2, col3 = st.columns(3)
-    
-    with col1:
-        df_2d3d_rt = df_all_parsed_rt.groupby('dimension')['rt'].agg(['mean', 'std']).reset_index().sort_values('dimension', ascending=True)
-        st.dataframe(df_2d3d_rt)
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_all_parsed_rt = df_all_parsed_rt.sort_values('dimension')
-        sns.barplot(data=df_all_parsed_rt, x='dimension', y='rt', palette=color_p, ax=ax, capsize=0.05, width=0.4)
-        ax.set_xlabel('2D vs 3D', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        plt.title('Average RT by 2D vs 3D (agg over participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    with col3:
-        # show all participants' RT by 2D vs 3D
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_agg_analysis_plot = df_all_parsed_rt.sort_values(['dimension', 'participant'])
-        # sns.barplot(data=df_agg_analysis_plot, x='dimension', y='rt', hue='participant', palette= color_p, ax=ax, errorbar=None, width=0.3)
-        sns.lineplot(data=df_agg_analysis_plot, x='dimension', y='rt', hue='participant', alpha = 0.9, palette=color_p, ax=ax, err_style=None, marker='o', markersize=10, linewidth=3)
-        ax.margins(x=0.6, y=0.1)
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('2D vs 3D', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        plt.title('RT by 2D vs 3D (breakdown by all participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    # By angular difference
-    toc.h3("2.4 By Angular Difference")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        df_angle_rt = df_all_parsed_rt.groupby('angle')['rt'].agg(['mean', 'std']).reset_index().sort_values('angle', ascending=True)
-        st.dataframe(df_angle_rt)
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        sns.barplot(data=df_all_parsed_rt, x='angle', y='rt', palette=color_p, ax=ax, capsize=0.1)
-        ax.set_xlabel('Angle', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        plt.title('Average RT by Angular Difference (agg over participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-    with col3:
-        # show all participants' RT by angular difference
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_agg_analysis_plot = df_all_parsed_rt.sort_values(['angle', 'participant'])
-        # sns.barplot(data=df_agg_analysis_plot, x='angle', y='rt', hue='participant', palette= color_p, ax=ax, errorbar=None)
-        sns.lineplot(data=df_agg_analysis_plot, x='angle', y='rt', hue='participant', alpha = 0.9, palette=color_p, ax=ax, err_style=None, marker='o', markersize=10, linewidth=3)
-        ax.margins(x=0.2, y=0.1)
-        ax.set_xticks([0, 60, 120, 180])
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('Angle', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        plt.title('RT by Angular Difference (breakdown by all participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    st.write("Separate by wm and single")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        df_angle_rt = df_all_parsed_rt.groupby(['angle', 'wm'])['rt'].agg(['mean', 'std']).reset_index().sort_values('angle', ascending=True)
-        df_angle_rt['wm'] = df_angle_rt['wm'].map({True: 'WM', False: 'Single'})
-        st.dataframe(df_angle_rt)
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_agg_analysis_plot = df_all_parsed_rt.sort_values(['angle', 'participant'])
-        df_agg_analysis_plot_single = df_agg_analysis_plot[df_agg_analysis_plot['wm'] == False]
-        # sns.barplot(data=df_agg_analysis_plot, x='angle', y='rt', hue='participant', palette= color_p, ax=ax, errorbar=None)
-        sns.lineplot(data=df_agg_analysis_plot_single, x='angle', y='rt', hue='participant', alpha = 0.9, palette=color_p, ax=ax, err_style=None, marker='o', markersize=10, linewidth=3)
-        ax.margins(x=0.2, y=0.1)
-        ax.set_xticks([0, 60, 120, 180])
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('Angle', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        plt.ylim(0.2, 8)
-        plt.title('RT by Angular Difference (Single)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    with col3:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_agg_analysis_plot = df_all_parsed_rt.sort_values(['angle', 'participant'])
-        df_agg_analysis_plot_wm = df_agg_analysis_plot[df_agg_analysis_plot['wm'] == True]
-        # sns.barplot(data=df_agg_analysis_plot, x='angle', y='rt', hue='participant', palette= color_p, ax=ax, errorbar=None)
-        sns.lineplot(data=df_agg_analysis_plot_wm, x='angle', y='rt', hue='participant', alpha = 0.9, palette=color_p, ax=ax, err_style=None, marker='o', markersize=10, linewidth=3)
-        ax.margins(x=0.2, y=0.1)
-        ax.set_xticks([0, 60, 120, 180])
-        plt.ylim(0.2, 8)
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('Angle', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        plt.title('RT by Angular Difference (WM)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    # By correct vs incorrect
-    toc.h3("2.5 By Correct vs Incorrect")
-    
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        df_corr_rt = df_all_parsed.groupby('corr')['rt'].agg(['mean', 'std']).reset_index().sort_values('corr', ascending=True)
-        df_corr_rt['corr'] = df_corr_rt['corr'].map({1: 'Correct', 0: 'Incorrect'}) 
-        st.dataframe(df_corr_rt)
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_all_parsed_cor_incor = df_all_parsed.copy()
-        df_all_parsed_cor_incor['corr'] = df_all_parsed_cor_incor['corr'].map({1: 'Correct', 0: 'Incorrect'})
-        sns.barplot(data=df_all_parsed_cor_incor, x='corr', y='rt', palette=color_p, ax=ax, capsize=0.05, width=0.4)
-        # add error bars
-        ax.set_xlabel('Correct vs Incorrect', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        plt.title('Average RT by Correct vs Incorrect (agg over participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    with col3:
-        df_corr_rt_participant = df_all_parsed.groupby(['participant', 'corr'])['rt'].mean().reset_index().sort_values('participant')
-        df_corr_rt_participant['corr'] = df_corr_rt_participant['corr'].map({1: 'Correct', 0: 'Incorrect'})
-        df_corr_rt_participant.sort_values('corr', inplace=True)
-        # show all participants' RT by correct vs incorrect
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        # sns.barplot(data=df_corr_rt_participant, x='corr', y='rt', hue='participant', palette= color_p, ax=ax, errorbar=None, width=0.3)
-        sns.lineplot(data=df_corr_rt_participant, x='corr', y='rt', hue='participant', alpha = 0.9, palette=color_p, ax=ax, err_style=None, marker='o', markersize=10, linewidth=3)
-        ax.margins(x=0.6, y=0.1)
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('Correct vs Incorrect', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        plt.title('RT by Correct vs Incorrect (breakdown by all participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-                
-    # Performance Over Time
-    toc.h2("3. Performance Over Time")
-    
-    col1, col2 = st.columns(2)
-    with col1:  
-        # Accuracy
-        toc.h3("3.1 Accuracy")
-        df_all_parsed = df_all_parsed.sort_values(['participant', 'idx'])
-        # running average accuracy over idx 
-        df_all_parsed['running_avg_accuracy'] = df_all_parsed.groupby('participant')['corr'].transform(lambda x: x.expanding().mean())
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        df_all_parsed = df_all_parsed.sort_values(['participant', 'idx'])
-        sns.lineplot(data=df_all_parsed, x='idx', y='running_avg_accuracy', hue='participant', palette=color_p, ax=ax)
-        ax.set_xlabel('Index', fontsize=14)
-        ax.set_ylabel('Running Average Accuracy', fontsize=14)
-        plt.title('Running Average Accuracy Over Time (by participant)')
-        
-        # # color background for each block
-        # for idx, block in enumerate(df_all_parsed['mini_block'].unique()):
-        #     block_idx = df_all_parsed[df_all_parsed['mini_block'] == block]['idx']
-        #     ax.axvspan(block_idx.min(), block_idx.max(), alpha=0.1, color=color_p[idx])
-        #     # add block label in the bottom
-        #     ax.text(block_idx.mean(), df_all_parsed['running_avg_accuracy'].min(), block, ha='center', va='center', fontsize=8, color='black')
-            
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-              
-        sns.despine()
-        st.pyplot(fig)
-        
-    with col2:
-        # RT
-        toc.h3("3.2 Reaction Time")
-        # running average RT over idx 
-        df_all_parsed['running_avg_rt'] = df_all_parsed.groupby('participant')['rt'].transform(lambda x: x.expanding().mean())
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        sns.lineplot(data=df_all_parsed, x='idx', y='running_avg_rt', hue='participant', palette=color_p, ax=ax)
-        ax.set_xlabel('Index', fontsize=14)
-        ax.set_ylabel('Running Average RT', fontsize=14)
-        plt.title('Running Average RT Over Time (by participant)')
-        
-        # color background for each block
-        # for idx, block in enumerate(df_all_parsed['block'].unique()):
-        #     block_idx = df_all_parsed[df_all_parsed['block'] == block]['idx']
-        #     ax.axvspan(block_idx.min(), block_idx.max(), alpha=0.1, color=color_p[idx])
-        #     # add block label in the bottom
-        #     ax.text(block_idx.mean(), df_all_parsed['running_avg_rt'].min(), block, ha='center', va='center', fontsize=8, color='black')
-            
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-              
-        sns.despine()
-        st.pyplot(fig)
-        
-    # strategy response vs performance
-    toc.h2("4. Mini-block Strategy vs Performance")
-    
-    df_block_strat = df_all_parsed[['participant', 'mini_block', 'strategy_response']].drop_duplicates()
-    col1, col2 = st.columns(2)
-    with col1:
-        st.write("Count of strategy responses of mini-blcoks:")
-        st.write(df_block_strat['strategy_response'].value_counts().reset_index().sort_values('strategy_response').reset_index(drop=True))
-        
-    with col2:
-        st.write("Count of strategy responses by participants:")
-        df_strategy_cnt_pivot = df_block_strat.pivot_table(index='participant', columns='strategy_response', values='mini_block', aggfunc='count').reset_index().fillna(0)
-        st.dataframe(df_strategy_cnt_pivot)
-    
-    # Accuracy vs Strategy Response
-    toc.h3("4.1 Accuracy")
-    
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        df_all_parsed_for_strat = df_all_parsed.copy()
-        df_strategy_accuracy = df_all_parsed_for_strat.groupby('strategy_response')['corr'].agg(['mean', 'std']).reset_index().sort_values('strategy_response', ascending=True)
-        st.dataframe(df_strategy_accuracy)
-        
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        sns.barplot(data=df_all_parsed, x='strategy_response', y='corr', palette=color_p, ax=ax, capsize=0.1)
-        ax.set_xlabel('Strategy Response', fontsize=14)
-        ax.set_ylabel('Accuracy', fontsize=14)
-        plt.title('Average Accuracy by Strategy Response (agg over participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    with col3:
-        # group by participant, strategy_response and get the accuracy
-        df_strategy_accuracy_participant = df_all_parsed.groupby(['participant', 'strategy_response'])['corr'].mean().reset_index().sort_values('participant')
-        # plot
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        sns.barplot(data=df_strategy_accuracy_participant, x='strategy_response', y='corr', hue='participant', palette= color_p, ax=ax, errorbar=None)
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('Strategy Response', fontsize=14)
-        ax.set_ylabel('Accuracy', fontsize=14)
-        plt.title('Accuracy by Strategy Response (breakdown by all participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-
-        
-    # RT vs Strategy Response
-    toc.h3("4.2 Reaction Time")
-    
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        df_strategy_rt = df_all_parsed_rt.groupby('strategy_response')['rt'].agg(['mean', 'std']).reset_index().sort_values('strategy_response', ascending=True)
-        st.dataframe(df_strategy_rt)
-    
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        sns.barplot(data=df_all_parsed_rt, x='strategy_response', y='rt', palette=color_p, ax=ax, capsize=0.1)
-        ax.set_xlabel('Strategy Response', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        plt.title('Average RT by Strategy Response (agg over participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-    
-    with col3:
-        # group by participant, strategy_response and get the RT
-        df_strategy_rt_participant = df_all_parsed_rt.groupby(['participant', 'strategy_response'])['rt'].mean().reset_index().sort_values('participant')
-        # plot
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        sns.barplot(data=df_strategy_rt_participant, x='strategy_response', y='rt', hue='participant', palette= color_p, ax=ax, errorbar=None)
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('Strategy Response', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        plt.title('RT by Strategy Response (breakdown by all participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    # Vividness vs Performance
-    toc.h2("5. Vividness vs Performance")
-    
-    
-    col1, col2 = st.columns(2)
-    with col1:
-        st.write("Count of vividness responses:")
-        st.write(df_all_parsed['vivid_response'].value_counts().reset_index().sort_values('vivid_response').reset_index(drop=True))
-    
-    with col2:
-        st.write("Count of vividness responses by participants:")
-        df_vivid_cnt_pivot = df_all_parsed.pivot_table(index='participant', columns='vivid_response', values='idx', aggfunc='count').reset_index().fillna(0)
-        st.dataframe(df_vivid_cnt_pivot)
-        
-    # Accuracy vs Vivid Response
-    toc.h3("5.1 Accuracy")
-    
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        df_all_parsed_for_vivid = df_all_parsed.copy()
-        df_vivid_accuracy = df_all_parsed_for_vivid.groupby('vivid_response')['corr'].agg(['mean', 'std']).reset_index().sort_values('vivid_response', ascending=True)
-        st.dataframe(df_vivid_accuracy)
-        
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        sns.barplot(data=df_all_parsed, x='vivid_response', y='corr', palette=color_p, ax=ax, capsize=0.1)
-        ax.set_xlabel('Vivid Response', fontsize=14)
-        ax.set_ylabel('Accuracy', fontsize=14)
-        plt.title('Average Accuracy by Vivid Response (agg over participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    with col3:
-        # group by participant, vivid_response and get the accuracy
-        df_vivid_accuracy_participant = df_all_parsed.groupby(['participant', 'vivid_response'])['corr'].mean().reset_index().sort_values('participant')
-        # plot
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        sns.barplot(data=df_vivid_accuracy_participant, x='vivid_response', y='corr', hue='participant', palette= color_p, ax=ax, errorbar=None)
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('Vivid Response', fontsize=14)
-        ax.set_ylabel('Accuracy', fontsize=14)
-        plt.title('Accuracy by Vivid Response (breakdown by all participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    # RT vs Vivid Response
-    toc.h3("5.2 Reaction Time")
-    
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        df_vivid_rt = df_all_parsed_rt.groupby('vivid_response')['rt'].agg(['mean', 'std']).reset_index().sort_values('vivid_response', ascending=True)
-        st.dataframe(df_vivid_rt)
-        
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        sns.barplot(data=df_all_parsed_rt, x='vivid_response', y='rt', palette=color_p, ax=ax, capsize=0.1)
-        ax.set_xlabel('Vivid Response', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        plt.title('Average RT by Vivid Response (agg over participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    with col3:
-        # group by participant, vivid_response and get the RT
-        df_vivid_rt_participant = df_all_parsed_rt.groupby(['participant', 'vivid_response'])['rt'].mean().reset_index().sort_values('participant')
-        # plot
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        sns.barplot(data=df_vivid_rt_participant, x='vivid_response', y='rt', hue='participant', palette= color_p, ax=ax, errorbar=None)
-        plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-        ax.set_xlabel('Vivid Response', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        plt.title('RT by Vivid Response (breakdown by all participants)')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-    
-    
-    toc.h2("6. ANOVA of Accuracy and RT")
-    
-    # tick box to delete 3Dd_wm block
-    if st.sidebar.checkbox("Delete 3Dd_wm block for ANOVA"):
-        df_all_parsed_3dd_cond = df_all_parsed[df_all_parsed['block'] != '3Dd_wm']
-        df_all_parsed_3dd_cond_rt = df_all_parsed_rt[df_all_parsed_rt['block'] != '3Dd_wm']
-    else:
-        df_all_parsed_3dd_cond = df_all_parsed.copy()
-        df_all_parsed_3dd_cond_rt = df_all_parsed_rt.copy()
-    
-    
-    col1, col2 = st.columns(2)
-    with col1: 
-        # Accuracy
-        toc.h3("6.1 Accuracy")
-        # ANOVA
-        df_all_parsed_for_anova = df_all_parsed_3dd_cond.copy()[['corr', 'wm', 'dimension', 'angle', 'block']]
-        df_all_parsed_for_anova['corr'] = df_all_parsed_for_anova['corr'].astype(float)
-        df_all_parsed_for_anova.dropna(inplace=True)
-        df_all_parsed_for_anova['angle'] = df_all_parsed_for_anova['angle'].astype('str') + 'deg'
-        df_all_parsed_for_anova['angle'] = df_all_parsed_for_anova['angle'].astype('category')
-        df_all_parsed_for_anova['wm'] = df_all_parsed_for_anova['wm'].map({True: 'WM', False: 'Single'})
-        df_all_parsed_for_anova['wm'] = df_all_parsed_for_anova['wm'].astype('category')
-        df_all_parsed_for_anova['dimension'] = df_all_parsed_for_anova['dimension'].astype('category')
-        df_all_parsed_for_anova['block'] = df_all_parsed_for_anova['block'].astype('category')
-        
-        # anova multi-select
-        anova_factors = st.multiselect("Select variables for ANOVA", ['wm', 'dimension', 'angle', 'block'], key = 'anova_factors', default= ['wm', 'dimension', 'angle'])
-        
-        # Generate all possible combinations of variables
-        combs = sum([list(map(list, combinations(anova_factors, i))) for i in range(1, len(anova_factors) + 1)], [])
-
-        # Generate the formula string
-        formula = 'corr ~ ' + ' + '.join(['C(' + '):C('.join(c) + ')' for c in combs])
-        anova_acc = ols(formula, data=df_all_parsed_for_anova).fit()
-        anova_table = sm.stats.anova_lm(anova_acc, typ=2)
-        st.write(anova_table)
-        
-        st.write("Post-hoc test:")
-        factors = st.multiselect("Select factors for post-hoc test", anova_factors, key = 'factors', default= anova_factors)
-        # multi compare
-        tmp = df_all_parsed_for_anova[factors]
-        tmp['group_label'] = tmp.apply(lambda x: '_'.join(x), axis=1)
-        df_all_parsed_for_anova['group_label'] = tmp['group_label']
-        mc = MultiComparison(df_all_parsed_for_anova['corr'], df_all_parsed_for_anova['group_label'])
-        mc_results = mc.tukeyhsd()
-        st.write(mc_results)
-        
-        # 2 way table to see the mean accuracy
-        # selectbox for 2 factors
-        anova_viz_fac1 = st.selectbox("Select factor 1", anova_factors, key = 'anova_viz_fac1', index=0)
-        anova_viz_fac2 = st.selectbox("Select factor 2", anova_factors, key = 'anova_viz_fac2', index=1)
-        if anova_viz_fac1 == anova_viz_fac2:
-            st.write("Please select different factors for 2-way table")
-        else:
-            df_acc_2way = df_all_parsed_for_anova.groupby([anova_viz_fac1, anova_viz_fac2])['corr'].mean().reset_index()
-            df_acc_2way.sort_values([anova_viz_fac1, anova_viz_fac2], inplace=True)
-            df_acc_2way_pivot = df_acc_2way.pivot_table(index=anova_viz_fac1, columns=anova_viz_fac2, values='corr').reset_index()
-            st.write("Mean Accuracy by 2 factors:")
-            st.dataframe(df_acc_2way_pivot)
-            # plot 2 way table as line plot x-axis: factor1, hue: factor2, y: accuracy
-            fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-            sns.lineplot(data=df_acc_2way, x=anova_viz_fac1, y='corr', hue=anova_viz_fac2, palette=color_p, ax=ax, marker='o', markersize=10, linewidth=3)
-            ax.set_xlabel(anova_viz_fac1, fontsize=14)
-            ax.set_ylabel('Accuracy', fontsize=14)
-            # margin
-            ax.margins(x=0.6, y=0.1)
-            plt.title('Accuracy by 2 factors')
-            plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-            sns.despine()
-            st.pyplot(fig)
-            
-      
-    with col2:
-        # RT
-        toc.h3("6.2 Reaction Time")
-        # ANOVA
-        df_all_parsed_rt_for_anova = df_all_parsed_3dd_cond_rt.copy()[['rt', 'wm', 'dimension', 'angle', 'block']]
-        df_all_parsed_rt_for_anova.dropna(inplace=True)
-        df_all_parsed_rt_for_anova['angle'] = df_all_parsed_rt_for_anova['angle'].astype('str') + 'deg'
-        df_all_parsed_rt_for_anova['angle'] = df_all_parsed_rt_for_anova['angle'].astype('category')
-        df_all_parsed_rt_for_anova['wm'] = df_all_parsed_rt_for_anova['wm'].map({True: 'WM', False: 'Single'})
-        df_all_parsed_rt_for_anova['wm'] = df_all_parsed_rt_for_anova['wm'].astype('category')
-        df_all_parsed_rt_for_anova['dimension'] = df_all_parsed_rt_for_anova['dimension'].astype('category')
-        df_all_parsed_rt_for_anova['block'] = df_all_parsed_rt_for_anova['block'].astype('category')
-        
-        # anova multi-select
-        anova_factors_rt = st.multiselect("Select variables for ANOVA", ['wm', 'dimension', 'angle', 'block'], key = 'anova_factors_rt', default= ['wm', 'dimension', 'angle'])
-        
-        # Generate all possible combinations of variables
-        combs_rt = sum([list(map(list, combinations(anova_factors_rt, i))) for i in range(1, len(anova_factors_rt) + 1)], [])
-        formula_rt = 'rt ~ ' + ' + '.join(['C(' + '):C('.join(c) + ')' for c in combs_rt])
-        
-        two_way_anova_rt = ols(formula_rt, data=df_all_parsed_rt_for_anova).fit()
-        anova_table_rt = sm.stats.anova_lm(two_way_anova_rt, typ=2)
-        st.write(anova_table_rt)
-        
-        # post-hoc test
-        st.write("Post-hoc test:")
-        # selectbox for factor
-        factors = st.multiselect("Select factor for post-hoc test", anova_factors_rt, key = 'factors_rt', default= anova_factors_rt)
-        # multi compare
-        tmp = df_all_parsed_rt_for_anova[factors]
-        tmp['group_label'] = tmp.apply(lambda x: '_'.join(x), axis=1)
-        df_all_parsed_rt_for_anova['group_label'] = tmp['group_label']
-        mc_rt = MultiComparison(df_all_parsed_rt_for_anova['rt'], df_all_parsed_rt_for_anova['group_label'])
-        mc_results_rt = mc_rt.tukeyhsd()
-        st.write(mc_results_rt)
-        
-        # 2 way table to see the mean RT
-        # selectbox for 2 factors
-        anova_viz_fac1_rt = st.selectbox("Select factor 1", anova_factors_rt, key = 'anova_viz_fac1_rt', index=0)
-        anova_viz_fac2_rt = st.selectbox("Select factor 2", anova_factors_rt, key = 'anova_viz_fac2_rt', index=1)
-        if anova_viz_fac1_rt == anova_viz_fac2_rt:
-            st.write("Please select different factors for 2-way table")
-        else:
-            df_rt_2way = df_all_parsed_rt_for_anova.groupby([anova_viz_fac1_rt, anova_viz_fac2_rt])['rt'].mean().reset_index()
-            df_rt_2way = df_rt_2way.sort_values([anova_viz_fac1_rt, anova_viz_fac2_rt])
-            df_rt_2way_pivot = df_rt_2way.pivot_table(index=anova_viz_fac1_rt, columns=anova_viz_fac2_rt, values='rt').reset_index()
-            st.write("Mean RT by 2 factors:")
-            st.dataframe(df_rt_2way_pivot)
-            # plot 2 way table as line plot x-axis: factor1, hue: factor2, y: RT
-            fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-            sns.lineplot(data=df_rt_2way, x=anova_viz_fac1_rt, y='rt', hue=anova_viz_fac2_rt, palette=color_p, ax=ax, marker='o', markersize=10, linewidth=3)
-            ax.set_xlabel(anova_viz_fac1_rt, fontsize=14)
-            ax.set_ylabel('RT', fontsize=14)
-            # margin
-            ax.margins(x=0.6, y=0.1)
-            plt.title('RT by 2 factors')
-            plt.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
-            sns.despine()
-            st.pyplot(fig)
-            
-    toc.h2("7. TBT Vividness vs Performance")
-    
-    # reported vividness distribution
-    toc.h3("7.0 Vividness Distribution")
-    col1, col2 = st.columns(2)
-    with col1:
-        # number of vividness responses at every level
-        st.write("Count of vividness responses:")
-        st.write(df_all_parsed['vivid_response'].value_counts().reset_index().sort_values('vivid_response').reset_index(drop=True))
-    with col2:
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        # bar plot of vividness distribution
-        vivid_cnt = df_all_parsed['vivid_response'].value_counts().reset_index().sort_values('vivid_response').reset_index(drop=True)
-        sns.barplot(data=vivid_cnt, x='vivid_response', y='count', palette=color_p, ax=ax)
-        ax.set_xlabel('Vividness', fontsize=14)
-        ax.set_ylabel('Count', fontsize=14)
-        plt.title('Vividness Distribution')
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-    
-    col1, col2 = st.columns(2)
-    # vividness vs accuracy
-    with col1:
-        toc.h3("7.1 Accuracy")
-        # correlation between vividness and accuracy
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        sns.barplot(data=df_all_parsed, x='vivid_response', y='corr', palette=color_p, ax=ax, capsize=0.1)
-        # sns.stripplot(data=df_all_parsed, x='vivid_response', y='corr', ax=ax, palette=color_p, 
-        ax.set_xlabel('Vividness', fontsize=14)
-        ax.set_ylabel('Accuracy', fontsize=14)
-        
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-        
-    with col2:
-        # vividness vs rt
-        toc.h3("7.2 Reaction Time")
-        # correlation between vividness and rt
-        fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-        sns.barplot(data=df_all_parsed_rt, x='vivid_response', y='rt', palette=color_p, ax=ax, capsize=0.1)
-        ax.set_xlabel('Vividness', fontsize=14)
-        ax.set_ylabel('RT', fontsize=14)
-        
-        # remove top and right borders
-        sns.despine()
-        st.pyplot(fig)
-    
-    
-    # Optinal VVIQ - behavior analysis
-    toc.h2("8. Optional VVIQ - Behavior Analysis")
-    # Upload VVIQ data
-    uploaded_file_vviq = st.file_uploader("Please zip the VVIQ data and upload here", type=["zip"])
-    if uploaded_file_vviq:
-        with zipfile.ZipFile(uploaded_file_vviq, "r") as z:
-            z.extractall("vviq")
-        
-        # get the list of unzipped files
-        unzipped_vviq_files = os.listdir("vviq")
-        
-        # read all csv files and parse them
-        df_vviq = pd.DataFrame()
-        success_vviq_parsed_participant = []
-        for file in unzipped_vviq_files:
-            if file.endswith('.csv'):
-                try:
-                    df = pd.read_csv(f"vviq/{file}")
-                    df_vviq = pd.concat([df_vviq, parse_vviq(df)], axis=0)
-                    success_vviq_parsed_participant.append(str(df['participant'].unique()[0]))
-                except:
+            st.write("Parsed data:")
+            show_table(df_all_parsed, 'parsed')
+
+            df_cube = df_cube_all[~df_cube_all['participant'].isin(delete_participants)]
+            # groupby participant, block, wm, rot_type, dimension, angle
+            df_agg_analysis = df_agg_all[~df_agg_all['participant'].isin(delete_participants)].sort_values('participant')
+            st.write("Aggregated performance:")
+            show_table(df_agg_analysis, 'agg')
+    
+        # checkbox to whether or not delete incorrect responses on sidebar
+    
+        delete_incorrect = st.sidebar.checkbox("Delete incorrect responses for RT analysis")
+        with profiler.stage("RT trial filter"):
+            if delete_incorrect:
+                df_all_parsed_rt = df_all_parsed[df_all_parsed['corr'] == 1]
+                df_cube_rt = df_cube[df_cube['corr'] == 1]
+            else:
+                df_all_parsed_rt = df_all_parsed
+                df_cube_rt = df_cube
+        # error bars resample trials by default, or whole participants within each bar
+        ci_cluster = 'participant' if st.sidebar.checkbox("Bootstrap error bars over participants") else None
+        # ANOVA settings (section 6) stay on the sidebar, and keep their values, while the section is closed
+        # tick box to delete 3Dd_wm block
+        delete_3dd_wm = st.sidebar.checkbox("Delete 3Dd_wm block for ANOVA")
+        # participants as the unit of observation instead of trials
+        anova_repeated = st.sidebar.checkbox("Repeated-measures ANOVA over participants")
+
+        # Average Accuracy
+        def section_accuracy():
+            # Broken down by block
+            toc.h3("1.1 By Block")
+            col1, col2, col3 = st.columns(3)
+
+            df_block_accuracy = cohort_rollup('block', 'corr').sort_values('block', ascending=True)
+            with col1:
+                st.dataframe(df_block_accuracy)
+            with col2:
+                show_figure('ci_barplot', get_bar_ci('corr', 'block', ci_cluster), x='block', y='corr', palette=color_p, capsize=0.1,
+                            xlabel='Block', ylabel='Accuracy', title='Average Accuracy by Block (agg over participants)')
+            with col3:
+                # show all participants' accuracy by block
+                df_agg_analysis_plot = df_agg_analysis.sort_values('block')
+                show_figure('barplot', df_agg_analysis_plot, x='block', y='accuracy', hue='participant', palette=color_p, errorbar=None,
+                            xlabel='Block', ylabel='Accuracy', title='Accuracy by Block (breakdown by all participants)', legend=True)
+
+            # Broken down by Single vs WM
+            toc.h3("1.2 By Single vs WM")
+            col1, col2, col3 = st.columns(3)
+            df_wm_accuracy = relabel(cohort_rollup('wm', 'corr'), 'wm', wm_labels)
+            with col1:
+                st.dataframe(df_wm_accuracy)
+            with col2:
+                show_figure('ci_barplot', relabel(get_bar_ci('corr', 'wm', ci_cluster), 'wm', wm_labels), x='wm', y='corr', palette=color_p, capsize=0.05, width=0.4,
+                            xlabel='Single vs WM', ylabel='Accuracy', title='Average Accuracy by Single vs WM (agg over participants)')
+            with col3:
+                # show all participants' accuracy by Single vs WM
+                df_agg_analysis_plot = relabel(df_agg_analysis, 'wm', wm_labels)
+                # sns.barplot(data=df_agg_analysis_plot, x='wm', y='accuracy', hue='participant', palette= color_p, ax=ax, errorbar=None, width=0.3)
+                show_figure('lineplot', df_agg_analysis_plot, x='wm', y='accuracy', hue='participant', alpha=0.9, palette=color_p, err_style=None, marker='o', markersize=10, linewidth=3,
+                            xlabel='Single vs WM', ylabel='Accuracy', title='Accuracy by Single vs WM (breakdown by all participants)', legend=True, margins=(0.6, 0.1))
+
+            # Broken down by 2D vs 3D
+            toc.h3("1.3 By 2D vs 3D")
+            col1, col2, col3 = st.columns(3)
+
+            with col1:
+                df_2d3d_accuracy = cohort_rollup('dimension', 'corr').sort_values('dimension', ascending=True)
+                st.dataframe(df_2d3d_accuracy)
+            with col2:
+                show_figure('ci_barplot', get_bar_ci('corr', 'dimension', ci_cluster), x='dimension', y='corr', palette=color_p, capsize=0.05, width=0.4,
+                            xlabel='2D vs 3D', ylabel='Accuracy', title='Average Accuracy by 2D vs 3D (agg over participants)')
+            with col3:
+                # show all participants' accuracy by 2D vs 3D
+                df_agg_analysis_plot = df_agg_analysis.sort_values('dimension')
+                # sns.barplot(data=df_agg_analysis_plot, x='dimension', y='accuracy', hue='participant', palette= color_p, ax=ax, errorbar=None, width=0.3)
+                show_figure('lineplot', df_agg_analysis_plot, x='dimension', y='accuracy', hue='participant', alpha=0.9, palette=color_p, err_style=None, marker='o', markersize=10, linewidth=3,
+                            xlabel='2D vs 3D', ylabel='Accuracy', title='Accuracy by 2D vs 3D (breakdown by all participants)', legend=True, margins=(0.6, 0.1))
+
+            # By angular difference
+            toc.h3("1.4 By Angular Difference")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                df_angle_accuracy = cohort_rollup('angle', 'corr').astype({'angle': int}).sort_values('angle', ascending=True)
+                st.dataframe(df_angle_accuracy)
+            with col2:
+                show_figure('ci_barplot', get_bar_ci('corr', 'angle', ci_cluster), x='angle', y='corr', palette=color_p, capsize=0.1,
+                            xlabel='Angle', ylabel='Accuracy', title='Average Accuracy by Angular Difference (agg over participants)')
+            with col3:
+                # show all participants' accuracy by angular difference
+                df_agg_analysis_plot = df_agg_analysis.sort_values(['angle', 'participant'])
+                # sns.barplot(data=df_agg_analysis_plot, x='angle', y='accuracy', hue='participant', palette= color_p, ax=ax, errorbar=None)
+                # x tick set to 0, 60, 120, 180
+                show_figure('lineplot', df_agg_analysis_plot, x='angle', y='accuracy', hue='participant', alpha=0.9, palette=color_p, err_style=None, marker='o', markersize=10, linewidth=3,
+                            xlabel='Angle', ylabel='Accuracy', title='Accuracy by Angular Difference (breakdown by all participants)', legend=True, margins=(0.2, 0.1), xticks=[0, 60, 120, 180])
+
+            st.write("Separate by wm and single")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                df_angle_accuracy = relabel(cohort_rollup(['angle', 'wm'], 'corr'), 'wm', wm_labels).sort_values('angle', ascending=True)
+                st.dataframe(df_angle_accuracy)
+            with col2:
+                df_agg_analysis_plot_single = cohort_rollup(['participant', 'angle'], 'corr', std=False, where={'wm': False})
+                show_figure('lineplot', df_agg_analysis_plot_single, x='angle', y='corr', hue='participant', alpha=0.9, palette=color_p, err_style=None, marker='o', markersize=10, linewidth=3,
+                            xlabel='Angle', ylabel='Accuracy', title='Accuracy by Angular Difference (Single)', legend=True, margins=(0.2, 0.1), xticks=[0, 60, 120, 180], ylim=(0.2, 1.2))
+
+            with col3:
+                df_agg_analysis_plot_wm = cohort_rollup(['participant', 'angle'], 'corr', std=False, where={'wm': True})
+                show_figure('lineplot', df_agg_analysis_plot_wm, x='angle', y='corr', hue='participant', alpha=0.9, palette=color_p, err_style=None, marker='o', markersize=10, linewidth=3,
+                            xlabel='Angle', ylabel='Accuracy', title='Accuracy by Angular Difference (WM)', legend=True, margins=(0.2, 0.1), xticks=[0, 60, 120, 180], ylim=(0.2, 1.2))
+
+
+        # Avg response time
+        def section_rt():
+            # Broken down by block
+            toc.h3("2.1 By Block")
+            col1, col2, col3 = st.columns(3)
+
+            with col1:
+                df_block_rt = cohort_rollup('block', 'rt', rt=True).sort_values('block', ascending=True)
+                st.dataframe(df_block_rt)
+            with col2:
+                show_figure('ci_barplot', get_bar_ci('rt', 'block', ci_cluster, rt=True), x='block', y='rt', palette=color_p, capsize=0.1,
+                            xlabel='Block', ylabel='RT', title='Average RT by Block (agg over participants)')
+            with col3:
+                # show all participants' RT by block
+                df_agg_analysis_plot = cohort_rollup(['participant', 'block'], 'rt', std=False, rt=True)
+                show_figure('barplot', df_agg_analysis_plot, x='block', y='rt', hue='participant', palette=color_p, errorbar=None,
+                            xlabel='Block', ylabel='RT', title='RT by Block (breakdown by all participants)', legend=True)
+
+            # Broken down by Single vs WM
+            toc.h3("2.2 By Single vs WM")
+            col1, col2, col3 = st.columns(3)
+
+            with col1:
+                df_wm_rt = relabel(cohort_rollup('wm', 'rt', rt=True), 'wm', wm_labels)
+                st.dataframe(df_wm_rt)
+            with col2:
+                show_figure('ci_barplot', relabel(get_bar_ci('rt', 'wm', ci_cluster, rt=True), 'wm', wm_labels), x='wm', y='rt', palette=color_p, capsize=0.05, width=0.4,
+                            xlabel='Single vs WM', ylabel='RT', title='Average RT by Single vs WM (agg over participants)')
+            with col3:
+                # show all participants' RT by Single vs WM
+                df_agg_analysis_plot = relabel(cohort_rollup(['participant', 'wm'], 'rt', std=False, rt=True), 'wm', wm_labels)
+                # sns.barplot(data=df_agg_analysis_plot, x='wm', y='rt', hue='participant', palette= color_p, ax=ax, errorbar=None, width=0.3)
+                show_figure('lineplot', df_agg_analysis_plot, x='wm', y='rt', hue='participant', alpha=0.9, palette=color_p, err_style=None, marker='o', markersize=10, linewidth=3,
+                            xlabel='Single vs WM', ylabel='RT', title='RT by Single vs WM (breakdown by all participants)', legend=True, margins=(0.6, 0.1))
+
+            # Broken down by 2D vs 3D
+            toc.h3("2.3 By 2D vs 3D")
+            col1, col2, col3 = st.columns(3)
+
+            with col1:
+                df_2d3d_rt = cohort_rollup('dimension', 'rt', rt=True).sort_values('dimension', ascending=True)
+                st.dataframe(df_2d3d_rt)
+            with col2:
+                show_figure('ci_barplot', get_bar_ci('rt', 'dimension', ci_cluster, rt=True), x='dimension', y='rt', palette=color_p, capsize=0.05, width=0.4,
+                            xlabel='2D vs 3D', ylabel='RT', title='Average RT by 2D vs 3D (agg over participants)')
+
+            with col3:
+                # show all participants' RT by 2D vs 3D
+                df_agg_analysis_plot = cohort_rollup(['participant', 'dimension'], 'rt', std=False, rt=True)
+                # sns.barplot(data=df_agg_analysis_plot, x='dimension', y='rt', hue='participant', palette= color_p, ax=ax, errorbar=None, width=0.3)
+                show_figure('lineplot', df_agg_analysis_plot, x='dimension', y='rt', hue='participant', alpha=0.9, palette=color_p, err_style=None, marker='o', markersize=10, linewidth=3,
+                            xlabel='2D vs 3D', ylabel='RT', title='RT by 2D vs 3D (breakdown by all participants)', legend=True, margins=(0.6, 0.1))
+
+            # By angular difference
+            toc.h3("2.4 By Angular Difference")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                df_angle_rt = cohort_rollup('angle', 'rt', rt=True).sort_values('angle', ascending=True)
+                st.dataframe(df_angle_rt)
+            with col2:
+                show_figure('ci_barplot', get_bar_ci('rt', 'angle', ci_cluster, rt=True), x='angle', y='rt', palette=color_p, capsize=0.1,
+                            xlabel='Angle', ylabel='RT', title='Average RT by Angular Difference (agg over participants)')
+            with col3:
+                # show all participants' RT by angular difference
+                df_agg_analysis_plot = cohort_rollup(['participant', 'angle'], 'rt', std=False, rt=True)
+                # sns.barplot(data=df_agg_analysis_plot, x='angle', y='rt', hue='participant', palette= color_p, ax=ax, errorbar=None)
+                show_figure('lineplot', df_agg_analysis_plot, x='angle', y='rt', hue='participant', alpha=0.9, palette=color_p, err_style=None, marker='o', markersize=10, linewidth=3,
+                            xlabel='Angle', ylabel='RT', title='RT by Angular Difference (breakdown by all participants)', legend=True, margins=(0.2, 0.1), xticks=[0, 60, 120, 180])
+
+            st.write("Separate by wm and single")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                df_angle_rt = relabel(cohort_rollup(['angle', 'wm'], 'rt', rt=True), 'wm', wm_labels).sort_values('angle', ascending=True)
+                st.dataframe(df_angle_rt)
+            with col2:
+                df_agg_analysis_plot_single = cohort_rollup(['participant', 'angle'], 'rt', std=False, rt=True, where={'wm': False})
+                # sns.barplot(data=df_agg_analysis_plot, x='angle', y='rt', hue='participant', palette= color_p, ax=ax, errorbar=None)
+                show_figure('lineplot', df_agg_analysis_plot_single, x='angle', y='rt', hue='participant', alpha=0.9, palette=color_p, err_style=None, marker='o', markersize=10, linewidth=3,
+                            xlabel='Angle', ylabel='RT', title='RT by Angular Difference (Single)', legend=True, margins=(0.2, 0.1), xticks=[0, 60, 120, 180], ylim=(0.2, 8))
+
+            with col3:
+                df_agg_analysis_plot_wm = cohort_rollup(['participant', 'angle'], 'rt', std=False, rt=True, where={'wm': True})
+                # sns.barplot(data=df_agg_analysis_plot, x='angle', y='rt', hue='participant', palette= color_p, ax=ax, errorbar=None)
+                show_figure('lineplot', df_agg_analysis_plot_wm, x='angle', y='rt', hue='participant', alpha=0.9, palette=color_p, err_style=None, marker='o', markersize=10, linewidth=3,
+                            xlabel='Angle', ylabel='RT', title='RT by Angular Difference (WM)', legend=True, margins=(0.2, 0.1), xticks=[0, 60, 120, 180], ylim=(0.2, 8))
+
+            # By correct vs incorrect
+            toc.h3("2.5 By Correct vs Incorrect")
+
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                df_corr_rt = relabel(cohort_rollup('corr', 'rt'), 'corr', corr_labels)
+                st.dataframe(df_corr_rt)
+            with col2:
+                show_figure('ci_barplot', relabel(get_bar_ci('rt', 'corr', ci_cluster), 'corr', corr_labels), x='corr', y='rt', palette=color_p, capsize=0.05, width=0.4,
+                            xlabel='Correct vs Incorrect', ylabel='RT', title='Average RT by Correct vs Incorrect (agg over participants)')
+
+            with col3:
+                df_corr_rt_participant = relabel(cohort_rollup(['participant', 'corr'], 'rt', std=False), 'corr', corr_labels)
+                # show all participants' RT by correct vs incorrect
+                # sns.barplot(data=df_corr_rt_participant, x='corr', y='rt', hue='participant', palette= color_p, ax=ax, errorbar=None, width=0.3)
+                show_figure('lineplot', df_corr_rt_participant, x='corr', y='rt', hue='participant', alpha=0.9, palette=color_p, err_style=None, marker='o', markersize=10, linewidth=3,
+                            xlabel='Correct vs Incorrect', ylabel='RT', title='RT by Correct vs Incorrect (breakdown by all participants)', legend=True, margins=(0.6, 0.1))
+
+
+        # Performance Over Time
+        def section_performance_over_time():
+            trajectory_window = st.number_input("Moving average window (trials, 0 = average of all trials so far)", min_value=0, step=10, key=kept('trajectory_window', 0))
+            trajectory_reset = st.checkbox("Restart the average at each mini-block", key=kept('trajectory_reset', False))
+            # accuracy and RT averages in one pass, long sessions thinned to 400 points per participant for drawing
+            df_running = running_mean(df_all_parsed, ['corr', 'rt'], window=trajectory_window or None,
+                                      reset='mini_block' if trajectory_reset else None, max_points=400)
+            df_running = df_running.rename(columns={'corr': 'running_avg_accuracy', 'rt': 'running_avg_rt'})
+
+            col1, col2 = st.columns(2)
+            with col1:  
+                # Accuracy
+                toc.h3("3.1 Accuracy")
+                # running average accuracy over idx, one point per participant and idx so seaborn has nothing to aggregate
+                show_figure('lineplot', df_running, x='idx', y='running_avg_accuracy', hue='participant', palette=color_p, estimator=None,
+                            xlabel='Index', ylabel='Running Average Accuracy', title='Running Average Accuracy Over Time (by participant)', legend=True)
+                # # color background for each block
+                # for idx, block in enumerate(df_all_parsed['mini_block'].unique()):
+                #     block_idx = df_all_parsed[df_all_parsed['mini_block'] == block]['idx']
+                #     ax.axvspan(block_idx.min(), block_idx.max(), alpha=0.1, color=color_p[idx])
+                #     # add block label in the bottom
+                #     ax.text(block_idx.mean(), df_all_parsed['running_avg_accuracy'].min(), block, ha='center', va='center', fontsize=8, color='black')
+
+            with col2:
+                # RT
+                toc.h3("3.2 Reaction Time")
+                # running average RT over idx 
+                show_figure('lineplot', df_running, x='idx', y='running_avg_rt', hue='participant', palette=color_p, estimator=None,
+                            xlabel='Index', ylabel='Running Average RT', title='Running Average RT Over Time (by participant)', legend=True)
+                # color background for each block
+                # for idx, block in enumerate(df_all_parsed['block'].unique()):
+                #     block_idx = df_all_parsed[df_all_parsed['block'] == block]['idx']
+                #     ax.axvspan(block_idx.min(), block_idx.max(), alpha=0.1, color=color_p[idx])
+                #     # add block label in the bottom
+                #     ax.text(block_idx.mean(), df_all_parsed['running_avg_rt'].min(), block, ha='center', va='center', fontsize=8, color='black')
+
+
+        # strategy response vs performance
+        def section_strategy():
+            df_block_strat = df_all_parsed[['participant', 'mini_block', 'strategy_response']].drop_duplicates()
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write("Count of strategy responses of mini-blcoks:")
+                st.write(df_block_strat['strategy_response'].value_counts().reset_index().sort_values('strategy_response').reset_index(drop=True))
+
+            with col2:
+                st.write("Count of strategy responses by participants:")
+                df_strategy_cnt_pivot = df_block_strat.pivot_table(index='participant', columns='strategy_response', values='mini_block', aggfunc='count').reset_index().fillna(0)
+                st.dataframe(df_strategy_cnt_pivot)
+
+            # Accuracy vs Strategy Response
+            toc.h3("4.1 Accuracy")
+
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                df_strategy_accuracy = cohort_rollup('strategy_response', 'corr').sort_values('strategy_response', ascending=True)
+                st.dataframe(df_strategy_accuracy)
+
+            with col2:
+                show_figure('ci_barplot', get_bar_ci('corr', 'strategy_response', ci_cluster), x='strategy_response', y='corr', palette=color_p, capsize=0.1,
+                            xlabel='Strategy Response', ylabel='Accuracy', title='Average Accuracy by Strategy Response (agg over participants)')
+
+            with col3:
+                # group by participant, strategy_response and get the accuracy
+                df_strategy_accuracy_participant = cohort_rollup(['participant', 'strategy_response'], 'corr', std=False).sort_values('participant')
+                # plot
+                show_figure('barplot', df_strategy_accuracy_participant, x='strategy_response', y='corr', hue='participant', palette=color_p, errorbar=None,
+                            xlabel='Strategy Response', ylabel='Accuracy', title='Accuracy by Strategy Response (breakdown by all participants)', legend=True)
+
+
+            # RT vs Strategy Response
+            toc.h3("4.2 Reaction Time")
+
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                df_strategy_rt = cohort_rollup('strategy_response', 'rt', rt=True).sort_values('strategy_response', ascending=True)
+                st.dataframe(df_strategy_rt)
+
+            with col2:
+                show_figure('ci_barplot', get_bar_ci('rt', 'strategy_response', ci_cluster, rt=True), x='strategy_response', y='rt', palette=color_p, capsize=0.1,
+                            xlabel='Strategy Response', ylabel='RT', title='Average RT by Strategy Response (agg over participants)')
+
+            with col3:
+                # group by participant, strategy_response and get the RT
+                df_strategy_rt_participant = cohort_rollup(['participant', 'strategy_response'], 'rt', std=False, rt=True).sort_values('participant')
+                # plot
+                show_figure('barplot', df_strategy_rt_participant, x='strategy_response', y='rt', hue='participant', palette=color_p, errorbar=None,
+                            xlabel='Strategy Response', ylabel='RT', title='RT by Strategy Response (breakdown by all participants)', legend=True)
+
+
+        # Vividness vs Performance
+        def section_vividness():
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write("Count of vividness responses:")
+                st.write(cohort_stats('vivid_response', 'vivid_response')['count'].reset_index())
+
+            with col2:
+                st.write("Count of vividness responses by participants:")
+                df_vivid_cnt_pivot = cohort_stats(['participant', 'vivid_response'], 'vivid_response')['count'].unstack().reset_index().fillna(0)
+                st.dataframe(df_vivid_cnt_pivot)
+
+            # Accuracy vs Vivid Response
+            toc.h3("5.1 Accuracy")
+
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                df_vivid_accuracy = cohort_rollup('vivid_response', 'corr').sort_values('vivid_response', ascending=True)
+                st.dataframe(df_vivid_accuracy)
+
+            with col2:
+                show_figure('ci_barplot', get_bar_ci('corr', 'vivid_response', ci_cluster), x='vivid_response', y='corr', palette=color_p, capsize=0.1,
+                            xlabel='Vivid Response', ylabel='Accuracy', title='Average Accuracy by Vivid Response (agg over participants)')
+
+            with col3:
+                # group by participant, vivid_response and get the accuracy
+                df_vivid_accuracy_participant = cohort_rollup(['participant', 'vivid_response'], 'corr', std=False).sort_values('participant')
+                # plot
+                show_figure('barplot', df_vivid_accuracy_participant, x='vivid_response', y='corr', hue='participant', palette=color_p, errorbar=None,
+                            xlabel='Vivid Response', ylabel='Accuracy', title='Accuracy by Vivid Response (breakdown by all participants)', legend=True)
+
+            # RT vs Vivid Response
+            toc.h3("5.2 Reaction Time")
+
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                df_vivid_rt = cohort_rollup('vivid_response', 'rt', rt=True).sort_values('vivid_response', ascending=True)
+                st.dataframe(df_vivid_rt)
+
+            with col2:
+                show_figure('ci_barplot', get_bar_ci('rt', 'vivid_response', ci_cluster, rt=True), x='vivid_response', y='rt', palette=color_p, capsize=0.1,
+                            xlabel='Vivid Response', ylabel='RT', title='Average RT by Vivid Response (agg over participants)')
+
+            with col3:
+                # group by participant, vivid_response and get the RT
+                df_vivid_rt_participant = cohort_rollup(['participant', 'vivid_response'], 'rt', std=False, rt=True).sort_values('participant')
+                # plot
+                show_figure('barplot', df_vivid_rt_participant, x='vivid_response', y='rt', hue='participant', palette=color_p, errorbar=None,
+                            xlabel='Vivid Response', ylabel='RT', title='RT by Vivid Response (breakdown by all participants)', legend=True)
+
+
+        def section_anova():
+            def get_anova_cells(metric, rt=False, by_participant=False):
+                cells = cohort_stats((['participant'] if by_participant else []) + anova_factor_names, metric, rt)
+                return cells[cells.index.get_level_values('block') != '3Dd_wm'] if delete_3dd_wm else cells
+
+
+            col1, col2 = st.columns(2)
+            with col1: 
+                # Accuracy
+                toc.h3("6.1 Accuracy")
+                # ANOVA
+                # anova multi-select
+                anova_factors = st.multiselect("Select variables for ANOVA", anova_factor_names, key=kept('anova_factors', ['wm', 'dimension', 'angle'], anova_factor_names))
+
+                # full factorial model over the selected variables, fitted on cell statistics of the cube
+                with profiler.stage("ANOVA accuracy"):
+                    anova_cells = get_anova_cells('corr')
+                    if anova_repeated:
+                        show_anova_rm(get_anova_cells('corr', by_participant=True), anova_factors)
+                    else:
+                        anova_table = run_anova(anova_cells, anova_factors)
+                        st.write(anova_table)
+
+                st.write("Post-hoc test:")
+                factors = st.multiselect("Select factors for post-hoc test", anova_factors, key=kept('factors', anova_factors, anova_factors))
+                # Tukey HSD from the group n, mean and variance of the same cells
+                with profiler.stage("Tukey HSD accuracy"):
+                    st.markdown(run_tukey(anova_cells, factors))
+
+                # 2 way table to see the mean accuracy
+                # selectbox for 2 factors
+                anova_viz_fac1 = st.selectbox("Select factor 1", anova_factors, key=kept('anova_viz_fac1', anova_factors[0] if anova_factors else None, anova_factors))
+                anova_viz_fac2 = st.selectbox("Select factor 2", anova_factors, key=kept('anova_viz_fac2', anova_factors[min(1, len(anova_factors) - 1)] if anova_factors else None, anova_factors))
+                if anova_viz_fac1 == anova_viz_fac2:
+                    st.write("Please select different factors for 2-way table")
+                else:
+                    df_acc_2way = cell_means(anova_cells, [anova_viz_fac1, anova_viz_fac2], 'corr')
+                    df_acc_2way_pivot = df_acc_2way.pivot_table(index=anova_viz_fac1, columns=anova_viz_fac2, values='corr').reset_index()
+                    st.write("Mean Accuracy by 2 factors:")
+                    st.dataframe(df_acc_2way_pivot)
+                    # plot 2 way table as line plot x-axis: factor1, hue: factor2, y: accuracy
+                    show_figure('lineplot', df_acc_2way, x=anova_viz_fac1, y='corr', hue=anova_viz_fac2, palette=color_p, marker='o', markersize=10, linewidth=3,
+                                xlabel=anova_viz_fac1, ylabel='Accuracy', title='Accuracy by 2 factors', legend=True, margins=(0.6, 0.1))
+
+
+            with col2:
+                # RT
+                toc.h3("6.2 Reaction Time")
+                # ANOVA
+                # anova multi-select
+                anova_factors_rt = st.multiselect("Select variables for ANOVA", anova_factor_names, key=kept('anova_factors_rt', ['wm', 'dimension', 'angle'], anova_factor_names))
+
+                # full factorial model over the selected variables, fitted on cell statistics of the cube
+                with profiler.stage("ANOVA RT"):
+                    anova_cells_rt = get_anova_cells('rt', rt=True)
+                    if anova_repeated:
+                        show_anova_rm(get_anova_cells('rt', rt=True, by_participant=True), anova_factors_rt)
+                    else:
+                        anova_table_rt = run_anova(anova_cells_rt, anova_factors_rt)
+                        st.write(anova_table_rt)
+
+                # post-hoc test
+                st.write("Post-hoc test:")
+                # selectbox for factor
+                factors = st.multiselect("Select factor for post-hoc test", anova_factors_rt, key=kept('factors_rt', anova_factors_rt, anova_factors_rt))
+                # Tukey HSD from the group n, mean and variance of the same cells
+                with profiler.stage("Tukey HSD RT"):
+                    st.markdown(run_tukey(anova_cells_rt, factors))
+
+                # 2 way table to see the mean RT
+                # selectbox for 2 factors
+                anova_viz_fac1_rt = st.selectbox("Select factor 1", anova_factors_rt, key=kept('anova_viz_fac1_rt', anova_factors_rt[0] if anova_factors_rt else None, anova_factors_rt))
+                anova_viz_fac2_rt = st.selectbox("Select factor 2", anova_factors_rt, key=kept('anova_viz_fac2_rt', anova_factors_rt[min(1, len(anova_factors_rt) - 1)] if anova_factors_rt else None, anova_factors_rt))
+                if anova_viz_fac1_rt == anova_viz_fac2_rt:
+                    st.write("Please select different factors for 2-way table")
+                else:
+                    df_rt_2way = cell_means(anova_cells_rt, [anova_viz_fac1_rt, anova_viz_fac2_rt], 'rt')
+                    df_rt_2way_pivot = df_rt_2way.pivot_table(index=anova_viz_fac1_rt, columns=anova_viz_fac2_rt, values='rt').reset_index()
+                    st.write("Mean RT by 2 factors:")
+                    st.dataframe(df_rt_2way_pivot)
+                    # plot 2 way table as line plot x-axis: factor1, hue: factor2, y: RT
+                    show_figure('lineplot', df_rt_2way, x=anova_viz_fac1_rt, y='rt', hue=anova_viz_fac2_rt, palette=color_p, marker='o', markersize=10, linewidth=3,
+                                xlabel=anova_viz_fac1_rt, ylabel='RT', title='RT by 2 factors', legend=True, margins=(0.6, 0.1))
+
+
+        def section_tbt_vividness():
+            # reported vividness distribution
+            toc.h3("7.0 Vividness Distribution")
+            col1, col2 = st.columns(2)
+            with col1:
+                # number of vividness responses at every level
+                st.write("Count of vividness responses:")
+                vivid_cnt = cohort_stats('vivid_response', 'vivid_response')['count'].reset_index()
+                st.write(vivid_cnt)
+            with col2:
+                # bar plot of vividness distribution
+                show_figure('barplot', vivid_cnt, x='vivid_response', y='count', palette=color_p,
+                            xlabel='Vividness', ylabel='Count', title='Vividness Distribution')
+
+            col1, col2 = st.columns(2)
+            # vividness vs accuracy
+            with col1:
+                toc.h3("7.1 Accuracy")
+                # correlation between vividness and accuracy
+                show_figure('ci_barplot', get_bar_ci('corr', 'vivid_response', ci_cluster), x='vivid_response', y='corr', palette=color_p, capsize=0.1,
+                            xlabel='Vividness', ylabel='Accuracy')
+                # sns.stripplot(data=df_all_parsed, x='vivid_response', y='corr', ax=ax, palette=color_p, 
+
+            with col2:
+                # vividness vs rt
+                toc.h3("7.2 Reaction Time")
+                # correlation between vividness and rt
+                show_figure('ci_barplot', get_bar_ci('rt', 'vivid_response', ci_cluster, rt=True), x='vivid_response', y='rt', palette=color_p, capsize=0.1,
+                            xlabel='Vividness', ylabel='RT')
+
+
+        # Optinal VVIQ - behavior analysis
+        def section_vviq():
+            # Upload VVIQ data
+            uploaded_file_vviq = kept_upload("Please zip the VVIQ data and upload here", 'vviq_upload', type=["zip"])
+            if uploaded_file_vviq:
+                df_vviq_sessions, errors = load_vviq_data(get_upload_hashes(uploaded_file_vviq), uploaded_file_vviq)
+                for file in errors:
                     st.write(f"Error parsing {file}")
-        
-        df_vviq.sort_values('participant', inplace=True)
-        st.write(f"Successfully parsed the vviq data of participants: {success_vviq_parsed_participant}")
-        st.write("VVIQ scores:")
-        st.dataframe(df_vviq)
-        
-        st.write("Merging VVIQ data with the main data...")
-        # check set difference if there are any participants in the main data but not in the vviq data
-        main_participants = set(df_all_parsed['participant'].unique())
-        vviq_participants = set(df_vviq['participant'].unique())
-        diff = main_participants.difference(vviq_participants)
-        if diff:
-            st.write(f"Participants in the main data but not in the VVIQ data: {diff}")
-        else:
-            st.write("All participants in the main data have VVIQ data.")
-            
-        # merge the vviq data with the main data
-        df_all_parsed = pd.merge(df_all_parsed, df_vviq, on='participant', how='left')
-        
-        # VVIQ vs Performance
-        # Accuracy vs VVIQ
-        toc.h3("8.1 Accuracy vs VVIQ")
-        
-        # scatter plot of vviq and average accuracy, also breakdown by block
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            df_vviq_acc = df_all_parsed.groupby('participant')['corr'].mean().reset_index()
-            df_vviq_acc = pd.merge(df_vviq_acc, df_vviq, on='participant', how='left')
-            fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-            sns.regplot(data=df_vviq_acc, x='vviq_score', y='corr', ax=ax, scatter_kws={'s': 15})
-            ax.set_xlabel('VVIQ', fontsize=14)
-            ax.set_ylabel('Accuracy', fontsize=14)
-            plt.title('Accuracy vs VVIQ')
-            # remove top and right borders
-            sns.despine()
-            # plot spearman r in the plot
-            r, p = stats.spearmanr(df_vviq_acc['vviq_score'], df_vviq_acc['corr'])
-            ax.text(0.75, 0.25, f"r = {r:.2f},\np = {p:.2f}", transform=ax.transAxes, fontsize=13, verticalalignment='top')
-            st.pyplot(fig)
-        with col2:
-            # WM
-            df_vviq_acc_wm = df_all_parsed[df_all_parsed['wm'] == True].groupby('participant')['corr'].mean().reset_index()
-            df_vviq_acc_wm = pd.merge(df_vviq_acc_wm, df_vviq, on='participant', how='left')
-            fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-            sns.regplot(data=df_vviq_acc_wm, x='vviq_score', y='corr', ax=ax, scatter_kws={'s': 15})
-            ax.set_xlabel('VVIQ', fontsize=14)
-            ax.set_ylabel('Accuracy', fontsize=14)
-            plt.title('Accuracy vs VVIQ (WM)')
-            # remove top and right borders
-            sns.despine()
-            # plot spearman r in the plot
-            r, p = stats.spearmanr(df_vviq_acc_wm['vviq_score'], df_vviq_acc_wm['corr'])
-            ax.text(0.75, 0.25, f"r = {r:.2f},\np = {p:.2f}", transform=ax.transAxes, fontsize=13, verticalalignment='top')
-            st.pyplot(fig)
-        with col3:
-            # Single
-            df_vviq_acc_single = df_all_parsed[df_all_parsed['wm'] == False].groupby('participant')['corr'].mean().reset_index()
-            df_vviq_acc_single = pd.merge(df_vviq_acc_single, df_vviq, on='participant', how='left')
-            fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-            sns.regplot(data=df_vviq_acc_single, x='vviq_score', y='corr', ax=ax, scatter_kws={'s':15})
-            ax.set_xlabel('VVIQ', fontsize=14)
-            ax.set_ylabel('Accuracy', fontsize=14)
-            plt.title('Accuracy vs VVIQ (Single)')
-            # remove top and right borders
-            sns.despine()
-            # plot spearman r in the plot
-            r, p = stats.spearmanr(df_vviq_acc_single['vviq_score'], df_vviq_acc_single['corr'])
-            ax.text(0.75, 0.25, f"r = {r:.2f},\np = {p:.2f}", transform=ax.transAxes, fontsize=13, verticalalignment='top')
-            st.pyplot(fig)
-        
-        # Accuracy vs VVIQ by block
-        # facet grid plot in seaborn
-        df_vviq_acc_block = df_all_parsed.groupby(['participant', 'block'])['corr'].mean().reset_index()
-        df_vviq_acc_block = pd.merge(df_vviq_acc_block, df_vviq, on='participant', how='left')
-        
-        g = sns.FacetGrid(df_vviq_acc_block, col='block', col_wrap=5, height=3.5, aspect=1)
-        # set the dpi for better resolution
-        g.fig.set_dpi(300)
-        g.map_dataframe(sns.regplot, x='vviq_score', y='corr', scatter_kws={'s': 15})
-        # add spearman r in the plot
-        for ax in g.axes.flat:
-            block = ax.get_title().split('=')[1].strip()
-            df_block = df_vviq_acc_block[df_vviq_acc_block['block'] == block]
-            r, p = stats.spearmanr(df_block['vviq_score'], df_block['corr'])
-            ax.text(0.7, 0.25, f"r = {r:.2f},\np = {p:.2f}", transform=ax.transAxes, fontsize=12, verticalalignment='top')
-        g.set_axis_labels('VVIQ', 'Accuracy')
-        st.pyplot(g)
-        
-        st.write("* r: Spearman correlation coefficient, p: p-value")
-        # RT vs VVIQ
-        toc.h3("8.2 Reaction Time vs VVIQ")
-        
-        # scatter plot of vviq and average rt, also breakdown by block
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            df_vviq_rt = df_all_parsed_rt.groupby('participant')['rt'].mean().reset_index()
-            df_vviq_rt = pd.merge(df_vviq_rt, df_vviq, on='participant', how='left')
-            fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-            sns.regplot(data=df_vviq_rt, x='vviq_score', y='rt', ax=ax, scatter_kws={'s': 15})
-            ax.set_xlabel('VVIQ', fontsize=14)
-            ax.set_ylabel('RT', fontsize=14)
-            plt.title('RT vs VVIQ')
-            # remove top and right borders
-            sns.despine()
-            # plot spearman r in the plot
-            r, p = stats.spearmanr(df_vviq_rt['vviq_score'], df_vviq_rt['rt'])
-            ax.text(0.75, 0.8, f"r = {r:.2f},\np = {p:.2f}", transform=ax.transAxes, fontsize=13, verticalalignment='top')
-            st.pyplot(fig)
-        with col2:
-            # WM
-            df_vviq_rt_wm = df_all_parsed_rt[df_all_parsed_rt['wm'] == True].groupby('participant')['rt'].mean().reset_index()
-            df_vviq_rt_wm = pd.merge(df_vviq_rt_wm, df_vviq, on='participant', how='left')
-            fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-            sns.regplot(data=df_vviq_rt_wm, x='vviq_score', y='rt', ax=ax, scatter_kws={'s': 15})
-            ax.set_xlabel('VVIQ', fontsize=14)
-            ax.set_ylabel('RT', fontsize=14)
-            plt.title('RT vs VVIQ (WM)')
-            # remove top and right borders
-            sns.despine()
-            # plot spearman r in the plot
-            r, p = stats.pearsonr(df_vviq_rt_wm['vviq_score'], df_vviq_rt_wm['rt'])
-            ax.text(0.75, 0.8, f"r = {r:.2f},\np = {p:.2f}", transform=ax.transAxes, fontsize=13, verticalalignment='top')
-            st.pyplot(fig)
-        with col3:
-            # Single
-            df_vviq_rt_single = df_all_parsed_rt[df_all_parsed_rt['wm'] == False].groupby('participant')['rt'].mean().reset_index()
-            df_vviq_rt_single = pd.merge(df_vviq_rt_single, df_vviq, on='participant', how='left')
-            fig, ax = plt.subplots(figsize=(6, 4), dpi=200)
-            sns.regplot(data=df_vviq_rt_single, x='vviq_score', y='rt', ax=ax, scatter_kws={'s': 15})
-            ax.set_xlabel('VVIQ', fontsize=14)
-            ax.set_ylabel('RT', fontsize=14)
-            plt.title('RT vs VVIQ (Single)')
-            # remove top and right borders
-            sns.despine()
-            # plot spearman r in the plot
-            r, p = stats.spearmanr(df_vviq_rt_single['vviq_score'], df_vviq_rt_single['rt'])
-            ax.text(0.75, 0.8, f"r = {r:.2f},\np = {p:.2f}", transform=ax.transAxes, fontsize=13, verticalalignment='top')
-            st.pyplot(fig)
-            
-        # RT vs VVIQ by block
-        # facet grid plot in seaborn
-        df_vviq_rt_block = df_all_parsed_rt.groupby(['participant', 'block'])['rt'].mean().reset_index()
-        df_vviq_rt_block = pd.merge(df_vviq_rt_block, df_vviq, on='participant', how='left')
-        
-        g = sns.FacetGrid(df_vviq_rt_block, col='block', col_wrap=5, height=3.5, aspect=1)
-        # set the dpi for better resolution
-        g.fig.set_dpi(300)
-        g.map_dataframe(sns.regplot, x='vviq_score', y='rt', scatter_kws={'s': 15})
-        # add spearman r in the plot
-        for ax in g.axes.flat:
-            block = ax.get_title().split('=')[1].strip()
-            df_block = df_vviq_rt_block[df_vviq_rt_block['block'] == block]
-            r, p = stats.spearmanr(df_block['vviq_score'], df_block['rt'])
-            ax.text(0.7, 0.8, f"r = {r:.2f},\np = {p:.2f}", transform=ax.transAxes, fontsize=12, verticalalignment='top')
-        g.set_axis_labels('VVIQ', 'RT')
-        st.pyplot(g)
-        st.write("* r: Spearman correlation coefficient, p: p-value")
-            
-    toc.toc()
+
+                st.write(f"Successfully parsed the vviq data of participants: {list(df_vviq_sessions['participant'])}")
+                # participants with more than one VVIQ session keep one score
+                vviq_policy = st.selectbox("Participants with several VVIQ sessions", vviq_policies, key=kept('vviq_policy', vviq_policies[0], vviq_policies),
+                                           format_func=lambda policy: {'latest': 'Latest session', 'first': 'First session', 'mean': 'Mean of sessions'}[policy])
+                repeated = df_vviq_sessions[df_vviq_sessions['participant'].duplicated(keep=False)]
+                if not repeated.empty:
+                    st.write(f"Participants with several VVIQ sessions: {sorted(repeated['participant'].unique())}")
+                    st.dataframe(repeated.sort_values(['participant', 'date']).reset_index(drop=True))
+                df_vviq = dedupe_vviq(df_vviq_sessions, vviq_policy)
+                st.write("VVIQ scores:")
+                st.dataframe(df_vviq)
+
+                st.write("Merging VVIQ data with the main data...")
+                # check set difference if there are any participants in the main data but not in the vviq data
+                main_participants = set(df_all_parsed['participant'].unique())
+                vviq_participants = set(df_vviq['participant'].unique())
+                diff = main_participants.difference(vviq_participants)
+                if diff:
+                    st.write(f"Participants in the main data but not in the VVIQ data: {diff}")
+                else:
+                    st.write("All participants in the main data have VVIQ data.")
+
+                # merge the vviq data with the participant x condition means, one matrix per metric for every panel below
+                vviq_acc = get_vviq_matrix(df_cube, 'corr', df_vviq)
+                vviq_rt = get_vviq_matrix(df_cube_rt, 'rt', df_vviq)
+                vviq_n_perm = 10000 if st.checkbox("Permutation p-values (10,000 shuffles)", key=kept('vviq_permutation', False)) else 0
+                # every coefficient of a metric in one pass, the RT (WM) panel has always shown Pearson's r
+                with profiler.stage("VVIQ correlations"):
+                    corr_acc = run_correlate(vviq_acc.drop(columns='vviq_score'), vviq_acc['vviq_score'], 'spearman', vviq_n_perm)
+                    corr_rt = run_correlate(vviq_rt.drop(columns='vviq_score'), vviq_rt['vviq_score'], 'spearman', vviq_n_perm)
+                    corr_rt_pearson = run_correlate(vviq_rt[[('wm', True)]], vviq_rt['vviq_score'], 'pearson', vviq_n_perm)
+
+                # VVIQ vs Performance
+                # Accuracy vs VVIQ
+                toc.h3("8.1 Accuracy vs VVIQ")
+
+                # scatter plot of vviq and average accuracy, also breakdown by block
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    show_figure('regplot', get_vviq_panel(vviq_acc, ('all', ''), 'corr'), x='vviq_score', y='corr', scatter_kws={'s': 15},
+                                xlabel='VVIQ', ylabel='Accuracy', title='Accuracy vs VVIQ', text=(0.75, 0.25, get_corr_text(corr_acc, ('all', '')), 13))
+                with col2:
+                    # WM
+                    show_figure('regplot', get_vviq_panel(vviq_acc, ('wm', True), 'corr'), x='vviq_score', y='corr', scatter_kws={'s': 15},
+                                xlabel='VVIQ', ylabel='Accuracy', title='Accuracy vs VVIQ (WM)', text=(0.75, 0.25, get_corr_text(corr_acc, ('wm', True)), 13))
+                with col3:
+                    # Single
+                    show_figure('regplot', get_vviq_panel(vviq_acc, ('wm', False), 'corr'), x='vviq_score', y='corr', scatter_kws={'s':15},
+                                xlabel='VVIQ', ylabel='Accuracy', title='Accuracy vs VVIQ (Single)', text=(0.75, 0.25, get_corr_text(corr_acc, ('wm', False)), 13))
+
+                # Accuracy vs VVIQ by block
+                # facet grid plot in seaborn
+                df_vviq_acc_block, block_text = get_vviq_facets(vviq_acc, corr_acc, 'block', 'corr')
+                show_figure('facet_regplot', df_vviq_acc_block, x='vviq_score', y='corr', col='block', col_wrap=5, height=3.5, aspect=1,
+                            scatter_kws={'s': 15}, text=(0.7, 0.25, block_text), axis_labels=('VVIQ', 'Accuracy'), dpi=300)
+
+                st.write(corr_footnote(vviq_n_perm))
+                # RT vs VVIQ
+                toc.h3("8.2 Reaction Time vs VVIQ")
+
+                # scatter plot of vviq and average rt, also breakdown by block
+                col1, col2, col3 = st.columns(3)
+
+                with col1:
+                    show_figure('regplot', get_vviq_panel(vviq_rt, ('all', ''), 'rt'), x='vviq_score', y='rt', scatter_kws={'s': 15},
+                                xlabel='VVIQ', ylabel='RT', title='RT vs VVIQ', text=(0.75, 0.8, get_corr_text(corr_rt, ('all', '')), 13))
+                with col2:
+                    # WM
+                    show_figure('regplot', get_vviq_panel(vviq_rt, ('wm', True), 'rt'), x='vviq_score', y='rt', scatter_kws={'s': 15},
+                                xlabel='VVIQ', ylabel='RT', title='RT vs VVIQ (WM)', text=(0.75, 0.8, get_corr_text(corr_rt_pearson, ('wm', True)), 13))
+                with col3:
+                    # Single
+                    show_figure('regplot', get_vviq_panel(vviq_rt, ('wm', False), 'rt'), x='vviq_score', y='rt', scatter_kws={'s': 15},
+                                xlabel='VVIQ', ylabel='RT', title='RT vs VVIQ (Single)', text=(0.75, 0.8, get_corr_text(corr_rt, ('wm', False)), 13))
+
+                # RT vs VVIQ by block
+                # facet grid plot in seaborn
+                df_vviq_rt_block, block_text = get_vviq_facets(vviq_rt, corr_rt, 'block', 'rt')
+                show_figure('facet_regplot', df_vviq_rt_block, x='vviq_score', y='rt', col='block', col_wrap=5, height=3.5, aspect=1,
+                            scatter_kws={'s': 15}, text=(0.7, 0.8, block_text), axis_labels=('VVIQ', 'RT'), dpi=300)
+                st.write(corr_footnote(vviq_n_perm))
+
+
+        # every section is listed in the TOC, only the open ones are computed
+        toc.section("1. Average Accuracy", section_accuracy)
+        toc.section("2. Average Reaction Time", section_rt)
+        toc.section("3. Performance Over Time", section_performance_over_time)
+        toc.section("4. Mini-block Strategy vs Performance", section_strategy)
+        toc.section("5. Vividness vs Performance", section_vividness)
+        toc.section("6. ANOVA of Accuracy and RT", section_anova)
+        toc.section("7. TBT Vividness vs Performance", section_tbt_vividness)
+        toc.section("8. Optional VVIQ - Behavior Analysis", section_vviq)
+        toc.run(stage=profiler.stage)
+
+        with profiler.stage("Draw figures"):
+            flush_figures(figure_workers)
+        toc.toc()
+        if profile_run:
+            show_profile(profiler, participants=int(df_cube['participant'].nunique()), sections=toc.open_sections)
+    finally:
+        profiler.stop()
     
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""
+Fit time of the section 6 ANOVA modes against the number of participants.
+
+Trials come from synthetic cohorts (synthetic_cohort.py), whose participants differ in speed and ability so
+the repeated-measures fits see between-participant variance. For every cohort size the
+trial-level fits (ols + anova_lm, statsmodels' AnovaRM aggregating the trials, MixedLM with random participant
+intercepts) are timed against the fits on the cube cells the app uses. AnovaRM and MixedLM grow much faster than
+the cohort and are only run up to --anovarm-max / --mixedlm-max participants.
+
+    python benchmarks/anova_fit_time.py
+    python benchmarks/anova_fit_time.py --participants 10 100 1000 --mixedlm-max 20
+"""
+import os
+import io
+import sys
+import time
+import zipfile
+import argparse
+import warnings
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import statsmodels.api as sm
+import statsmodels.formula.api as smf
+from statsmodels.stats.anova import AnovaRM
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+repo_root = os.path.dirname(benchmarks_dir)
+sys.path.insert(0, repo_root)
+sys.path.insert(0, benchmarks_dir)
+
+from synthetic_cohort import make_cohort
+from parsing import parse_ps_files, get_zip_csv_members
+from analysis import build_cube, cell_stats
+from anova import anova_factor_names, anova_type2, anova_rm
+
+factors = ['wm', 'dimension', 'angle']
+
+
+def make_cohort_trials(n_participants, seed=0):
+    cohort, _ = make_cohort(n_participants, seed)
+    with zipfile.ZipFile(io.BytesIO(cohort)) as z:
+        parsed, _, _ = parse_ps_files(z, get_zip_csv_members(z))
+    trials = pd.concat(parsed.values(), ignore_index=True)
+    trials['participant'] = trials['participant'].astype(str)
+    return trials
+
+def timed(f, *args, **kwargs):
+    start = time.perf_counter()
+    f(*args, **kwargs)
+    return time.perf_counter() - start
+
+def fit_ols(trials):
+    terms = [':'.join(f'C({factor})' for factor in term) for i in range(1, len(factors) + 1) for term in combinations(factors, i)]
+    return sm.stats.anova_lm(smf.ols('rt ~ ' + ' + '.join(terms), data=trials).fit(), typ=2)
+
+def fit_anova_rm_trials(trials):
+    return AnovaRM(trials, 'rt', 'participant', within=factors, aggregate_func='mean').fit()
+
+def fit_mixedlm(trials):
+    formula = 'rt ~ ' + ' * '.join(f'C({factor})' for factor in factors)
+    return smf.mixedlm(formula, data=trials, groups=trials['participant']).fit()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--participants', type=int, nargs='+', default=[10, 50, 100, 250, 500])
+    parser.add_argument('--anovarm-max', type=int, default=100, help="largest cohort statsmodels' AnovaRM is fitted on")
+    parser.add_argument('--mixedlm-max', type=int, default=50, help="largest cohort the trial-level MixedLM is fitted on")
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    rows = []
+    for n in args.participants:
+        trials = make_cohort_trials(n).dropna(subset=['rt'] + factors)
+        trials['wm'] = trials['wm'].astype(bool)
+        row = {'participants': n, 'trials': len(trials)}
+        row['ols trials'] = timed(fit_ols, trials)
+        row['AnovaRM trials'] = timed(fit_anova_rm_trials, trials) if n <= args.anovarm_max else np.nan
+        row['MixedLM trials'] = timed(fit_mixedlm, trials) if n <= args.mixedlm_max else np.nan
+
+        start = time.perf_counter()
+        cube = build_cube(trials)
+        row['build cube'] = time.perf_counter() - start
+        cells = cell_stats(cube, anova_factor_names, 'rt')
+        row['type II cells'] = timed(anova_type2, cells, factors)
+        cells = cell_stats(cube, ['participant'] + anova_factor_names, 'rt')
+        row['RM cells'] = timed(anova_rm, cells, factors)
+        rows.append(row)
+        print(pd.DataFrame(rows).set_index('participants').round(3).to_string(), end='\n\n', flush=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,28 @@
+"""
+Headless app runs for the benchmarks: the app goes through streamlit's AppTest with the participant upload
+answered by a zip held in memory and every section opened (?section=all).
+"""
+import io
+import os
+import sys
+
+
+def get_app(app_path, zip_bytes, timeout=3600):
+    import streamlit
+    from streamlit.testing.v1 import AppTest
+
+    def file_uploader(label, *args, **kwargs):
+        # only the participant upload is answered, the optional VVIQ section stays empty
+        if label.startswith("Upload the zipped"):
+            f = io.BytesIO(zip_bytes)
+            f.name = 'cohort.zip'
+            # one upload for the whole session, as st.file_uploader reports it across reruns
+            f.file_id = 'cohort'
+            return f
+        return None
+
+    streamlit.file_uploader = file_uploader
+    sys.path.insert(0, os.path.dirname(os.path.abspath(app_path)))
+    at = AppTest.from_file(os.path.abspath(app_path), default_timeout=timeout)
+    at.query_params['section'] = 'all'
+    return at
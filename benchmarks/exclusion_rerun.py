@@ -0,0 +1,78 @@
+"""
+Rerun time of the app after the "Delete participants" selection changes, on a synthetic cohort.
+
+The app runs headless through streamlit's AppTest with every section open (?section=all). After a first
+run, which parses the cohort and fills the caches, participants are excluded a few at a time and each
+rerun is timed, then they are brought back. With the stage profiler on, the slowest stages of the last
+rerun are printed as well, and every rerun is split into the report itself and the drawing of its figures.
+
+    python benchmarks/exclusion_rerun.py --participants 500
+    python benchmarks/exclusion_rerun.py --participants 500 --app /path/to/other/checkout/app.py
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+repo_root = os.path.dirname(benchmarks_dir)
+sys.path.insert(0, benchmarks_dir)
+
+from synthetic_cohort import make_cohort
+from app_harness import get_app
+
+
+def timed_run(at):
+    start = time.perf_counter()
+    at.run()
+    if at.exception:
+        raise RuntimeError([e.value for e in at.exception])
+    return time.perf_counter() - start
+
+def get_split(at):
+    # seconds of the report's top-level stages, and of the figures drawn at the end of the page
+    frame = at.sidebar.dataframe[-1].value
+    top = frame[frame['depth'] == 0]
+    figures = top.loc[top['stage'] == 'Draw figures', 'seconds'].sum()
+    return top['seconds'].sum() - figures, figures
+
+def show_rerun(at, n_excluded, profile):
+    seconds = timed_run(at)
+    split = " (report {:.2f} s, figures {:.2f} s)".format(*get_split(at)) if profile else ""
+    print(f"{n_excluded:4d} excluded: rerun {seconds:.2f} s{split}", flush=True)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--participants', type=int, default=500)
+    parser.add_argument('--steps', type=int, nargs='+', default=[1, 5, 20], help="participants excluded at each rerun")
+    parser.add_argument('--app', default=os.path.join(repo_root, 'app.py'))
+    parser.add_argument('--profile', action='store_true', help="turn the app's stage profiler on (needs a checkout that has it)")
+    args = parser.parse_args()
+
+    zip_bytes, _ = make_cohort(args.participants)
+    os.environ['PS_TRIAL_STORE'] = tempfile.mkdtemp(prefix='ps_store_')
+    os.environ['PS_PROFILE_LOG'] = os.path.join(tempfile.mkdtemp(prefix='ps_profile_'), 'profile_log.jsonl')
+    at = get_app(args.app, zip_bytes)
+    print(f"participants: {args.participants}, first run: {timed_run(at):.1f} s")
+    if args.profile:
+        [checkbox for checkbox in at.sidebar.checkbox if checkbox.label.startswith("Profile stages")][0].check()
+        print(f"profiler on: {timed_run(at):.1f} s")
+
+    select = [widget for widget in at.multiselect if widget.label.startswith("Delete participants")][0]
+    participants = list(select.options)
+    excluded = list(select.value)
+    for step in args.steps:
+        excluded = excluded + [p for p in participants if p not in excluded][:step]
+        select = [widget for widget in at.multiselect if widget.label.startswith("Delete participants")][0]
+        select.set_value(excluded)
+        show_rerun(at, len(excluded), args.profile)
+    select = [widget for widget in at.multiselect if widget.label.startswith("Delete participants")][0]
+    select.set_value([])
+    show_rerun(at, 0, args.profile)
+    if args.profile:
+        frame = at.sidebar.dataframe[-1].value
+        print(frame.sort_values('seconds', ascending=False).head(12).round(3).to_string(index=False))
+
+if __name__ == '__main__':
+    main()
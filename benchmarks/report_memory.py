@@ -0,0 +1,50 @@
+"""
+Peak memory of one full report run on a synthetic cohort.
+
+The cohort comes from synthetic_cohort.py, the app runs headless through streamlit's AppTest with
+the upload widget answered by the generated zip and every section opened (?section=all, see app_harness.py).
+
+    python benchmarks/report_memory.py --participants 500
+    python benchmarks/report_memory.py --participants 500 --app /path/to/other/checkout/app.py
+"""
+import os
+import sys
+import time
+import argparse
+import resource
+import tempfile
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+repo_root = os.path.dirname(benchmarks_dir)
+sys.path.insert(0, benchmarks_dir)
+
+from synthetic_cohort import make_cohort
+from app_harness import get_app
+
+
+def run_report(app_path, zip_bytes):
+    at = get_app(app_path, zip_bytes)
+    at.run()
+    return [e.value for e in at.exception]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--participants', type=int, default=500)
+    parser.add_argument('--app', default=os.path.join(repo_root, 'app.py'))
+    args = parser.parse_args()
+
+    zip_bytes, _ = make_cohort(args.participants)
+    # parse from scratch, a warm trial store would hide the parsing peak
+    os.environ['PS_TRIAL_STORE'] = tempfile.mkdtemp(prefix='ps_store_')
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    exceptions = run_report(args.app, zip_bytes)
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"participants: {args.participants}, zip: {len(zip_bytes) / 2**20:.1f} MB")
+    print(f"report run: {elapsed:.1f} s, peak RSS: {peak / 1024:.0f} MB (before the run: {rss_before / 1024:.0f} MB)")
+    if exceptions:
+        print("exceptions:", exceptions)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+"""
+Scaling of the report pipeline with the cohort size, on synthetic PsychoPy cohorts (synthetic_cohort.py).
+
+Every cohort size runs in its own process, so the peak RSS of one size is not hidden by a larger one run
+before it. The stages are those of the headless report (ps_analysis): parsing the zipped exports, the cube
+and summary tables, the Type II and repeated-measures ANOVAs, the Tukey HSD post-hoc tests and the VVIQ
+correlations. Stage times, participants and trials per second and the peak RSS of the run are printed
+(parsing workers, with --workers above 1, are not in the RSS); --json keeps them as a baseline that a later
+run can be held against with --baseline.
+
+    python benchmarks/scaling.py
+    python benchmarks/scaling.py --participants 200 500 1000 --json before.json
+    python benchmarks/scaling.py --participants 200 500 1000 --baseline before.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import resource
+import tempfile
+import warnings
+import subprocess
+
+import pandas as pd
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+repo_root = os.path.dirname(benchmarks_dir)
+sys.path.insert(0, repo_root)
+sys.path.insert(0, benchmarks_dir)
+
+stages = ['parse', 'aggregate', 'anova', 'posthoc', 'correlation']
+
+
+def run_cohort(n_participants, seed=0, workers=None, n_perm=0):
+    from synthetic_cohort import make_cohort
+    from ps_analysis import load_trials, load_vviq, summary_tables, vviq_tables
+    from analysis import build_cube, cell_stats
+    from anova import anova_factor_names, anova_type2, anova_rm, tukey_hsd
+
+    factors = ['wm', 'dimension', 'angle']
+    row = {'participants': n_participants}
+    start = time.perf_counter()
+    cohort, vviq = make_cohort(n_participants, seed)
+    row['generate'] = time.perf_counter() - start
+    with tempfile.TemporaryDirectory() as folder:
+        paths = os.path.join(folder, 'cohort.zip'), os.path.join(folder, 'vviq.zip')
+        for path, data in zip(paths, (cohort, vviq)):
+            with open(path, 'wb') as f:
+                f.write(data)
+        row['zip_mb'] = len(cohort) / 2**20
+
+        start = time.perf_counter()
+        df_all_parsed, _, _ = load_trials(paths[0], workers)
+        row['parse'] = time.perf_counter() - start
+        row['trials'] = len(df_all_parsed)
+
+        start = time.perf_counter()
+        df_cube = build_cube(df_all_parsed)
+        summary_tables(df_cube, df_cube)
+        row['aggregate'] = time.perf_counter() - start
+
+        cells = {metric: (cell_stats(df_cube, anova_factor_names, metric), cell_stats(df_cube, ['participant'] + anova_factor_names, metric))
+                 for metric in ('corr', 'rt')}
+        start = time.perf_counter()
+        for trial_cells, participant_cells in cells.values():
+            anova_type2(trial_cells, factors)
+            anova_rm(participant_cells, factors)
+        row['anova'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for trial_cells, _ in cells.values():
+            tukey_hsd(trial_cells, factors)
+        row['posthoc'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        df_vviq, _ = load_vviq(paths[1])
+        vviq_tables(df_cube, df_cube, df_vviq, n_perm)
+        row['correlation'] = time.perf_counter() - start
+
+    row['total'] = sum(row[stage] for stage in stages)
+    row['participants/s'] = n_participants / row['total']
+    row['trials/s'] = row['trials'] / row['total']
+    # ru_maxrss is in kB on Linux
+    row['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return row
+
+def run_in_process(n_participants, args):
+    command = [sys.executable, os.path.abspath(__file__), '--one', str(n_participants), '--seed', str(args.seed), '--n-perm', str(args.n_perm)]
+    if args.workers:
+        command += ['--workers', str(args.workers)]
+    result = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--participants', type=int, nargs='+', default=[10, 50, 200, 500])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None, help="processes parsing the participant files")
+    parser.add_argument('--n-perm', type=int, default=0, help="permutation p-values of the VVIQ correlations")
+    parser.add_argument('--json', help="write the rows to this file")
+    parser.add_argument('--baseline', help="rows of an earlier --json run, printed as speed-ups of every stage")
+    parser.add_argument('--one', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore')
+
+    if args.one:
+        # the child process of one cohort size, its row goes back to the parent as JSON
+        print(json.dumps(run_cohort(args.one, args.seed, args.workers, args.n_perm)))
+        return
+
+    rows = []
+    for n in args.participants:
+        rows.append(run_in_process(n, args))
+        print(pd.DataFrame(rows).set_index('participants').round(3).to_string(), end='\n\n', flush=True)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(rows, f, indent=1)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = pd.DataFrame(json.load(f)).set_index('participants')
+        current = pd.DataFrame(rows).set_index('participants')
+        columns = stages + ['total']
+        speedup = (baseline[columns] / current[columns]).dropna(how='all')
+        speedup['peak_rss_mb'] = current['peak_rss_mb'] - baseline['peak_rss_mb']
+        print("speed-up against the baseline (peak RSS as the difference in MB):")
+        print(speedup.round(2).to_string())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,176 @@
+"""
+Parse and figure pools inside a live `streamlit run` server, against the same report drawn in-process.
+
+Both pools fork the server process, which is multi-threaded and has matplotlib imported. Each mode starts its
+own server (fresh trial store) and opens --sessions sessions at once over Streamlit's websocket; every session
+uploads a synthetic cohort, runs the report with every section open (?section=all) and reruns it once. In the
+'pools' mode both worker inputs keep their sidebar defaults, or are set to --workers; in 'serial' they are 1.
+The sidebar caps the workers at os.cpu_count(), so on a single-CPU host both modes draw in-process.
+Run times, exceptions, the most forked workers seen at once and a digest of the drawn images (Streamlit names
+media files by their content) are printed; the digests must be the same in every mode and session.
+
+    python benchmarks/server_pools.py --participants 40 --sessions 2
+    python benchmarks/server_pools.py --participants 40 --workers 4
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import socket
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.request
+
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+repo_root = os.path.dirname(benchmarks_dir)
+sys.path.insert(0, benchmarks_dir)
+
+from synthetic_cohort import make_cohort
+
+worker_labels = ("Workers for parsing participant files", "Workers for drawing figures")
+
+
+def get_free_port():
+    with socket.socket() as s:
+        s.bind(('localhost', 0))
+        return s.getsockname()[1]
+
+def start_server(app_path, port, log):
+    env = dict(os.environ, PS_TRIAL_STORE=tempfile.mkdtemp(prefix='ps_store_'),
+               PS_PROFILE_LOG=os.path.join(tempfile.mkdtemp(prefix='ps_profile_'), 'profile_log.jsonl'))
+    server = subprocess.Popen([sys.executable, '-m', 'streamlit', 'run', os.path.abspath(app_path), '--server.headless', 'true',
+                               '--server.port', str(port), '--server.enableXsrfProtection', 'false',
+                               '--server.enableCORS', 'false', '--browser.gatherUsageStats', 'false'],
+                              cwd=os.path.dirname(os.path.abspath(app_path)), env=env, stdout=log, stderr=subprocess.STDOUT)
+    for _ in range(120):
+        try:
+            urllib.request.urlopen(f'http://localhost:{port}/_stcore/health').read()
+            return server
+        except OSError:
+            time.sleep(0.5)
+    server.kill()
+    raise RuntimeError("the streamlit server did not start")
+
+def watch_children(pid, stop, seen):
+    # most processes forked by the server at once (pgrep -P lists the children on Linux and macOS)
+    while not stop.is_set():
+        out = subprocess.run(['pgrep', '-P', str(pid)], capture_output=True, text=True).stdout.split()
+        seen['max'] = max(seen['max'], len(out))
+        time.sleep(0.05)
+
+async def read_run(ws):
+    # forward messages up to the end of a script run (or a file url response), with the elements drawn
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    run = {'elements': []}
+    while True:
+        msg = ForwardMsg()
+        msg.ParseFromString(await ws.recv())
+        kind = msg.WhichOneof('type')
+        if kind == 'new_session':
+            run['session_id'] = msg.new_session.initialize.session_id
+        elif kind == 'delta' and msg.delta.WhichOneof('type') == 'new_element':
+            run['elements'].append(msg.delta.new_element)
+        elif kind == 'file_urls_response':
+            run['file_urls'] = msg.file_urls_response.file_urls[0]
+            return run
+        elif kind == 'script_finished':
+            return run
+
+def upload(port, file_urls, data):
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="UploadedFile"; filename="cohort.zip"\r\n'
+            f'Content-Type: application/zip\r\n\r\n').encode() + data + f'\r\n--{boundary}--\r\n'.encode()
+    url = file_urls.upload_url if file_urls.upload_url.startswith('http') else f'http://localhost:{port}{file_urls.upload_url}'
+    request = urllib.request.Request(url, data=body, method='PUT', headers={'Content-Type': f'multipart/form-data; boundary={boundary}'})
+    urllib.request.urlopen(request).read()
+
+async def run_session(port, zip_bytes, workers, n_runs=2):
+    import websockets
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+
+    runs = []
+    async with websockets.connect(f'ws://localhost:{port}/_stcore/stream', max_size=None, subprotocols=['streamlit']) as ws:
+        back = BackMsg()
+        back.rerun_script.query_string = 'section=all'
+        await ws.send(back.SerializeToString())
+        first = await read_run(ws)
+        widgets = {getattr(e, e.WhichOneof('type')).label: getattr(e, e.WhichOneof('type')).id for e in first['elements']
+                   if e.WhichOneof('type') in ('file_uploader', 'number_input')}
+        uploader = [widget_id for label, widget_id in widgets.items() if label.startswith("Upload the zipped")][0]
+
+        back = BackMsg()
+        back.file_urls_request.request_id = uuid.uuid4().hex
+        back.file_urls_request.file_names.append('cohort.zip')
+        back.file_urls_request.session_id = first['session_id']
+        await ws.send(back.SerializeToString())
+        file_urls = (await read_run(ws))['file_urls']
+        await asyncio.to_thread(upload, port, file_urls, zip_bytes)
+
+        back = BackMsg()
+        back.rerun_script.query_string = 'section=all'
+        state = back.rerun_script.widget_states.widgets.add()
+        state.id = uploader
+        info = state.file_uploader_state_value.uploaded_file_info.add()
+        info.name, info.size, info.file_id = 'cohort.zip', len(zip_bytes), file_urls.file_id
+        info.file_urls.CopyFrom(file_urls)
+        if workers is not None:
+            for label in worker_labels:
+                state = back.rerun_script.widget_states.widgets.add()
+                state.id, state.double_value = widgets[label], workers
+        for _ in range(n_runs):
+            start = time.perf_counter()
+            await ws.send(back.SerializeToString())
+            elements = (await read_run(ws))['elements']
+            kinds = [e.WhichOneof('type') for e in elements]
+            images = sorted(img.url for e in elements if e.WhichOneof('type') == 'imgs' for img in e.imgs.imgs)
+            runs.append({'seconds': round(time.perf_counter() - start, 2), 'images': len(images),
+                         'digest': hashlib.sha256('\n'.join(images).encode()).hexdigest()[:16],
+                         'exceptions': [e.exception.message for e, kind in zip(elements, kinds) if kind == 'exception']})
+    return runs
+
+def run_mode(app_path, zip_bytes, n_sessions, workers):
+    port = get_free_port()
+    with tempfile.TemporaryFile() as log:
+        server = start_server(app_path, port, log)
+        stop, seen = threading.Event(), {'max': 0}
+        threading.Thread(target=watch_children, args=(server.pid, stop, seen), daemon=True).start()
+        try:
+            async def run_all():
+                return await asyncio.gather(*(run_session(port, zip_bytes, workers) for _ in range(n_sessions)))
+            sessions = asyncio.run(run_all())
+        finally:
+            stop.set()
+            server.terminate()
+            server.wait()
+        log.seek(0)
+        tracebacks = log.read().decode(errors='replace').count('Traceback')
+    return sessions, seen['max'], tracebacks
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--participants', type=int, default=40)
+    parser.add_argument('--sessions', type=int, default=2, help="sessions run at the same time on one server")
+    parser.add_argument('--workers', type=int, help="workers of both pools in the 'pools' mode, at most the sidebar's max (os.cpu_count()); default: the sidebar default")
+    parser.add_argument('--app', default=os.path.join(repo_root, 'app.py'))
+    args = parser.parse_args()
+
+    zip_bytes, _ = make_cohort(args.participants)
+    print(f"participants: {args.participants}, sessions: {args.sessions}, cpus: {os.cpu_count()}")
+    digests = set()
+    for mode, workers in (('pools', args.workers), ('serial', 1)):
+        sessions, max_children, tracebacks = run_mode(args.app, zip_bytes, args.sessions, workers)
+        for i, runs in enumerate(sessions):
+            for j, run in enumerate(runs):
+                print(json.dumps({'mode': mode, 'session': i, 'run': 'first' if j == 0 else 'rerun', **run}), flush=True)
+                digests.add(run['digest'])
+        print(f"{mode}: most forked workers at once {max_children}, tracebacks in the server log {tracebacks}", flush=True)
+    print("same images in every mode and session:", "yes" if len(digests) == 1 else "no")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,285 @@
+"""
+Synthetic PsychoPy cohorts: participant and VVIQ files shaped like the exports in temp/ and vviq/.
+
+Every participant file has the 189-column header of the template export and its 349 rows: the start and
+instruction screens, the 16 shuffled mini-blocks of the 2D/3Dp x single/WM blocks, the 3Dd practice screens,
+the 4 mini-blocks of the 3Dd WM block and the end screen. A mini-block is 16 trials (every angle x mirror
+twice) followed by its strategy row. The responses come from a simple model: each participant has an
+ability, a speed and a vividness trait, accuracy falls and RT grows with the angle, WM and 3D, some key
+presses are missed and the vividness/strategy key lists hold one to three keys like the real ones.
+
+    python benchmarks/synthetic_cohort.py --participants 200 --out cohort.zip --vviq-out vviq.zip
+"""
+import io
+import os
+import glob
+import zipfile
+import argparse
+import datetime
+
+import numpy as np
+import pandas as pd
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+angles = [0, 60, 120, 180]
+# scale keys from the lowest to the highest score, see parsing.key_scores
+scale_keys = ['comma', 'period', 'slash', 'rshift']
+obj_ids = [f'obj{i}' for i in range(1, 10)] + [f'sm{i}' for i in range(1, 6)]
+# mini-block kind -> dimension, rot_type, wm, response routine, path prefix
+mini_block_kinds = {
+    '2d_single': ('2D', None, False, 'simu', '2D'),
+    '2d_wm': ('2D', None, True, 'wm', '2D'),
+    '3dp_single': ('3D', 'p', False, 'simu', '3Dp'),
+    '3dp_wm': ('3D', 'p', True, 'wm', '3Dp'),
+    '3dd_wm': ('3D', 'd', True, '3dd', '3Dd'),
+}
+messages = {
+    '2d_single': '*Break*\nEntering the 2D SIMULTANEOUS block\nRotation is Counter/Clockwise\nPress <4> to continue',
+    '2d_wm': '*Break*\nEntering the 2D WORKING MEMORY block\nRotation is Counter/Clockwise\nPress <4> to continue\n               ',
+    '3dp_single': '*Break*\nEntering the 3D SIMULTANEOUS block\nRotation is Counter/Clockwise\nPress <4> to continue',
+    '3dp_wm': '*Break*\nEntering the 3D WORKING MEMORY block\nRotation is Counter/Clockwise\nPress <4> to continue',
+    '3dd_wm': 'You are entering 3D depth single block',
+}
+# routine -> (key component, [(timing column, seconds after the routine start)], response start, trial loop)
+routines = {
+    'simu': ('key_resp', [('routine_simu.started', 0.0), ('text.started', 0.1), ('image.started', 0.9),
+                          ('key_resp.started', 0.9), ('text.stopped', 1.0)], 0.9, 'simu_trials_loop'),
+    'wm': ('key_resp_3', [('routine_wm.started', 0.0), ('text_4.started', 0.15), ('img1.started', 1.0), ('text_4.stopped', 1.2),
+                          ('img1.stopped', 5.0), ('text_5.started', 5.0), ('text_5.stopped', 6.0), ('img2.started', 6.0),
+                          ('key_resp_3.started', 6.0)], 6.0, 'wm_trials_loop'),
+    '3dd': ('key_resp_6', [('routine_3Dd_wm.started', 0.0), ('text_8.started', 0.07), ('image_6.started', 0.95),
+                           ('text_8.stopped', 1.05), ('image_6.stopped', 4.95), ('text_12.started', 4.95),
+                           ('image_7.started', 5.95), ('key_resp_6.started', 5.95), ('text_12.stopped', 5.95)], 5.95, 'first_3Dd_wm'),
+}
+routine_names = {'simu': 'routine_simu', 'wm': 'routine_wm', '3dd': 'routine_3Dd_wm'}
+vviq_items = 16
+
+
+def get_template_header(pattern, source_dir):
+    # the column names of a real export, the trailing empty column of PsychoPy's trailing comma included
+    path = sorted(glob.glob(os.path.join(source_dir, pattern)))[0]
+    return list(pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns)
+
+def get_traits(rng):
+    return {'ability': rng.normal(0, 0.6), 'speed': rng.normal(0, 0.25), 'vividness': rng.normal(0, 0.8)}
+
+def get_key_list(rng, last_score, n_keys):
+    # "['period', 'slash']": earlier presses are random, the last one carries the score
+    keys = [scale_keys[k] for k in rng.integers(0, 4, n_keys - 1)] + [scale_keys[last_score - 1]]
+    rts = np.sort(rng.uniform(0.2, 2.0, n_keys))
+    return (str(keys), '[' + ', '.join(repr(float(rt)) for rt in rts) + ']', '[' + ', '.join(['None'] * n_keys) + ']')
+
+def get_scale_response(rng, trait, center=2.5):
+    return int(np.clip(np.round(center + trait + rng.normal(0, 0.7)), 1, 4))
+
+def get_image_paths(prefix, angle, mirror, wm, pair_id, obj_id, orientation1, orientation2):
+    obj = obj_id.replace('obj', 'obj_').replace('sm', 'sm_')
+    if wm:
+        folder = f"{prefix}_{angle}_{'M_' if mirror else ''}WM"
+        return (f"output_pairs/{folder}/{folder}_{pair_id:02d}_1_{obj}_{orientation1}deg.png",
+                f"output_pairs/{folder}/{folder}_{pair_id:02d}_2_{obj}_{orientation2}deg.png")
+    folder = f"{prefix}_{angle}{'m' if mirror else ''}"
+    if angle == 0:
+        return f"output_pairs/{folder}/{folder}_{obj}_{orientation1}deg.png", None
+    return f"output_pairs/{folder}/{folder}_{obj}_{orientation1}_to_{orientation2}deg.png", None
+
+def make_trial_rows(rng, kind, mini_block, traits, clock, loop_index, n_trial):
+    dimension, rot_type, wm, routine, prefix = mini_block_kinds[kind]
+    key_component, timings, response_offset, trial_loop = routines[routine]
+    design = [(angle, mirror) for angle in angles for mirror in (False, True)] * 2
+    rows = []
+    for i in rng.permutation(len(design)):
+        angle, mirror = design[i]
+        orientation1 = int(rng.integers(0, 18)) * 20
+        orientation2 = (orientation1 + angle) % 360
+        pair_id = int(rng.integers(1, 33)) if wm else None
+        obj_id = obj_ids[rng.integers(0, len(obj_ids))]
+        image_path_1, image_path_2 = get_image_paths(prefix, angle, mirror, wm, pair_id, obj_id, orientation1, orientation2)
+        correct_ans = 'period' if mirror else 'comma'
+        difficulty = angle / 90 + 0.4 * wm + 0.3 * (dimension == '3D') + 0.4 * (rot_type == 'd')
+        correct = rng.random() < 1 / (1 + np.exp(-(2.6 + traits['ability'] - difficulty)))
+        rt = float(np.exp(0.7 + traits['speed'] + 0.2 * angle / 60 + 0.3 * (dimension == '3D') - 0.35 * wm + rng.normal(0, 0.4)))
+        # the simultaneous routine times out now and then, leaving the keys empty
+        missed = routine == 'simu' and rng.random() < 0.05
+        key = correct_ans if correct else ('comma' if correct_ans == 'period' else 'period')
+
+        row = {'condition_file': f'mini_blocks/{kind}_mini_block_{mini_block}.xlsx', 'message_to_show': messages[kind],
+               'repN_wm': int(wm), 'repN_single': int(not wm), 'repN_break': 0, 'dimension': dimension, 'rot_type': rot_type,
+               'angle': float(angle), 'mirror': mirror, 'wm': wm, 'pair_id': pair_id, 'obj_id': obj_id,
+               'orientation1': float(orientation1), 'orientation2': None if (angle == 0 and not wm) else float(orientation2),
+               'image_path_1': image_path_1, 'image_path_2': image_path_2, 'marker_id': int(rng.integers(1, 2200)),
+               'correctAns': correct_ans}
+        start = clock[0]
+        if not rows:
+            row.update({'before_block_instr.started': start, 'text_13.started': start + 0.03, 'key_resp_7.started': start + 0.03,
+                        'before_block_instr.stopped': start + 6.0, 'key_resp_7.keys': 'rshift', 'key_resp_7.rt': 5.97})
+            start += 6.0
+        row.update({column: start + offset for column, offset in timings})
+        row['thisRow.t'] = start + timings[1][1]
+        response_start = start + response_offset
+        row[f'{key_component}.keys'] = None if missed else key
+        row[f'{key_component}.corr'] = int(correct and not missed)
+        row[f'{key_component}.rt'] = None if missed else rt
+        row[f'{routine_names[routine]}.stopped'] = response_start + (8.0 if missed else rt)
+
+        vivid_start = row[f'{routine_names[routine]}.stopped']
+        row.update({'vividness.started': vivid_start, 'image_vivid.started': vivid_start + 0.03,
+                    'key_resp_vivid_slider_control.started': vivid_start + 0.03, 'vividness.stopped': vivid_start + 2.0,
+                    'ITI.started': vivid_start + 2.0, 'text_2.started': vivid_start + 2.03, 'ITI.stopped': vivid_start + 4.0})
+        # about one trial in ten gets no vividness answer in time
+        if rng.random() > 0.1:
+            score = get_scale_response(rng, traits['vividness'])
+            keys, rts, durations = get_key_list(rng, score, rng.choice([1, 2, 3], p=[0.8, 0.15, 0.05]))
+            row.update({'vivid_response': float(score), 'key_resp_vivid_slider_control.keys': keys,
+                        'key_resp_vivid_slider_control.rt': rts, 'key_resp_vivid_slider_control.duration': durations})
+        row.update(get_loop_counters(kind, trial_loop, loop_index, n_trial + len(rows)))
+        rows.append(row)
+        clock[0] = vivid_start + 4.0
+    return rows
+
+def get_loop_counters(kind, trial_loop, loop_index, n_trial):
+    block_loop = 'block_loop_3dd' if kind == '3dd_wm' else 'block_loop_main'
+    counters = {f'{block_loop}.{name}': loop_index for name in ('thisTrialN', 'thisN', 'thisIndex')}
+    counters[f'{block_loop}.thisRepN'] = 0
+    if trial_loop is not None:
+        counters.update({f'{trial_loop}.{name}': n_trial for name in ('thisTrialN', 'thisN', 'thisIndex')})
+        counters[f'{trial_loop}.thisRepN'] = 0
+    return counters
+
+def make_strategy_row(rng, kind, mini_block, traits, clock, loop_index):
+    start = clock[0]
+    row = {'condition_file': f'mini_blocks/{kind}_mini_block_{mini_block}.xlsx', 'message_to_show': messages[kind],
+           'repN_wm': int(mini_block_kinds[kind][2]), 'repN_single': int(not mini_block_kinds[kind][2]), 'repN_break': 0,
+           'strat.started': start, 'image_strat.started': start + 0.03, 'key_resp_strat_control.started': start + 0.03,
+           'strat.stopped': start + 8.0, 'break_2.started': start + 8.0, 'break_2.stopped': start + 8.0}
+    row.update(get_loop_counters(kind, None, loop_index, 0))
+    if rng.random() > 0.05:
+        score = get_scale_response(rng, traits['ability'] / 2)
+        keys, rts, durations = get_key_list(rng, score, rng.choice([1, 2], p=[0.9, 0.1]))
+        row.update({'strategy_response': float(score), 'key_resp_strat_control.keys': keys,
+                    'key_resp_strat_control.rt': rts, 'key_resp_strat_control.duration': durations})
+    clock[0] = start + 8.1
+    return row
+
+def make_screen_row(clock, routine, components, key_component, key='rshift'):
+    # one instruction screen answered with a key
+    start = clock[0]
+    rt = 2.0
+    row = {f'{routine}.started': start, f'{routine}.stopped': start + rt}
+    row.update({f'{component}.started': start + 0.03 for component in components})
+    row.update({f'{key_component}.keys': key, f'{key_component}.rt': rt})
+    clock[0] = start + rt
+    return row
+
+def make_participant_frame(participant, header, seed=0, date=None):
+    """One participant's PsychoPy export as a frame with the template header, reproducible from (seed, participant)."""
+    rng = np.random.default_rng([seed, participant])
+    traits = get_traits(rng)
+    clock = [0.07]
+    rows = [make_screen_row(clock, 'start', ['text_start', 'key_resp_start'], 'key_resp_start'),
+            make_screen_row(clock, 'instructions', ['key_resp_12', 'image_8'], 'key_resp_12'),
+            make_screen_row(clock, 'instructions_2', ['image_9', 'key_resp_20'], 'key_resp_20'),
+            make_screen_row(clock, 'instructions_3', ['image_10', 'key_resp_21'], 'key_resp_21')]
+    main_blocks = [(kind, i) for kind in mini_block_kinds if kind != '3dd_wm' for i in range(4)]
+    n_trials = {'simu': 0, 'wm': 0, '3dd': 0}
+    for loop_index, j in enumerate(rng.permutation(len(main_blocks))):
+        kind, mini_block = main_blocks[j]
+        routine = mini_block_kinds[kind][3]
+        rows += make_trial_rows(rng, kind, mini_block, traits, clock, loop_index, n_trials[routine])
+        n_trials[routine] += 16
+        rows.append(make_strategy_row(rng, kind, mini_block, traits, clock, loop_index))
+    rows += [make_screen_row(clock, 'practice_3Dd_screen', ['image_11', 'key_resp_22'], 'key_resp_22'),
+             make_screen_row(clock, 'practice_1_3Dd', ['image_12', 'key_resp_23'], 'key_resp_23'),
+             make_screen_row(clock, 'practice_2_3Dd', ['image_13', 'key_resp_24'], 'key_resp_24'),
+             make_screen_row(clock, 'wm_3Dd_screen', ['text_16', 'key_resp_11'], 'key_resp_11')]
+    for loop_index in range(4):
+        rows += make_trial_rows(rng, '3dd_wm', loop_index, traits, clock, loop_index, n_trials['3dd'])
+        n_trials['3dd'] += 16
+        rows.append(make_strategy_row(rng, '3dd_wm', loop_index, traits, clock, loop_index))
+    rows.append(make_screen_row(clock, 'end', ['text_22', 'key_resp_18'], 'key_resp_18', key='return'))
+
+    date = date or get_session_date(participant)
+    df = pd.DataFrame(rows, columns=header)
+    # written zero-padded like the real exports, '005' / '001'
+    df['participant'] = f'{participant:03d}'
+    df['session'] = '001'
+    df['date'] = date
+    df['expName'] = 'ps'
+    df['psychopyVersion'] = '2023.2.3'
+    df['frameRate'] = 30 + rng.normal(0, 0.05)
+    df['expStart'] = f"{date[:10]} {date[11:]}001 -0400"
+    return df, traits
+
+def get_session_date(participant, first=datetime.datetime(2024, 6, 1, 9, 0)):
+    return (first + datetime.timedelta(hours=3 * participant)).strftime('%Y-%m-%d_%Hh%M.%S.%f')[:-3]
+
+def make_vviq_frame(participant, header, traits, seed=0):
+    # 16 answers on the 1-5 scale, higher for participants with a higher vividness trait
+    rng = np.random.default_rng([seed, participant, 1])
+    date = get_session_date(participant)
+    responses = np.clip(np.round(3.5 + traits['vividness'] + rng.normal(0, 0.8, vviq_items)), 1, 5)
+    rts = rng.uniform(3, 40, vviq_items)
+    starts = 12.1 + np.concatenate([[0], np.cumsum(rts)[:-1]])
+    df = pd.DataFrame(index=range(vviq_items), columns=header)
+    df['item'] = [f'Item {i + 1} :' for i in range(vviq_items)]
+    for column in ('trials.thisRepN',):
+        df[column] = 0
+    for column in ('trials.thisTrialN', 'trials.thisN', 'trials.thisIndex'):
+        df[column] = range(vviq_items)
+    df['thisRow.t'] = starts + 0.04
+    df['vviqblock.started'] = starts
+    df['vviqblock.stopped'] = starts + rts
+    df['vviq_response'] = responses
+    df['key_resp_vviq_continue.keys'] = 'rshift'
+    df['key_resp_vviq_continue.rt'] = rts
+    df.loc[0, ['senario', 'instruction_vviq.started', 'instruction_vviq.stopped']] = ['Think of some relative or friend.', 0.01, 12.1]
+    df['participant'] = f'{participant:03d}'
+    df['session'] = '001'
+    df['date'] = date
+    df['expName'] = 'VVIQ'
+    df['psychopyVersion'] = '2023.2.3'
+    df['frameRate'] = 30.0
+    df['expStart'] = f"{date[:10]} {date[11:]}001 -0400"
+    return df
+
+def to_csv_bytes(df):
+    # PsychoPy writes a UTF-8 BOM and ends every line with a comma (the unnamed last column)
+    df = df.rename(columns={df.columns[-1]: ''}) if df.columns[-1].startswith('Unnamed') else df
+    return df.to_csv(index=False).encode('utf-8-sig')
+
+def make_cohort(n_participants, seed=0, first_id=1000, source_dir=os.path.join(repo_root, 'temp'),
+                vviq_dir=os.path.join(repo_root, 'vviq')):
+    """
+    Zip bytes of `n_participants` synthetic participant files and of their VVIQ files, ids from `first_id`.
+    Returns (cohort zip, vviq zip).
+    """
+    header = get_template_header('*_ps_*.csv', source_dir)
+    vviq_header = get_template_header('*_VVIQ_*.csv', vviq_dir)
+    buffers = io.BytesIO(), io.BytesIO()
+    with zipfile.ZipFile(buffers[0], 'w', zipfile.ZIP_DEFLATED) as z, zipfile.ZipFile(buffers[1], 'w', zipfile.ZIP_DEFLATED) as z_vviq:
+        for participant in range(first_id, first_id + n_participants):
+            df, traits = make_participant_frame(participant, header, seed)
+            date = df['date'].iloc[0]
+            z.writestr(f'cohort/{participant:03d}_ps_{date}.csv', to_csv_bytes(df))
+            z_vviq.writestr(f'vviq/{participant:03d}_VVIQ_{date}.csv', to_csv_bytes(make_vviq_frame(participant, vviq_header, traits, seed)))
+    return buffers[0].getvalue(), buffers[1].getvalue()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--participants', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', required=True, help="zip of the participant files")
+    parser.add_argument('--vviq-out', help="zip of the VVIQ files")
+    args = parser.parse_args()
+
+    cohort, vviq = make_cohort(args.participants, args.seed)
+    with open(args.out, 'wb') as f:
+        f.write(cohort)
+    if args.vviq_out:
+        with open(args.vviq_out, 'wb') as f:
+            f.write(vviq)
+    print(f"{args.participants} participants written to {args.out} ({len(cohort) / 2**20:.1f} MB)")
+
+if __name__ == '__main__':
+    main()
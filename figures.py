@@ -0,0 +1,119 @@
+import io
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import seaborn as sns
+import matplotlib
+import matplotlib.pyplot as plt
+
+color_p = ["#1984c5", "#22a7f0", "#63bff0", "#a7d5ed", "#e2e2e2", "#e1a692", "#de6e56", "#e14b31", "#c23728"]
+
+# st.pyplot saved figures with these settings, cached images keep the same look
+savefig_kwargs = dict(format='png', bbox_inches='tight', dpi=200)
+
+
+def make_spec(plot, data, xlabel=None, ylabel=None, title=None, legend=False, margins=None, xticks=None, ylim=None,
+              text=None, axis_labels=None, figsize=(6, 4), dpi=200, **args):
+    """
+    Describe a figure instead of drawing it: `plot` is a seaborn function name (or 'facet_regplot', 'ci_barplot'),
+    `args` its keyword arguments, the rest the axes decorations used across the report.
+    Only the columns the plot uses are kept from `data`.
+    """
+    columns = [args[key] for key in ('x', 'y', 'hue', 'col') if isinstance(args.get(key), str)]
+    if plot == 'ci_barplot':
+        columns += ['low', 'high']
+    columns = list(dict.fromkeys(col for col in columns if col in data.columns))
+    return dict(plot=plot, data=data[columns], args=args, xlabel=xlabel, ylabel=ylabel, title=title, legend=legend,
+                margins=margins, xticks=xticks, ylim=ylim, text=text, axis_labels=axis_labels, figsize=figsize, dpi=dpi)
+
+def spec_fingerprint(spec):
+    # hash of the plotted frame slice (values, order and dtypes) plus every plot argument
+    data = spec['data']
+    h = hashlib.sha256()
+    h.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    h.update(repr(list(data.columns)).encode())
+    h.update(repr(list(data.dtypes.astype(str))).encode())
+    h.update(repr(sorted((key, value) for key, value in spec.items() if key != 'data')).encode())
+    return h.hexdigest()
+
+def draw_facet_regplot(spec):
+    data, args = spec['data'], dict(spec['args'])
+    x, y, col = args.pop('x'), args.pop('y'), args.pop('col')
+    scatter_kws = args.pop('scatter_kws', None)
+    g = sns.FacetGrid(data, col=col, **args)
+    # set the dpi for better resolution
+    g.fig.set_dpi(spec['dpi'])
+    g.map_dataframe(sns.regplot, x=x, y=y, scatter_kws=scatter_kws)
+    # add spearman r in the plot, the annotation of each facet comes with the spec
+    text_x, text_y, labels = spec['text']
+    for ax in g.axes.flat:
+        value = ax.get_title().split('=')[1].strip()
+        ax.text(text_x, text_y, labels[value], transform=ax.transAxes, fontsize=12, verticalalignment='top')
+    g.set_axis_labels(*spec['axis_labels'])
+    return g.fig
+
+def draw_ci_barplot(spec, ax):
+    # bars from a bootstrap_ci summary, error bars drawn the way sns.barplot draws its own
+    data, args = spec['data'], dict(spec['args'])
+    capsize = args.pop('capsize', 0)
+    # bars in row order, so the error bars below line up with them
+    sns.barplot(data=data, ax=ax, errorbar=None, order=list(data[args['x']]), **args)
+    err_kws = dict(color='.26', linewidth=plt.rcParams['lines.linewidth'] * 1.8)
+    for pos, (low, high) in enumerate(zip(data['low'], data['high'])):
+        ax.plot([pos, pos], [low, high], **err_kws)
+        if capsize:
+            for value in (low, high):
+                ax.plot([pos - capsize / 2, pos + capsize / 2], [value, value], **err_kws)
+
+def draw_figure(spec):
+    if spec['plot'] == 'facet_regplot':
+        return draw_facet_regplot(spec)
+    fig, ax = plt.subplots(figsize=spec['figsize'], dpi=spec['dpi'])
+    if spec['plot'] == 'ci_barplot':
+        draw_ci_barplot(spec, ax)
+    else:
+        getattr(sns, spec['plot'])(data=spec['data'], ax=ax, **spec['args'])
+    if spec['margins'] is not None:
+        ax.margins(x=spec['margins'][0], y=spec['margins'][1])
+    if spec['xticks'] is not None:
+        ax.set_xticks(spec['xticks'])
+    if spec['ylim'] is not None:
+        ax.set_ylim(*spec['ylim'])
+    if spec['legend']:
+        ax.legend(bbox_to_anchor=(0.85, 1), loc=2, borderaxespad=0.)
+    if spec['xlabel'] is not None:
+        ax.set_xlabel(spec['xlabel'], fontsize=14)
+    if spec['ylabel'] is not None:
+        ax.set_ylabel(spec['ylabel'], fontsize=14)
+    if spec['title'] is not None:
+        ax.set_title(spec['title'])
+    if spec['text'] is not None:
+        text_x, text_y, s, fontsize = spec['text']
+        ax.text(text_x, text_y, s, transform=ax.transAxes, fontsize=fontsize, verticalalignment='top')
+    # remove top and right borders
+    sns.despine(ax=ax)
+    return fig
+
+def render_png(spec):
+    fig = draw_figure(spec)
+    try:
+        buf = io.BytesIO()
+        fig.savefig(buf, **savefig_kwargs)
+        return buf.getvalue()
+    finally:
+        plt.close(fig)
+
+def use_agg():
+    # workers only ever write PNGs, no GUI backend
+    matplotlib.use('Agg')
+
+def render_pngs(specs, max_workers=None):
+    """PNG bytes of every spec in input order, drawn in a pool of processes on the Agg backend."""
+    specs = list(specs)
+    if max_workers == 1 or len(specs) <= 1:
+        return [render_png(spec) for spec in specs]
+    mp_context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context, initializer=use_agg) as executor:
+        return list(executor.map(render_png, specs))
@@ -0,0 +1,250 @@
+import io
+import os
+import re
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import numpy as np
+
+shared_columns = ['idx','dimension', 'rot_type', 'angle', 'mirror', 'wm', 
+                  'pair_id', 'obj_id', 'orientation1', 'orientation2', 'image_path_1', 'image_path_2',
+                  'marker_id', 'correctAns', 'vivid_response', 'key_resp_vivid_slider_control.keys', 'key_resp_vivid_slider_control.rt', 'participant', 'condition_file']
+
+key_columns = ['key_resp.keys', 'key_resp_3.keys', 'key_resp_6.keys']
+rt_columns = ['key_resp.rt', 'key_resp_3.rt', 'key_resp_6.rt']
+
+strat_columns = ['key_resp_strat_control.keys', 'key_resp_strat_control.rt']
+
+block_names = ['2D_single', '2D_wm', '3Dp_single', '3Dp_wm', '3Dd_single', '3Dd_wm']
+# alphabetical categories keep the sort order the report has always used
+block_dtype = pd.CategoricalDtype(sorted(block_names))
+
+# explicit dtypes for the PsychoPy columns parse_excel reads, everything else is never loaded
+ps_dtypes = {
+    'dimension': 'category', 'rot_type': 'category', 'participant': 'category',
+    'angle': 'float64', 'mirror': 'boolean', 'wm': 'boolean',
+    'pair_id': 'float64', 'obj_id': 'object', 'orientation1': 'float64', 'orientation2': 'float64',
+    'image_path_1': 'object', 'image_path_2': 'object', 'marker_id': 'float64', 'correctAns': 'object',
+    'vivid_response': 'float64', 'key_resp_vivid_slider_control.keys': 'object', 'key_resp_vivid_slider_control.rt': 'object',
+    'condition_file': 'object',
+    'key_resp.keys': 'object', 'key_resp_3.keys': 'object', 'key_resp_6.keys': 'object',
+    'key_resp.rt': 'float64', 'key_resp_3.rt': 'float64', 'key_resp_6.rt': 'float64',
+    'key_resp_strat_control.keys': 'object', 'key_resp_strat_control.rt': 'object',
+}
+
+def get_required_columns():
+    # 'idx' is derived from the row order, not read from the file
+    return [col for col in shared_columns if col != 'idx'] + key_columns + rt_columns + strat_columns
+
+def read_ps_csv(filepath_or_buffer):
+    required_columns = get_required_columns()
+    df = pd.read_csv(filepath_or_buffer, usecols=lambda col: col in required_columns, dtype=ps_dtypes)
+    missing_columns = [col for col in required_columns if col not in df.columns]
+    if missing_columns:
+        raise ValueError(f"missing required column(s): {missing_columns}")
+    # plain True/False objects, the report relabels these columns with replace()/map()
+    df[['mirror', 'wm']] = df[['mirror', 'wm']].astype(object)
+    # '005' -> '5', matching how participants are labelled everywhere else in the report
+    df['participant'] = df['participant'].cat.rename_categories(lambda p: str(int(p)) if str(p).isdigit() else str(p))
+    return df
+
+def get_ans_key(df):
+    # coalesce the three response routines column-wise: take the first non-empty key and the rt recorded with it
+    keys = df[key_columns]
+    answered = keys.notna() & (keys != '')
+    first_answered = (answered & (answered.cumsum(axis=1) == 1)).to_numpy()
+    ans_key = keys.where(first_answered).bfill(axis=1).iloc[:, 0]
+    rt = df[rt_columns].where(first_answered).bfill(axis=1).iloc[:, 0]
+    return ans_key, rt
+
+# score of the last key pressed on the 4-point vividness / strategy scales
+key_scores = {'rshift': 4, 'slash': 3, 'period': 2, 'comma': 1}
+key_list_pattern = r"\[\s*(?:'[^']*'\s*(?:,\s*'[^']*'\s*)*)?\]"
+last_key_pattern = r"'([^']*)'\s*\]$"
+
+def decode_last_key(keys):
+    """
+    Decode a column of PsychoPy key lists such as "['comma', 'rshift']" into the score of the last key, in one pass.
+    Missing/'None'/empty cells, empty lists and unknown keys give NaN.
+    Returns (scores, malformed) where malformed holds the non-empty cells that are not a key list.
+    """
+    keys = keys.astype('string').str.strip()
+    present = keys.notna() & (keys != 'None') & (keys != '')
+    well_formed = keys.str.fullmatch(key_list_pattern).fillna(False).astype(bool)
+    last_key = keys.where(present & well_formed).str.extract(last_key_pattern, expand=False)
+    scores = last_key.astype(object).map(key_scores).astype(float)
+    return scores, keys[present & ~well_formed]
+
+def describe_malformed(malformed):
+    # one line per column of a file, shown next to the parse errors
+    return [f"{count} malformed '{column}' cell(s) ignored: {values}" for column, (count, values) in malformed.items()]
+
+def get_block(df):
+    is_2d = df['dimension'] == '2D'
+    is_3dp = (df['dimension'] == '3D') & (df['rot_type'] == 'p')
+    is_3dd = (df['dimension'] == '3D') & (df['rot_type'] == 'd')
+    is_wm = df['wm'] == True
+    is_single = df['wm'] == False
+    conditions = [is_2d & is_single, is_2d & is_wm, is_3dp & is_single, is_3dp & is_wm, is_3dd & is_single, is_3dd & is_wm]
+    return np.select(conditions, block_names, default=None)
+
+def get_corr(df):
+    conditions = [df['ans_key'].isna(), df['correctAns'] == df['ans_key']]
+    return np.select(conditions, [np.nan, 1], default=0)
+
+
+# bump whenever the output of parse_excel changes, it invalidates the parsed-trial store
+PARSER_VERSION = 2
+
+def parse_excel(df):
+    """
+    Trial table of one PsychoPy export, and {column: (count, sorted distinct values)} of the key-list cells
+    that could not be decoded and were left out (vividness and strategy responses).
+    """
+    malformed = {}
+    df_blocks = df[~df['dimension'].isna()].reset_index(drop=True)
+    df_strat = df[~df['key_resp_strat_control.keys'].isna()]
+    df_strat = df_strat[['condition_file', 'key_resp_strat_control.keys', 'key_resp_strat_control.rt']]
+    df_blocks['idx'] = df_blocks.index
+    # build the trial table column-wise instead of cell by cell
+    df_parsed = df_blocks[shared_columns].copy()
+    df_parsed['ans_key'], df_parsed['rt'] = get_ans_key(df_blocks)
+
+    # replace all 'None' values with np.nan
+    df_parsed.replace('None', np.nan, inplace=True)
+    df_parsed['vivid_response'], cells = decode_last_key(df_parsed['key_resp_vivid_slider_control.keys'])
+    if len(cells):
+        malformed['key_resp_vivid_slider_control.keys'] = (len(cells), sorted(cells.unique()))
+
+    # fill na values in 'rot_type', 'pair_id', 'orientation1', 'orientation2', 'image_path_2' with not applicable
+    na_cols = ['rot_type', 'pair_id', 'orientation1', 'orientation2', 'image_path_2']
+    # stored as strings so the columns stay single-typed (Arrow/Parquet cannot hold 20.0 and 'na' in one column)
+    df_parsed[na_cols] = df_parsed[na_cols].astype(str).where(df_parsed[na_cols].notna(), 'na')
+
+    df_parsed['block'] = pd.Categorical(get_block(df_parsed), dtype=block_dtype)
+    df_parsed['corr'] = get_corr(df_parsed)
+    
+    df_parsed = df_parsed.merge(df_strat, on='condition_file', how='left')
+    df_parsed['strategy_response'], cells = decode_last_key(df_parsed['key_resp_strat_control.keys'])
+    if len(cells):
+        malformed['key_resp_strat_control.keys'] = (len(cells), sorted(cells.unique()))
+    
+    df_parsed['mini_block'] = df_parsed['condition_file'].str.split('/').str[1].str.split('.').str[0]
+    df_parsed.drop(columns=['condition_file'], inplace=True)
+    return df_parsed, malformed
+
+vviq_columns = ['participant', 'vviq_response', 'date']
+vviq_policies = ['latest', 'first', 'mean']
+
+def read_vviq_csv(source):
+    # only the columns the score needs, the item texts and timings are never loaded
+    return pd.read_csv(source, usecols=lambda col: col in vviq_columns, dtype={'vviq_response': 'float64', 'date': 'object'})
+
+def parse_vviq_files(zip_file, names):
+    """
+    VVIQ score of every session file in an open zip, read member by member without extracting.
+    The answers of all files are summed in one groupby. Returns (one row per file with file, participant,
+    date and vviq_score, {name: exception}).
+    """
+    frames, errors = [], {}
+    for name in names:
+        try:
+            with zip_file.open(name) as f:
+                df = read_vviq_csv(f)
+            if df['participant'].dropna().empty:
+                raise ValueError("no participant id")
+            frames.append(df.assign(file=os.path.basename(name)))
+        except Exception as e:
+            errors[name] = e
+    if not frames:
+        return pd.DataFrame(columns=['file', 'participant', 'date', 'vviq_score']), errors
+    df_all = pd.concat(frames, ignore_index=True)
+    df_sessions = df_all.groupby('file', sort=False).agg(participant=('participant', 'first'), date=('date', 'first'),
+                                                          vviq_score=('vviq_response', 'sum')).reset_index()
+    df_sessions['participant'] = df_sessions['participant'].astype(str)
+    return df_sessions, errors
+
+def dedupe_vviq(df_sessions, policy='latest'):
+    """
+    One VVIQ score per participant: the `policy` 'latest' or 'first' session by date, or the 'mean' of all sessions.
+    Returns the participant/vviq_score frame sorted by participant.
+    """
+    if policy not in vviq_policies:
+        raise ValueError(f"unknown VVIQ dedup policy {policy!r}, expected one of {vviq_policies}")
+    if policy == 'mean':
+        df_vviq = df_sessions.groupby('participant', as_index=False)['vviq_score'].mean()
+    else:
+        started = pd.to_datetime(df_sessions['date'], format='%Y-%m-%d_%Hh%M.%S.%f', errors='coerce')
+        df_vviq = df_sessions.assign(started=started).sort_values(['participant', 'started'], kind='stable')
+        df_vviq = df_vviq.drop_duplicates('participant', keep='last' if policy == 'latest' else 'first')[['participant', 'vviq_score']]
+    return df_vviq.sort_values('participant').reset_index(drop=True)
+
+
+def parse_ps_file(source):
+    # source is a path, an open file or the raw bytes of a csv; returns (parsed trials, malformed cells)
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    return parse_excel(read_ps_csv(source))
+
+def get_zip_csv_members(zip_file):
+    # csv members of an uploaded zip, without the __MACOSX/._* resource forks macOS adds
+    return [
+        info.filename for info in zip_file.infolist()
+        if not info.is_dir() and info.filename.endswith('.csv')
+        and not info.filename.startswith('__MACOSX/') and not os.path.basename(info.filename).startswith('._')
+    ]
+
+def parse_ps_files(zip_file, names, max_workers=None):
+    """
+    Parse PsychoPy exports straight from the members of an open zip, fanning them out over a process pool.
+    Returns ({name: parsed df}, {name: exception}, {name: malformed cells}), all in input order; the last
+    only has the files with malformed cells, see parse_excel.
+    """
+    names = list(names)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(names)))
+
+    results, errors = {}, {}
+    if max_workers == 1:
+        for name in names:
+            try:
+                with zip_file.open(name) as f:
+                    results[name] = parse_ps_file(f)
+            except Exception as e:
+                errors[name] = e
+        return split_results(results, errors)
+
+    # fork where available: spawn/forkserver workers re-import the streamlit script (as __mp_main__) before running anything
+    mp_context = multiprocessing.get_context('fork') if 'fork' in multiprocessing.get_all_start_methods() else None
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+        # workers get the decompressed member bytes, an open ZipFile cannot be shared between processes
+        futures = [(name, executor.submit(parse_ps_file, zip_file.read(name))) for name in names]
+        for name, future in futures:
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                errors[name] = e
+    return split_results(results, errors)
+
+def split_results(results, errors):
+    # {name: (df, malformed)} -> ({name: df}, errors, {name: malformed}) for the files that have any
+    parsed = {name: df_parsed for name, (df_parsed, _) in results.items()}
+    malformed = {name: cells for name, (_, cells) in results.items() if cells}
+    return parsed, errors, malformed
+
+def get_zip_member_hashes(zip_file, names=None):
+    # (name, sha256) of every csv member (or of the given ones), used as the cache key of an upload
+    if names is None:
+        names = get_zip_csv_members(zip_file)
+    return tuple(sorted((name, hashlib.sha256(zip_file.read(name)).hexdigest()) for name in names))
+
+def get_session_key(name):
+    # '005_ps_2024-05-30_13h59.48.753.csv' -> ('5', '2024-05-30_13h59.48.753'), other names are keyed by themselves
+    match = re.match(r'(?P<participant>[^_]+)_ps_(?P<session>.+)\.csv$', os.path.basename(name))
+    if match is None:
+        return (os.path.basename(name), '')
+    participant = match['participant']
+    return (str(int(participant)) if participant.isdigit() else participant, match['session'])
@@ -0,0 +1,84 @@
+import os
+import json
+import time
+import datetime
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+# one JSON line per profiled run, from the app and the headless report alike
+PROFILE_LOG = os.environ.get('PS_PROFILE_LOG', 'profile_log.jsonl')
+
+
+class Profiler:
+    """
+    Named timers and tracemalloc peaks around the stages of a run.
+    Stages nest: a stage's peak includes its children, measured from the memory in use when it started.
+    Without `memory` only the wall time is taken, tracemalloc slows every allocation down; a disabled
+    profiler records nothing, so the stages can stay in place.
+    tracemalloc is process-wide, so only a profiler that starts it takes peaks, and only it stops it:
+    while another one (e.g. another session of the app) is tracing, this one only takes wall times.
+    The peaks of the tracing one include whatever other threads allocate meanwhile.
+    """
+    def __init__(self, enabled=True, memory=True):
+        self.enabled = enabled
+        self.memory = enabled and memory and not tracemalloc.is_tracing()
+        self.stages = []
+        self.stack = []
+        self.started_tracing = False
+        if self.memory:
+            tracemalloc.start()
+            self.started_tracing = True
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield None
+            return
+        record = {'stage': name, 'parent': self.stack[-1]['stage'] if self.stack else None, 'depth': len(self.stack)}
+        self.stages.append(record)
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if self.stack:
+                # the peak so far belongs to the enclosing stage, the counter is reset for this one
+                self.stack[-1]['max'] = max(self.stack[-1]['max'], peak)
+            tracemalloc.reset_peak()
+            record['start'], record['max'] = current, current
+        self.stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            self.stack.pop()
+            if self.memory:
+                peak = max(record.pop('max'), tracemalloc.get_traced_memory()[1])
+                record['peak_mb'] = (peak - record.pop('start')) / 2**20
+                if self.stack:
+                    self.stack[-1]['max'] = max(self.stack[-1]['max'], peak)
+
+    def stop(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def to_frame(self):
+        columns = ['stage', 'parent', 'depth', 'seconds'] + (['peak_mb'] if self.memory else [])
+        return pd.DataFrame([{column: record.get(column) for column in columns} for record in self.stages], columns=columns)
+
+    def to_record(self, source, **info):
+        return {'time': datetime.datetime.now().isoformat(timespec='seconds'), 'source': source, **info,
+                'stages': self.to_frame().to_dict(orient='records')}
+
+def append_log(record, path=PROFILE_LOG):
+    # JSON lines, so runs of several sessions and processes can share one file
+    with open(path, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+
+def read_log(path=PROFILE_LOG):
+    """Every stage of every logged run, one row per stage, for comparing reruns over time."""
+    with open(path) as f:
+        runs = [json.loads(line) for line in f if line.strip()]
+    return pd.DataFrame([{**{key: value for key, value in run.items() if key != 'stages'}, 'run': i, **stage}
+                         for i, run in enumerate(runs) for stage in run['stages']])
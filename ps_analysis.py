@@ -0,0 +1,210 @@
+"""
+Headless run of the report: every table to CSV and/or Parquet and every figure to PNG, without streamlit.
+
+    python -m ps_analysis run cohort.zip --out report/
+    python -m ps_analysis run cohort.zip --vviq vviq.zip --out report/ --exclude 6 10 --delete-incorrect --format both
+
+The options mirror the sidebar of app.py. Tables land in <out>/tables, figures in <out>/figures and the
+post-hoc tests in <out>/posthoc. With --profile the time and tracemalloc peak of every stage are printed and
+appended to the same JSON log as the app's profiling panel.
+"""
+import os
+import sys
+import time
+import zipfile
+import argparse
+import warnings
+
+import pandas as pd
+
+from parsing import parse_ps_files, describe_malformed, parse_vviq_files, dedupe_vviq, vviq_policies, get_zip_csv_members
+from analysis import build_cube, rollup, relabel, wm_labels, corr_labels, aggregate_performance, bootstrap_ci, running_mean
+from analysis import cell_stats, participant_matrix, correlate
+from anova import anova_factor_names, anova_type2, anova_rm, tukey_hsd
+from figures import make_spec, render_pngs, color_p
+from profiling import Profiler, PROFILE_LOG, append_log
+
+metric_names = {'corr': 'accuracy', 'rt': 'rt'}
+metric_labels = {'corr': 'Accuracy', 'rt': 'RT'}
+# the "agg over participants" breakdowns of sections 1, 2, 4 and 5
+breakdowns = {'block': 'Block', 'wm': 'Single vs WM', 'dimension': '2D vs 3D', 'angle': 'Angular Difference',
+              'strategy_response': 'Strategy Response', 'vivid_response': 'Vivid Response'}
+
+
+def load_trials(zip_path, max_workers=None):
+    # parsed trials of every participant file in the zip, the frame load_participant_data builds in the app
+    with zipfile.ZipFile(zip_path) as z:
+        parsed, errors, malformed = parse_ps_files(z, get_zip_csv_members(z), max_workers)
+    if not parsed:
+        return None, errors, malformed
+    df_all_parsed = pd.concat(parsed.values(), axis=0).reset_index(drop=True)
+    df_all_parsed['participant'] = df_all_parsed['participant'].astype(str)
+    return df_all_parsed, errors, malformed
+
+def load_vviq(zip_path, policy='latest'):
+    with zipfile.ZipFile(zip_path) as z:
+        df_sessions, errors = parse_vviq_files(z, get_zip_csv_members(z))
+    return dedupe_vviq(df_sessions, policy), errors
+
+def summary_tables(df_cube, df_cube_rt):
+    # mean and std tables of sections 1, 2, 4 and 5
+    tables = {}
+    for metric, cube in (('corr', df_cube), ('rt', df_cube_rt)):
+        for by in list(breakdowns) + [['angle', 'wm']]:
+            table = rollup(cube, by, metric)
+            if 'wm' in ([by] if isinstance(by, str) else by):
+                table = relabel(table, 'wm', wm_labels)
+            table = table.sort_values(by if isinstance(by, str) else by[0], kind='stable')
+            tables[f"{metric_names[metric]}_by_{'_'.join([by] if isinstance(by, str) else by)}"] = table
+    tables['rt_by_corr'] = relabel(rollup(df_cube, 'corr', 'rt'), 'corr', corr_labels)
+    tables['aggregated_performance'] = aggregate_performance(df_cube).sort_values('participant', kind='stable')
+    tables['vividness_counts'] = df_cube.groupby('vivid_response')['n'].sum().rename('count').reset_index()
+    return tables
+
+def anova_tables(df_cube, df_cube_rt, factors):
+    # section 6: Type II and repeated-measures tables plus the Tukey HSD summaries
+    tables, posthoc = {}, {}
+    for metric, cube in (('corr', df_cube), ('rt', df_cube_rt)):
+        name = metric_names[metric]
+        cells = cell_stats(cube, anova_factor_names, metric)
+        tables[f'anova_{name}'] = anova_type2(cells, factors).rename_axis('term').reset_index()
+        try:
+            table, excluded = anova_rm(cell_stats(cube, ['participant'] + anova_factor_names, metric), factors)
+            tables[f'anova_rm_{name}'] = table.rename_axis('term').reset_index()
+        except ValueError as e:
+            print(f"repeated-measures ANOVA of {name} skipped: {e}", file=sys.stderr)
+        posthoc[f'tukey_{name}'] = str(tukey_hsd(cells, factors))
+    return tables, posthoc
+
+def vviq_tables(df_cube, df_cube_rt, df_vviq, n_perm=0):
+    # section 8: every VVIQ correlation of a metric in one pass, as in the app
+    tables = {}
+    for metric, cube in (('corr', df_cube), ('rt', df_cube_rt)):
+        matrix = participant_matrix(cube, metric, ['wm', 'block'])
+        rows = pd.merge(matrix.index.to_frame(index=False), df_vviq[['participant', 'vviq_score']], on='participant', how='left')
+        X = matrix.loc[rows['participant']]
+        for method in ('spearman', 'pearson'):
+            df_corr = correlate(X, rows['vviq_score'], method, n_perm=n_perm)
+            df_corr.index = df_corr.index.set_names(['condition', 'level'])
+            tables[f'vviq_{metric_names[metric]}_{method}'] = df_corr.reset_index().astype({'level': str})
+        tables[f'vviq_{metric_names[metric]}_by_participant'] = pd.merge(
+            rollup(cube, 'participant', metric, std=False), df_vviq, on='participant', how='left')
+    return tables
+
+def figure_specs(df_all_parsed, df_all_parsed_rt, df_vviq_tables, ci_cluster=None):
+    # the bootstrap barplots of sections 1, 2, 4 and 5, the running averages of section 3 and the VVIQ scatters
+    specs = {}
+    for metric, df in (('corr', df_all_parsed), ('rt', df_all_parsed_rt)):
+        for by, label in breakdowns.items():
+            df_ci = bootstrap_ci(df[[by, metric, 'participant']], metric, by, cluster=ci_cluster)
+            if by == 'wm':
+                df_ci = relabel(df_ci, 'wm', wm_labels)
+            specs[f'{metric_names[metric]}_by_{by}'] = make_spec('ci_barplot', df_ci, x=by, y=metric, palette=color_p, capsize=0.1,
+                                                                 xlabel=label, ylabel=metric_labels[metric],
+                                                                 title=f'Average {metric_labels[metric]} by {label} (agg over participants)')
+    df_running = running_mean(df_all_parsed, ['corr', 'rt'], max_points=400)
+    for metric in ('corr', 'rt'):
+        specs[f'running_average_{metric_names[metric]}'] = make_spec(
+            'lineplot', df_running, x='idx', y=metric, hue='participant', palette=color_p, estimator=None, legend=True,
+            xlabel='Index', ylabel=f'Running Average {metric_labels[metric]}',
+            title=f'Running Average {metric_labels[metric]} Over Time (by participant)')
+    for metric in ('corr', 'rt'):
+        name = f'vviq_{metric_names[metric]}_by_participant'
+        if name in df_vviq_tables:
+            specs[name] = make_spec('regplot', df_vviq_tables[name], x='vviq_score', y=metric, scatter_kws={'s': 15},
+                                    xlabel='VVIQ', ylabel=metric_labels[metric], title=f'{metric_labels[metric]} vs VVIQ')
+    return specs
+
+def write_table(df, path, formats):
+    if 'csv' in formats:
+        df.to_csv(path + '.csv', index=False)
+    if 'parquet' in formats:
+        # categoricals and mixed object columns are written as plain strings
+        df = df.astype({col: str for col in df.columns if df[col].dtype == object or isinstance(df[col].dtype, pd.CategoricalDtype)})
+        df.to_parquet(path + '.parquet', index=False)
+
+def run(args):
+    start = time.perf_counter()
+    profiler = Profiler(enabled=args.profile is not None)
+    with profiler.stage("Parse participant files"):
+        df_all_parsed, errors, malformed = load_trials(args.cohort, args.workers)
+    for name, e in errors.items():
+        print(f"error parsing {os.path.basename(name)}: {e}", file=sys.stderr)
+    for name, cells in malformed.items():
+        for message in describe_malformed(cells):
+            print(f"{os.path.basename(name)}: {message}", file=sys.stderr)
+    if df_all_parsed is None:
+        print("no participant file could be parsed", file=sys.stderr)
+        profiler.stop()
+        return 1
+    with profiler.stage("Build cube"):
+        df_all_parsed = df_all_parsed[~df_all_parsed['participant'].isin(args.exclude)]
+        df_cube = build_cube(df_all_parsed)
+        df_all_parsed_rt, df_cube_rt = df_all_parsed, df_cube
+        if args.delete_incorrect:
+            df_all_parsed_rt, df_cube_rt = df_all_parsed[df_all_parsed['corr'] == 1], df_cube[df_cube['corr'] == 1]
+
+    with profiler.stage("Summary tables"):
+        tables = summary_tables(df_cube, df_cube_rt)
+    with profiler.stage("ANOVA and Tukey HSD"):
+        df_cube_anova, df_cube_anova_rt = df_cube, df_cube_rt
+        if args.drop_3dd_wm:
+            df_cube_anova, df_cube_anova_rt = df_cube[df_cube['block'] != '3Dd_wm'], df_cube_rt[df_cube_rt['block'] != '3Dd_wm']
+        anova, posthoc = anova_tables(df_cube_anova, df_cube_anova_rt, args.anova_factors)
+    tables.update(anova)
+    df_vviq_tables = {}
+    if args.vviq:
+        with profiler.stage("VVIQ correlations"):
+            df_vviq, vviq_errors = load_vviq(args.vviq, args.vviq_policy)
+            for name, e in vviq_errors.items():
+                print(f"error parsing {os.path.basename(name)}: {e}", file=sys.stderr)
+            tables['vviq_scores'] = df_vviq
+            df_vviq_tables = vviq_tables(df_cube, df_cube_rt, df_vviq, args.n_perm)
+        tables.update(df_vviq_tables)
+
+    with profiler.stage("Write tables"):
+        for folder in ('tables', 'figures', 'posthoc'):
+            os.makedirs(os.path.join(args.out, folder), exist_ok=True)
+        for name, df in tables.items():
+            write_table(df, os.path.join(args.out, 'tables', name), args.format)
+        for name, text in posthoc.items():
+            with open(os.path.join(args.out, 'posthoc', name + '.txt'), 'w') as f:
+                f.write(text + '\n')
+
+    with profiler.stage("Draw figures"):
+        specs = figure_specs(df_all_parsed, df_all_parsed_rt, df_vviq_tables, 'participant' if args.cluster_ci else None)
+        for name, png in zip(specs, render_pngs(specs.values(), args.workers)):
+            with open(os.path.join(args.out, 'figures', name + '.png'), 'wb') as f:
+                f.write(png)
+    print(f"{df_all_parsed['participant'].nunique()} participants, {len(tables)} tables, {len(specs)} figures "
+          f"written to {args.out} in {time.perf_counter() - start:.1f} s")
+    if profiler.enabled:
+        profiler.stop()
+        print(profiler.to_frame().round(3).to_string(index=False), file=sys.stderr)
+        append_log(profiler.to_record('cli', participants=int(df_all_parsed['participant'].nunique()), cohort=args.cohort), args.profile)
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m ps_analysis', description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    parser_run = commands.add_parser('run', help="run the whole report on a zipped cohort")
+    parser_run.add_argument('cohort', help="zip of the PsychoPy participant files")
+    parser_run.add_argument('--out', required=True, help="output folder")
+    parser_run.add_argument('--vviq', help="zip of the VVIQ files")
+    parser_run.add_argument('--vviq-policy', choices=vviq_policies, default='latest', help="score of participants with several VVIQ sessions")
+    parser_run.add_argument('--exclude', nargs='*', default=[], help="participant ids to leave out")
+    parser_run.add_argument('--delete-incorrect', action='store_true', help="RT analysis on correct trials only")
+    parser_run.add_argument('--drop-3dd-wm', action='store_true', help="leave the 3Dd_wm block out of the ANOVA")
+    parser_run.add_argument('--anova-factors', nargs='+', choices=anova_factor_names, default=['wm', 'dimension', 'angle'])
+    parser_run.add_argument('--cluster-ci', action='store_true', help="bootstrap error bars over participants instead of trials")
+    parser_run.add_argument('--n-perm', type=int, default=0, help="permutation p-values of the VVIQ correlations")
+    parser_run.add_argument('--format', choices=['csv', 'parquet', 'both'], default='csv')
+    parser_run.add_argument('--workers', type=int, default=None, help="processes for parsing and figure rendering")
+    parser_run.add_argument('--profile', nargs='?', const=PROFILE_LOG, help=f"time every stage and append it to a JSON log (default {PROFILE_LOG})")
+    args = parser.parse_args(argv)
+    args.format = ['csv', 'parquet'] if args.format == 'both' else [args.format]
+    warnings.filterwarnings('ignore')
+    return run(args)
+
+if __name__ == '__main__':
+    sys.exit(main())
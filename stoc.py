@@ -1,3 +1,6 @@
+from urllib.parse import urlencode
+from contextlib import nullcontext
+
 import streamlit as st
 import unidecode
 
@@ -13,6 +16,9 @@ a.toc {
 class stoc:
     def __init__(self):
         self.toc_items = list()
+        # (title, render) of every registered section, in page order
+        self.sections = list()
+        self.open_sections = list()
 
     def h1(self, text: str, write: bool = True):
         if write:
@@ -29,16 +35,56 @@ class stoc:
             st.write(f"### {text}")
         self.toc_items.append(("h3", text))
 
+    def section(self, title: str, render):
+        """Register a h2 section, `render()` draws its body and only runs while the section is open."""
+        self.sections.append((title, render))
+
+    def get_requested(self):
+        # ?section= takes the normalized titles or the section numbers, "all" opens every section
+        requested = st.query_params.get_all("section")
+        if "all" in requested:
+            return [title for title, _ in self.sections]
+        return [title for title, _ in self.sections
+                if normalize(title) in requested or title.split(".")[0] in requested]
+
+    def run(self, default: int = 1, stage=None):
+        """
+        Sidebar choice of the open sections, kept in the ?section= query parameter so a view can be shared,
+        then the render of each open section in page order. The first `default` sections open when nothing
+        is requested. `stage(title)`, a context manager such as Profiler.stage, wraps every render.
+        """
+        titles = [title for title, _ in self.sections]
+        self.open_sections = st.sidebar.multiselect(
+            "Sections", titles, default=self.get_requested() or titles[:default], key="stoc_sections")
+        st.query_params["section"] = [normalize(title) for title in self.open_sections]
+        for title, render in self.sections:
+            if title in self.open_sections:
+                with stage(title) if stage else nullcontext():
+                    self.h2(title)
+                    render()
+            else:
+                # listed in the TOC all the same, the link opens it
+                self.toc_items.append(("h2", title))
+
+    def get_href(self, title: str):
+        if title in self.open_sections or title not in dict(self.sections):
+            return f"#{normalize(title)}"
+        titles = [t for t, _ in self.sections if t in self.open_sections or t == title]
+        return "?" + urlencode({"section": [normalize(t) for t in titles]}, doseq=True) + f"#{normalize(title)}"
+
     def toc(self):
         st.write(DISABLE_LINK_CSS, unsafe_allow_html=True)
         st.sidebar.caption("Table of contents")
         markdown_toc = ""
         for title_size, title in self.toc_items:
             h = int(title_size.replace("h", ""))
+            href = self.get_href(title)
+            # links to a closed section reload the page with it opened
+            target = "" if href.startswith("#") else ' target="_self"'
             markdown_toc += (
                 " " * 2 * h
                 + "- "
-                + f'<a href="#{normalize(title)}" class="toc"> {title}</a> \n'
+                + f'<a href="{href}" class="toc"{target}> {title}</a> \n'
             )
         st.sidebar.write(markdown_toc, unsafe_allow_html=True)
 
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+
+def get_levels(values):
+    # filter options of a column: categories in their order, other values sorted
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.remove_unused_categories().cat.categories.tolist()
+    return sorted(values.dropna().unique().tolist())
+
+def get_rows(df, filters=None, sort_by=None, ascending=True):
+    """
+    Positions of the rows of `df` that match `filters` ({column: selected values}, an empty selection keeps
+    every row), in `sort_by` order (stable, missing values last) or in the frame's own order.
+    Only positions are filtered and sorted, the frame is not copied.
+    """
+    mask = np.ones(len(df), dtype=bool)
+    for column, selected in (filters or {}).items():
+        if len(selected):
+            mask &= df[column].isin(selected).to_numpy()
+    rows = np.flatnonzero(mask)
+    if sort_by is not None:
+        keys = df[sort_by].iloc[rows].reset_index(drop=True)
+        rows = rows[keys.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()]
+    return rows
+
+def get_page(df, rows, page, page_size):
+    # rows of page `page` (from 1), the only part of the frame that is serialized for display
+    start = (page - 1) * page_size
+    return df.iloc[rows[start:start + page_size]]
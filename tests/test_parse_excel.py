@@ -0,0 +1,155 @@
+"""
+The vectorized parser against the row-wise parse_excel it replaced, on every sample export in temp/.
+
+The reference is kept here as it was in app.py. Values are compared, not dtypes: the vectorized parser
+returns categories and float corr/strategy_response where the reference has objects and ints.
+"""
+import os
+import sys
+import glob
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo_root)
+
+from parsing import parse_ps_file
+
+sample_files = sorted(glob.glob(os.path.join(repo_root, 'temp', '*.csv')))
+
+shared_columns = ['idx','dimension', 'rot_type', 'angle', 'mirror', 'wm',
+                  'pair_id', 'obj_id', 'orientation1', 'orientation2', 'image_path_1', 'image_path_2',
+                  'marker_id', 'correctAns', 'vivid_response', 'key_resp_vivid_slider_control.keys', 'key_resp_vivid_slider_control.rt', 'participant', 'condition_file']
+
+def get_ans_key(row):
+    keys_possible_cols = ['key_resp.keys', 'key_resp_3.keys', 'key_resp_6.keys']
+    rt_possible_cols = ['key_resp.rt', 'key_resp_3.rt', 'key_resp_6.rt']
+    for key, rt in zip(keys_possible_cols, rt_possible_cols):
+        if not pd.isna(row[key]) and row[key] != '':
+            return row[key], row[rt]
+    return np.nan, np.nan
+
+def get_strategy_response(row):
+    if (not pd.isna(row['key_resp_strat_control.keys'])) and (row['key_resp_strat_control.keys'] != 'None') and (row['key_resp_strat_control.keys'] != ''):
+        try:
+            strat_resp_list = eval(row['key_resp_strat_control.keys'])
+            if len(strat_resp_list) > 0:
+                last_key = strat_resp_list[-1]
+                if last_key == 'rshift':
+                    return 4
+                elif last_key == 'slash':
+                    return 3
+                elif last_key == 'period':
+                    return 2
+                elif last_key == 'comma':
+                    return 1
+        except:
+            print(row['key_resp_strat_control.keys'])
+    return np.nan
+
+def get_vivid_response(row):
+    if (not pd.isna(row['key_resp_vivid_slider_control.keys'])) and (row['key_resp_vivid_slider_control.keys'] != 'None') and (row['key_resp_vivid_slider_control.keys'] != ''):
+        try:
+            vivid_resp_list = eval(row['key_resp_vivid_slider_control.keys'])
+            if len(vivid_resp_list) > 0:
+                last_key = vivid_resp_list[-1]
+                if last_key == 'rshift':
+                    return 4
+                elif last_key == 'slash':
+                    return 3
+                elif last_key == 'period':
+                    return 2
+                elif last_key == 'comma':
+                    return 1
+        except:
+            print(row['key_resp_vivid_slider_control.keys'])
+    return np.nan
+
+def get_block(row):
+    if row['dimension'] == '2D':
+        if row['wm'] == False:
+            return '2D_single'
+        elif row['wm'] == True:
+            return '2D_wm'
+
+    elif row['dimension'] == '3D':
+        if row['rot_type'] == 'p':
+            if row['wm'] == False:
+                return '3Dp_single'
+            elif row['wm'] == True:
+                return '3Dp_wm'
+        elif row['rot_type'] == 'd':
+            if row['wm'] == False:
+                return '3Dd_single'
+            elif row['wm'] == True:
+                return '3Dd_wm'
+
+def get_corr(row):
+    if row['ans_key'] is np.nan:
+        return np.nan
+    else:
+        if row['correctAns'] == row['ans_key']:
+            return 1
+        else:
+            return 0
+
+
+def parse_excel(df):
+    df_blocks = df[~df['dimension'].isna()]
+    df_strat = df[~df['key_resp_strat_control.keys'].isna()]
+    df_strat = df_strat[['condition_file', 'key_resp_strat_control.keys', 'key_resp_strat_control.rt']]
+    df_blocks.reset_index(drop=True, inplace=True)
+    df_blocks['idx'] = df_blocks.index
+    df_parsed = pd.DataFrame(columns=shared_columns)
+    df_parsed['ans_key'] = np.nan
+    df_parsed['rt'] = np.nan
+    # iterate over the rows of the dataframe to get the ans keys, corr, rt by get_ans_key function
+    for idx, row in df_blocks.iterrows():
+        key, rt = get_ans_key(row)
+        df_parsed.loc[idx, 'ans_key'] = key
+        df_parsed.loc[idx, 'rt'] = rt
+        for col in shared_columns:
+            df_parsed.loc[idx, col] = row[col]
+
+        # replace all 'None' values with np.nan
+    df_parsed.replace('None', np.nan, inplace=True)
+    df_parsed['vivid_response'] = df_parsed.apply(get_vivid_response, axis=1)
+
+    # fill na values in 'rot_type', 'pair_id', 'orientation1', 'orientation2', 'image_path_2' with not applicable
+    for col in ['rot_type', 'pair_id', 'orientation1', 'orientation2', 'image_path_2']:
+        df_parsed[col].fillna('na', inplace=True)
+
+    df_parsed['block'] = df_parsed.apply(get_block, axis=1)
+    df_parsed['corr'] = df_parsed.apply(get_corr, axis=1)
+
+    df_parsed = df_parsed.merge(df_strat, on='condition_file', how='left')
+    df_parsed['strategy_response'] = df_parsed.apply(get_strategy_response, axis=1)
+
+    df_parsed['mini_block'] = df_parsed['condition_file'].apply(lambda x: x.split('/')[1].split('.')[0])
+    df_parsed.drop(columns=['condition_file'], inplace=True)
+    return df_parsed
+
+
+def get_values(column):
+    # numbers as floats, anything else as strings, missing values as None
+    column = column.astype(object)
+    numbers = pd.to_numeric(column, errors='coerce')
+    if numbers.notna().sum() == column.notna().sum():
+        return numbers.astype(float)
+    return column.map(lambda value: None if pd.isna(value) else str(value))
+
+@pytest.mark.parametrize('path', sample_files, ids=os.path.basename)
+def test_parse_ps_file_matches_row_wise_parse_excel(path):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        expected = parse_excel(pd.read_csv(path))
+    parsed, _ = parse_ps_file(path)
+
+    assert list(parsed.columns) == list(expected.columns)
+    assert len(parsed) == len(expected)
+    for column in expected.columns:
+        pd.testing.assert_series_equal(get_values(parsed[column]), get_values(expected[column]), check_index=False,
+                                       check_names=False, obj=column)
@@ -0,0 +1,38 @@
+import os
+import uuid
+
+import pandas as pd
+
+from parsing import PARSER_VERSION
+
+# parsed trials of every participant file seen so far, one parquet file per file content hash
+STORE_ROOT = os.environ.get('PS_TRIAL_STORE', 'parsed_store')
+
+
+def get_store_path(digest, root=STORE_ROOT):
+    # entries written by another parser version live in another directory and are never read
+    return os.path.join(root, f"v{PARSER_VERSION}", f"{digest}.parquet")
+
+def load_parsed(digest, root=STORE_ROOT):
+    # (parsed trials, malformed cells) as parse_ps_file returned them, or None
+    path = get_store_path(digest, root)
+    if not os.path.exists(path):
+        return None
+    try:
+        df_parsed = pd.read_parquet(path)
+    except Exception:
+        # a corrupt entry is treated as a miss and rewritten after parsing
+        return None
+    malformed = df_parsed.attrs.pop('malformed', {})
+    return df_parsed, {column: tuple(cells) for column, cells in malformed.items()}
+
+def save_parsed(df_parsed, malformed, digest, root=STORE_ROOT):
+    path = get_store_path(digest, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # the malformed cells ride along in the parquet metadata (pandas keeps attrs there)
+    df_parsed = df_parsed.copy(deep=False)
+    df_parsed.attrs = {'malformed': malformed}
+    # write to a temporary file first so concurrent sessions never read a half-written entry
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    df_parsed.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)